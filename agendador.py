@@ -0,0 +1,260 @@
+"""
+Agendador de longa duração: substitui o cron de criar_enquetes_do_dia.py,
+stopper.py e atualizar_resultados.py.
+
+Um único processo (ou o próprio bot, com AGENDADOR=1 no main.py) mantém um
+heap de prazos e dorme até o próximo:
+  - "criar":  cria as enquetes do dia no horário local HORA_ENQUETES;
+  - "fechar": fecha cada enquete exatamente no início do jogo menos
+    MINUTOS_ANTES (e não na próxima volta do cron);
+  - "placar": enquanto há jogos em andamento sem resultado, uma rodada do
+    placar ao vivo (placar_ao_vivo.py), que diz quando consultar de novo.
+
+Nada fica só em memória: ao iniciar (ou reiniciar), os prazos são
+recalculados a partir do banco, e cada tarefa relê o banco quando dispara,
+então jogos remarcados ou enquetes criadas por outro processo são vistos.
+"""
+import asyncio
+import heapq
+import os
+import time
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import calendario
+from criar_enquetes_do_dia import BOT_TOKEN, FUSO_LOCAL, criar_enquetes_dos_grupos, janela_do_dia
+from database import (
+    contar_jogos_sem_enquete,
+    create_tables,
+    epoch_utc,
+    listar_enquetes_a_fechar,
+    situacao_placar,
+    usando_banco
+)
+from database_async import ler
+from envio import Enviador, criar_bot
+from grupos import em_cada_grupo, grupos_configurados
+from placar_ao_vivo import PlacarAoVivo
+from stopper import HORIZONTE_HORAS, MINUTOS_ANTES, fechar_enquete
+
+# Horário local ("HH:MM") em que as enquetes do dia são criadas
+HORA_ENQUETES = os.getenv("HORA_ENQUETES", "10:00")
+
+# Do início do jogo até sair o resultado o placar ao vivo é consultado (no
+# ritmo que ele mesmo escolhe); passadas 6h sem resultado (jogo adiado, que
+# nunca terá placar), desiste. Se o scoreboard já não mostra o jogo, tenta
+# de novo a cada INTERVALO_PLACAR s.
+DURACAO_MAXIMA_JOGO = 6 * 3600
+INTERVALO_PLACAR = 60
+
+# Mesmo sem prazo próximo, relê o banco de tempos em tempos (jogos remarcados,
+# enquetes criadas à mão) e tenta de novo o que falhou
+INTERVALO_REVISAO = 15 * 60
+INTERVALO_NOVA_TENTATIVA = 60
+
+
+def proxima_criacao(agora_epoch, hora_local=HORA_ENQUETES):
+    """Epoch UTC da próxima ocorrência de `hora_local` no fuso do grupo."""
+    horas, minutos = map(int, hora_local.split(":"))
+    agora_local = datetime.utcfromtimestamp(agora_epoch) + FUSO_LOCAL
+    alvo = agora_local.replace(hour=horas, minute=minutos, second=0, microsecond=0)
+    if alvo <= agora_local:
+        alvo += timedelta(days=1)
+    return epoch_utc(alvo - FUSO_LOCAL)
+
+
+class Agendador:
+    def __init__(self, bot, hora_enquetes=HORA_ENQUETES, antecedencia=MINUTOS_ANTES * 60):
+        self.enviador = Enviador(bot)
+        self.grupos = grupos_configurados()
+        self.placar = PlacarAoVivo()
+        self.hora_enquetes = hora_enquetes
+        self.antecedencia = antecedencia
+
+        self._heap = []            # (quando, tipo)
+        self._prazos = {}          # tipo -> prazo vigente (entradas antigas são ignoradas)
+        self._acordar = asyncio.Event()
+        self._parar = False
+        self._tarefa = None
+
+    def agendar(self, tipo, quando):
+        """Agenda a tarefa `tipo` para o epoch `quando`.
+
+        Cada tipo tem um só prazo vigente: um prazo mais cedo substitui o
+        atual, um mais tarde é ignorado (a tarefa, quando roda, reagenda).
+        """
+        atual = self._prazos.get(tipo)
+        if atual is not None and atual <= quando:
+            return
+        self._prazos[tipo] = quando
+        heapq.heappush(self._heap, (quando, tipo))
+        self._acordar.set()
+
+    async def iniciar(self):
+        """Reconstrói os prazos a partir do banco e liga o laço."""
+        # calendário em memória (o banco do grupo principal tem todos os jogos)
+        await ler(calendario.carregar_do_banco)
+
+        agora = time.time()
+        self.agendar("fechar", agora)
+        self.agendar("placar", agora)
+
+        # se o horário de hoje já passou (a próxima criação é amanhã) e ainda
+        # há jogos do dia por começar sem enquete, o processo estava fora:
+        # cria agora
+        agora_utc = datetime.utcfromtimestamp(agora)
+        inicio_utc, _ = janela_do_dia(agora_utc)
+        sem_enquetes = await self._grupos_sem_enquetes(agora_utc)
+        criacao = proxima_criacao(agora, self.hora_enquetes)
+        if sem_enquetes and criacao - 86400 >= epoch_utc(inicio_utc):
+            self.agendar("criar", agora)
+        else:
+            self.agendar("criar", criacao)
+
+        self._tarefa = asyncio.create_task(self._loop())
+        print(f"⏰ Agendador iniciado (enquetes às {self.hora_enquetes}, "
+              f"fechamento {self.antecedencia // 60} min antes do jogo)")
+
+    async def _loop(self):
+        while not self._parar:
+            if not self._heap:
+                self._acordar.clear()
+                await self._acordar.wait()
+                continue
+
+            quando, tipo = self._heap[0]
+            if self._prazos.get(tipo) != quando:
+                heapq.heappop(self._heap)      # prazo substituído
+                continue
+
+            espera = quando - time.time()
+            if espera > 0:
+                # acorda antes se um prazo mais cedo for agendado
+                self._acordar.clear()
+                try:
+                    await asyncio.wait_for(self._acordar.wait(), espera)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            del self._prazos[tipo]
+            try:
+                await getattr(self, "_" + tipo)()
+            except Exception as e:
+                print(f"❌ Erro na tarefa '{tipo}' do agendador: {e}")
+                self.agendar(tipo, time.time() + INTERVALO_NOVA_TENTATIVA)
+
+    async def _grupos_sem_enquetes(self, agora_utc):
+        """Grupos com jogos do dia de `agora_utc`, ainda por começar, sem
+        enquete (a janela do dia começa às 00h e inclui os jogos da
+        madrugada, que já ganharam enquete na véspera).
+
+        O calendário em memória responde antes dos bancos: sem jogos por
+        começar na janela, nenhum grupo; se ele nem chega ao fim da janela,
+        todos (a criação sincroniza o calendário e decide)."""
+        agora, fim = epoch_utc(agora_utc), epoch_utc(janela_do_dia(agora_utc)[1])
+        if not calendario.indice.cobre(fim):
+            return list(self.grupos)
+        if not calendario.indice.jogos_entre(agora, fim):
+            return []
+        contagens = await asyncio.to_thread(
+            em_cada_grupo, contar_jogos_sem_enquete, agora, fim, grupos=self.grupos)
+        return [grupo for grupo, faltando in contagens if faltando]
+
+    async def _criar(self):
+        # jogos remarcados ou sincronizados por outro processo desde ontem
+        await ler(calendario.carregar_do_banco)
+        # só nos grupos que ainda não têm as enquetes do dia (um reinício
+        # logo depois da criação não as duplica)
+        grupos = await self._grupos_sem_enquetes(datetime.utcnow())
+        if grupos:
+            await criar_enquetes_dos_grupos(enviador=self.enviador, grupos=grupos)
+
+        agora = time.time()
+        self.agendar("criar", proxima_criacao(agora, self.hora_enquetes))
+        self.agendar("fechar", agora)
+        self.agendar("placar", agora)
+
+    async def _fechar(self):
+        agora = int(time.time())
+        jogos = []
+        for grupo in self.grupos:
+            with usando_banco(grupo.banco):
+                linhas = await ler(listar_enquetes_a_fechar, agora, self.antecedencia,
+                                   HORIZONTE_HORAS * 3600)
+            jogos.extend((grupo, jogo) for jogo in linhas)
+
+        async def fechar(grupo, jogo):
+            try:
+                with usando_banco(grupo.banco):
+                    await fechar_enquete(self.enviador, jogo, grupo.chat_id)
+                atraso = time.time() - (agora + jogo['segundos_para_fechar'])
+                print(f"✅ Enquete fechada: {jogo['time_visitante']} x {jogo['time_mandante']} "
+                      f"({atraso:.1f}s após o prazo)")
+                return True
+            except Exception as e:
+                print(f"❌ Erro ao fechar enquete {jogo['game_id_nba']}: {e}")
+                return False
+
+        proximo = agora + INTERVALO_REVISAO
+        vencidas = []
+        for grupo, jogo in jogos:
+            if jogo['segundos_para_fechar'] > 0:
+                proximo = min(proximo, agora + jogo['segundos_para_fechar'])
+            else:
+                vencidas.append(fechar(grupo, jogo))
+
+        # jogos no mesmo horário fecham juntos, em paralelo
+        if not all(await asyncio.gather(*vencidas)):
+            proximo = min(proximo, agora + INTERVALO_NOVA_TENTATIVA)
+
+        self.agendar("fechar", proximo)
+
+    async def _placar(self):
+        agora = int(time.time())
+        pendentes, proximo_inicio = 0, None
+        for grupo in self.grupos:
+            with usando_banco(grupo.banco):
+                p, inicio = await ler(situacao_placar, agora, 0, DURACAO_MAXIMA_JOGO)
+            pendentes += p
+            if inicio is not None and (proximo_inicio is None or inicio < proximo_inicio):
+                proximo_inicio = inicio
+
+        if pendentes:
+            # rede + gravação: fora do event loop
+            intervalo = await asyncio.to_thread(self.placar.rodada)
+            self.agendar("placar", time.time() + (intervalo or INTERVALO_PLACAR))
+        elif proximo_inicio is not None:
+            self.agendar("placar", min(proximo_inicio, agora + INTERVALO_REVISAO))
+        else:
+            self.agendar("placar", agora + INTERVALO_REVISAO)
+
+    async def encerrar(self):
+        """Para o laço (uma tarefa em andamento termina antes)."""
+        if self._tarefa:
+            self._parar = True
+            self._acordar.set()
+            await self._tarefa
+            self._tarefa = None
+
+
+async def executar():
+    """Roda o agendador sozinho, fora do bot, até o processo ser interrompido."""
+    async with criar_bot(BOT_TOKEN) as bot:
+        agendador = Agendador(bot)
+        await agendador.iniciar()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await agendador.encerrar()
+
+
+if __name__ == "__main__":
+    em_cada_grupo(create_tables)
+    try:
+        asyncio.run(executar())
+    except KeyboardInterrupt:
+        print("Agendador encerrado.")
@@ -0,0 +1,531 @@
+"""
+Peças comuns ao benchmark.py, ao carga.py e aos testes (tests/): banco
+temporário, calendário sintético, Updates falsos do Telegram para chamar os
+handlers do main.py sem rede, substitutos locais da CDN da NBA e da API de
+bots, e as versões antigas usadas como referência. Nada aqui toca o nba.db.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import database
+
+
+def banco_temporario(pasta=None):
+    """Aponta o database.py para um arquivo novo em `pasta` (por padrão,
+    uma pasta temporária nova)."""
+    pasta = pasta or tempfile.mkdtemp(prefix="nba_bench_")
+    database.DB_NAME = os.path.join(pasta, "bench.db")
+    database.create_tables()
+    database.cache_enquetes.invalidar()
+    database.cache_usuarios.invalidar()
+    return database.DB_NAME
+
+
+def popular(n_usuarios, n_jogos):
+    """Cria usuários, jogos e uma enquete por jogo. Retorna os ids das enquetes."""
+    with database.transacao() as cur:
+        cur.executemany("""
+            INSERT INTO USUARIO_PARTICIPANTE (telegram_user_id, apelido)
+            VALUES (?, ?)
+        """, [(1000 + i, f"user{i}") for i in range(n_usuarios)])
+        cur.executemany("""
+            INSERT INTO JOGO (game_id_nba, time_mandante, time_visitante, data_utc, hora_utc)
+            VALUES (?, 'Home Team', 'Away Team', '2025-01-01', '00:00:00')
+        """, [(f"00224{i:05d}",) for i in range(n_jogos)])
+        cur.executemany("""
+            INSERT INTO ENQUETE (id_jogo, message_id) VALUES (?, ?)
+        """, [(i + 1, 10_000 + i) for i in range(n_jogos)])
+        cur.execute("SELECT id_enquete FROM ENQUETE ORDER BY id_enquete")
+        return [r[0] for r in cur.fetchall()]
+
+
+def popular_votos(n_usuarios, n_jogos, semente=42):
+    """Usuários, jogos, enquetes e um voto de cada usuário em cada enquete."""
+    rnd = random.Random(semente)
+    enquetes = popular(n_usuarios, n_jogos)
+    with database.transacao() as cur:
+        cur.executemany("""
+            INSERT INTO VOTO (id_usuario_participante, id_enquete, escolha, data_hora)
+            VALUES (?, ?, ?, '2025-01-01T00:00:00')
+        """, (
+            (uid, id_enquete, rnd.choice("MV"))
+            for id_enquete in enquetes
+            for uid in range(1, n_usuarios + 1)
+        ))
+    return enquetes
+
+
+def segurar_lock(segundos, pronto, banco=None):
+    """Outra conexão (como um script do cron) segura o lock de escrita."""
+    conn = sqlite3.connect(banco or database.DB_NAME, isolation_level=None)
+    conn.execute("BEGIN IMMEDIATE")
+    conn.execute("UPDATE USUARIO_PARTICIPANTE SET pontuacao = pontuacao")
+    pronto.set()
+    time.sleep(segundos)
+    conn.execute("COMMIT")
+    conn.close()
+
+
+async def medir_com_lock(handler_escrita, handler_leitura, segundos_lock):
+    """Roda /start (escrita) enquanto outro processo segura o lock e mede
+    a latência de /ranking (leitura) e o atraso do event loop nesse período."""
+    pronto = threading.Event()
+    t = threading.Thread(target=segurar_lock, args=(segundos_lock, pronto))
+    t.start()
+    pronto.wait()
+
+    escrita = asyncio.ensure_future(handler_escrita(update_mensagem(999_999, "/start"), contexto()))
+    latencias, atrasos = [], []
+    fim = time.perf_counter() + segundos_lock
+    while time.perf_counter() < fim:
+        t0 = time.perf_counter()
+        await asyncio.sleep(0.005)
+        atrasos.append(time.perf_counter() - t0 - 0.005)
+        t0 = time.perf_counter()
+        await handler_leitura(update_mensagem(1000, "/ranking"), contexto())
+        latencias.append(time.perf_counter() - t0)
+
+    await escrita
+    t.join()
+    return latencias, atrasos
+
+
+# ----------------------------
+# main.py
+# ----------------------------
+def importar_main():
+    """Importa main.py com variáveis de ambiente fictícias (não conecta ao Telegram)."""
+    os.environ.setdefault("BOT_TOKEN", "123:bench")
+    os.environ.setdefault("GROUP_ID", "-100123")
+    import main
+    return main
+
+
+def grupo_unico(main):
+    """O grupo único do main.py nos benchmarks (o do GROUP_ID fictício)."""
+    return next(iter(main.GRUPOS.values()))
+
+
+# ----------------------------
+# Updates falsos
+# ----------------------------
+async def responder(*args, **kwargs):
+    """reply_text / edit_message_text / answer falsos: não fazem nada."""
+
+
+def update_mensagem(telegram_user_id, texto):
+    usuario = SimpleNamespace(id=telegram_user_id, username=f"u{telegram_user_id}", first_name="U")
+    mensagem = SimpleNamespace(from_user=usuario, text=texto, reply_text=responder)
+    return SimpleNamespace(message=mensagem, effective_user=usuario)
+
+
+def query_voto(telegram_user_id, message_id, opcao="M"):
+    """callback_query do clique num botão de voto."""
+    usuario = SimpleNamespace(id=telegram_user_id)
+    return SimpleNamespace(
+        data=f"{message_id}|{opcao}", from_user=usuario,
+        answer=responder, edit_message_text=responder
+    )
+
+
+def update_clique(telegram_user_id, message_id, opcao="M"):
+    query = query_voto(telegram_user_id, message_id, opcao)
+    return SimpleNamespace(callback_query=query, effective_user=query.from_user)
+
+
+def contexto(*args):
+    # o bot nunca é chamado pelos handlers medidos (as respostas saem pelos
+    # reply_text/edit_message_text falsos)
+    return SimpleNamespace(args=list(args), bot=None)
+
+
+def update_json_resposta(update_id, uid, poll_id, opcoes):
+    return {"update_id": update_id, "poll_answer": {
+        "poll_id": poll_id, "option_ids": opcoes,
+        "user": {"id": uid, "is_bot": False, "first_name": "U", "username": f"u{uid}"}}}
+
+
+def update_json_comando(update_id, uid, comando, chat_id=-100123):
+    return {"update_id": update_id, "message": {
+        "message_id": update_id, "date": int(time.time()), "text": comando,
+        "chat": {"id": chat_id, "type": "supergroup"},
+        "from": {"id": uid, "is_bot": False, "first_name": "U", "username": f"u{uid}"},
+        "entities": [{"type": "bot_command", "offset": 0, "length": len(comando)}]}}
+
+
+# ----------------------------
+# Calendário sintético
+# ----------------------------
+TIMES = [
+    ("ATL", "Atlanta", "Hawks"), ("BOS", "Boston", "Celtics"), ("BKN", "Brooklyn", "Nets"),
+    ("CHA", "Charlotte", "Hornets"), ("CHI", "Chicago", "Bulls"), ("CLE", "Cleveland", "Cavaliers"),
+    ("DAL", "Dallas", "Mavericks"), ("DEN", "Denver", "Nuggets"), ("DET", "Detroit", "Pistons"),
+    ("GSW", "Golden State", "Warriors"), ("HOU", "Houston", "Rockets"), ("IND", "Indiana", "Pacers"),
+    ("LAC", "LA", "Clippers"), ("LAL", "Los Angeles", "Lakers"), ("MEM", "Memphis", "Grizzlies"),
+    ("MIA", "Miami", "Heat"), ("MIL", "Milwaukee", "Bucks"), ("MIN", "Minnesota", "Timberwolves"),
+    ("NOP", "New Orleans", "Pelicans"), ("NYK", "New York", "Knicks"), ("OKC", "Oklahoma City", "Thunder"),
+    ("ORL", "Orlando", "Magic"), ("PHI", "Philadelphia", "76ers"), ("PHX", "Phoenix", "Suns"),
+    ("POR", "Portland", "Trail Blazers"), ("SAC", "Sacramento", "Kings"), ("SAS", "San Antonio", "Spurs"),
+    ("TOR", "Toronto", "Raptors"), ("UTA", "Utah", "Jazz"), ("WAS", "Washington", "Wizards"),
+]
+
+
+def time_nba(i):
+    """homeTeam/awayTeam do i-ésimo time de TIMES (dá a volta)."""
+    sigla, cidade, nome = TIMES[i % len(TIMES)]
+    return {"teamTricode": sigla, "teamCity": cidade, "teamName": nome}
+
+
+def calendario_sintetico(n_jogos=1300, inicio=datetime(2025, 10, 21, 23, 0)):
+    """Monta `gameDates` no mesmo formato do scheduleLeagueV2_1.json."""
+    datas = []
+    for i in range(n_jogos):
+        dia = i // 10
+        dt = inicio + timedelta(days=dia, minutes=30 * (i % 10))
+        if i % 10 == 0:
+            datas.append({"gameDate": dt.strftime("%m/%d/%Y 00:00:00"), "games": []})
+        datas[-1]["games"].append({
+            "gameId": f"00225{i:05d}",
+            "gameDateTimeUTC": dt.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "gameStatusText": "7:00 pm ET",
+            "homeTeam": time_nba(2 * i),
+            "awayTeam": time_nba(2 * i + 1),
+            "broadcasters": {
+                "nationalTvBroadcasters": [{"broadcasterMedia": "tv", "broadcasterDisplay": "ESPN"}],
+            },
+        })
+    return datas
+
+
+def jogo_como_na_cdn(jogo, i):
+    """Completa um jogo do calendario_sintetico com os demais campos que o
+    scheduleLeagueV2_1.json traz (e que o bot não usa)."""
+    transmissoras = [{"broadcasterScope": "natl", "broadcasterMedia": m, "broadcasterId": 1000 + k,
+                      "broadcasterDisplay": f"Canal {k}", "broadcasterAbbreviation": f"C{k}",
+                      "broadcasterDescription": "", "tapeDelayComments": "", "broadcasterVideoLink": "",
+                      "broadcasterTeamId": -1, "broadcasterRanking": None}
+                     for k, m in enumerate(("radio", "ott", "tv"))]
+    completo = dict(jogo)
+    completo.update({
+        "gameCode": f"20251021/{jogo['awayTeam']['teamTricode']}{jogo['homeTeam']['teamTricode']}",
+        "gameStatus": 1, "gameSequence": i % 10 + 1,
+        "gameDateEst": "2025-10-21T00:00:00Z", "gameTimeEst": "1900-01-01T19:30:00Z",
+        "gameDateTimeEst": "2025-10-21T19:30:00-04:00", "gameDateUTC": "2025-10-21T04:00:00Z",
+        "gameTimeUTC": "1900-01-01T23:30:00Z", "awayTeamTime": "2025-10-21T19:30:00-04:00",
+        "homeTeamTime": "2025-10-21T19:30:00-04:00", "day": "Tue", "monthNum": 10, "weekNumber": 1,
+        "weekName": "Week 1", "ifNecessary": False, "seriesGameNumber": "", "gameLabel": "",
+        "gameSubLabel": "", "seriesText": "", "arenaName": "Arena Sintética", "arenaState": "XX",
+        "arenaCity": "Cidade", "postponedStatus": "A", "branchLink": "", "gameSubtype": "",
+        "isNeutral": False,
+        "pointsLeaders": [{"personId": 200000 + i, "firstName": "Nome", "lastName": "Sobrenome",
+                           "teamId": 1610612700 + i % 30, "teamCity": "Cidade", "teamName": "Time",
+                           "teamTricode": "TST", "points": 30.0}],
+    })
+    completo["broadcasters"] = {chave: list(transmissoras) for chave in (
+        "nationalBroadcasters", "nationalRadioBroadcasters", "nationalOttBroadcasters",
+        "homeTvBroadcasters", "homeRadioBroadcasters", "homeOttBroadcasters",
+        "awayTvBroadcasters", "awayRadioBroadcasters", "awayOttBroadcasters",
+        "intlRadioBroadcasters", "intlTvBroadcasters", "intlOttBroadcasters")}
+    for lado in ("homeTeam", "awayTeam"):
+        completo[lado] = dict(jogo[lado], teamId=1610612700 + i % 30, teamSlug="time",
+                              wins=0, losses=0, score=0, seed=None)
+    return completo
+
+
+def calendario_da_cdn(n_jogos=1300):
+    """gameDates do calendario_sintetico com os jogos completos, como no
+    scheduleLeagueV2_1.json."""
+    datas = calendario_sintetico(n_jogos)
+    i = 0
+    for dia in datas:
+        dia["games"] = [jogo_como_na_cdn(jogo, i + k) for k, jogo in enumerate(dia["games"])]
+        i += len(dia["games"])
+    return datas
+
+
+def salvar_calendario(caminho, datas):
+    """Grava `datas` em `caminho` com o envelope do scheduleLeagueV2_1.json."""
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump({"meta": {"version": 1}, "leagueSchedule": {
+            "seasonYear": "2025-26", "leagueId": "00", "gameDates": datas,
+            "weeks": [{"weekNumber": n, "weekName": f"Week {n}"} for n in range(1, 27)]}}, f)
+
+
+def jogos_do_dia_antigo(datas, agora_utc):
+    """Versão antiga de jogos_do_dia: varre a temporada inteira em Python."""
+    agora_local = agora_utc - timedelta(hours=3)
+    hoje_local = agora_local.date()
+    amanha_local = hoje_local + timedelta(days=1)
+    jogos = []
+    for dia in datas:
+        for jogo in dia["games"]:
+            dt_utc = datetime.fromisoformat(jogo["gameDateTimeUTC"].replace("Z", ""))
+            dt_local = dt_utc - timedelta(hours=3)
+            if dt_local.date() == hoje_local or (dt_local.date() == amanha_local and dt_local.hour < 2):
+                jogos.append((jogo, dt_local))
+    return jogos
+
+
+# ----------------------------
+# CDN da NBA e API do Telegram falsas
+# ----------------------------
+class ServidorCDN:
+    """Substituto local da cdn.nba.com: serve JSONs com ETag, responde 304
+    a GETs condicionais e conta requisições, conexões e bytes enviados."""
+
+    def __init__(self, arquivos):
+        self.arquivos = arquivos          # caminho -> objeto JSON
+        self.falhar = False
+        self.latencia = 0                 # segundos antes de cada resposta
+        self.requisicoes = 0
+        self.conexoes = 0
+        self.bytes_enviados = 0
+        cdn = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # cabeçalho e corpo saem em writes separados: sem isso, cada
+            # resposta no keep-alive espera o ACK atrasado do cliente (~40 ms)
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                cdn.conexoes += 1
+                super().setup()
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                cdn.requisicoes += 1
+                if cdn.latencia:
+                    time.sleep(cdn.latencia)
+                obj = cdn.arquivos.get(self.path)
+                if cdn.falhar or obj is None:
+                    self.send_response(503 if cdn.falhar else 404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                corpo = json.dumps(obj).encode()
+                etag = '"' + hashlib.md5(corpo).hexdigest() + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(corpo)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(corpo)
+                cdn.bytes_enviados += len(corpo)
+
+        self.servidor = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.servidor.server_address[1]}"
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+
+    def contadores(self):
+        return self.requisicoes, self.conexoes, self.bytes_enviados
+
+    def parar(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+
+def scoreboard_da_noite(inicio, agora):
+    """Scoreboard de uma noite de 3 jogos no instante `agora` (epoch): o
+    primeiro termina às inicio+2h10m37s e tem o placar corrigido 5 min depois,
+    o segundo vai para a prorrogação ("Final/OT"), o terceiro começa 1h depois."""
+    jogos = []
+    for i, (atraso, duracao, texto_final, placar) in enumerate([
+        (0, 130, "Final", (100, 101)),
+        (30, 145, "Final/OT", (112, 108)),
+        (60, 130, "Final", (95, 99)),
+    ]):
+        dica = inicio + atraso * 60
+        fim = dica + duracao * 60 + 37
+        if agora < dica:
+            estado, periodo, texto, pm, pv = 1, 0, "7:00 pm ET", 0, 0
+        elif agora < fim:
+            decorrido = agora - dica
+            periodo = 5 if decorrido >= 130 * 60 else min(4, 1 + decorrido // 1800)
+            estado, texto = 2, f"Q{periodo}" if periodo <= 4 else "OT"
+            pm, pv = placar[0] * decorrido // (fim - dica), placar[1] * decorrido // (fim - dica)
+        else:
+            estado, texto = 3, texto_final
+            periodo = 5 if texto_final == "Final/OT" else 4
+            pm, pv = placar
+            if i == 0 and agora >= fim + 300:
+                pm, pv = 103, 101
+        jogos.append({
+            "gameId": f"00224{i:05d}", "gameStatus": estado, "gameStatusText": texto,
+            "period": periodo, "gameTimeUTC": datetime.utcfromtimestamp(dica).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "homeTeam": {"score": pm}, "awayTeam": {"score": pv},
+        })
+    return {"scoreboard": {"games": jogos}}
+
+
+class ServidorBotAPI:
+    """Substituto local da API de bots do Telegram (use com
+    Bot(token, base_url=servidor.url + "/bot")). Aplica limites de flood
+    como o Telegram (HTTP 429 com retry_after), com latência fixa, e
+    registra as mensagens aceitas em ordem de chegada."""
+
+    def __init__(self, latencia=0.05, por_chat=20, janela_chat=60.0, por_segundo=30):
+        self.latencia = latencia
+        self.por_chat = por_chat
+        self.janela_chat = janela_chat
+        self.por_segundo = por_segundo
+        self.aceitas = []                 # (método, chat_id, parâmetros, message_id)
+        self.recusadas_429 = 0
+        self.updates = []                 # entregues por getUpdates (long polling)
+        self._novos_updates = threading.Condition()
+        self._envios_chat = {}
+        self._envios_global = []
+        self._lock = threading.Lock()
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                corpo = self.rfile.read(int(self.headers.get("Content-Length") or 0)).decode()
+                if "json" in (self.headers.get("Content-Type") or ""):
+                    params = json.loads(corpo or "{}")
+                else:
+                    from urllib.parse import parse_qsl
+                    params = dict(parse_qsl(corpo))
+                metodo = self.path.rsplit("/", 1)[-1]
+                # o limite conta na chegada; a latência vem depois
+                status, resposta = api._responder(metodo, params)
+                if metodo != "getUpdates":
+                    time.sleep(api.latencia)
+                dados = json.dumps(resposta).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(dados)))
+                self.end_headers()
+                try:
+                    self.wfile.write(dados)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass    # cliente desistiu de um getUpdates ao encerrar
+
+        self.servidor = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.servidor.server_address[1]}"
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+
+    def adicionar_update(self, update):
+        with self._novos_updates:
+            self.updates.append(update)
+            self._novos_updates.notify_all()
+
+    def _get_updates(self, params):
+        offset = int(params.get("offset") or 0)
+        limite = int(params.get("limit") or 100)
+        fim = time.monotonic() + float(params.get("timeout") or 0)
+        with self._novos_updates:
+            while True:
+                prontos = [u for u in self.updates if u["update_id"] >= offset][:limite]
+                espera = fim - time.monotonic()
+                if prontos or espera <= 0:
+                    return 200, {"ok": True, "result": prontos}
+                self._novos_updates.wait(espera)
+
+    def _responder(self, metodo, params):
+        if metodo == "getMe":
+            return 200, {"ok": True, "result": {
+                "id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}}
+        if metodo == "getUpdates":
+            return self._get_updates(params)
+        if metodo in ("setWebhook", "deleteWebhook", "answerCallbackQuery"):
+            return 200, {"ok": True, "result": True}
+
+        chat_id = int(params.get("chat_id", 0))
+        with self._lock:
+            agora = time.monotonic()
+            envios = [t for t in self._envios_chat.get(chat_id, []) if t > agora - self.janela_chat]
+            self._envios_global = [t for t in self._envios_global if t > agora - 1]
+            if len(envios) >= self.por_chat or len(self._envios_global) >= self.por_segundo:
+                self.recusadas_429 += 1
+                espera = max(1, int(envios[0] + self.janela_chat - agora + 1)) if envios else 1
+                return 429, {"ok": False, "error_code": 429,
+                             "description": f"Too Many Requests: retry after {espera}",
+                             "parameters": {"retry_after": espera}}
+            envios.append(agora)
+            self._envios_chat[chat_id] = envios
+            self._envios_global.append(agora)
+            message_id = 50_000 + len(self.aceitas)
+            self.aceitas.append((metodo, chat_id, params, message_id))
+
+        if metodo == "pinChatMessage":
+            return 200, {"ok": True, "result": True}
+        if metodo == "stopPoll":
+            return 200, {"ok": True, "result": {
+                "id": "1", "question": "?", "options": [], "total_voter_count": 0,
+                "is_closed": True, "is_anonymous": False, "type": "regular",
+                "allows_multiple_answers": False}}
+        return 200, {"ok": True, "result": {
+            "message_id": message_id, "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "supergroup"}}}
+
+    def parar(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+
+class BotFalso:
+    """Bot do Telegram falso: registra (método, horário, kwargs) de cada chamada."""
+
+    def __init__(self):
+        self.chamadas = []
+
+    def __getattr__(self, metodo):
+        async def chamar(**kwargs):
+            self.chamadas.append((metodo, time.time(), kwargs))
+            n = len(self.chamadas)
+            return SimpleNamespace(message_id=90_000 + n, poll=SimpleNamespace(id=f"poll{n}"))
+        return chamar
+
+
+# ----------------------------
+# Versões antigas (referência)
+# ----------------------------
+SQL_AGRUPAMENTO_ANTIGO = """
+    SELECT u.apelido, COUNT(v.id_voto) as total_votos,
+           SUM(CASE WHEN v.escolha = j.vencedor THEN 1 ELSE 0 END) as acertos
+    FROM USUARIO_PARTICIPANTE u
+    LEFT JOIN VOTO v ON u.id_usuario_participante = v.id_usuario_participante
+    LEFT JOIN ENQUETE e ON v.id_enquete = e.id_enquete
+    LEFT JOIN JOGO j ON e.id_jogo = j.id_jogo
+    WHERE j.vencedor IS NOT NULL
+    GROUP BY u.id_usuario_participante
+    HAVING COUNT(v.id_voto) > 0
+    ORDER BY acertos DESC, total_votos DESC
+"""
+
+SQL_JOIN_COMPLEXO_ANTIGO = """
+    SELECT u.apelido, COUNT(v.id_voto) as total_votos
+    FROM USUARIO_PARTICIPANTE u
+    LEFT JOIN VOTO v ON u.id_usuario_participante = v.id_usuario_participante
+    GROUP BY u.id_usuario_participante
+"""
+
+SQL_BUSCA_ANTIGA = """
+    SELECT * FROM USUARIO_PARTICIPANTE
+    WHERE LOWER(apelido) LIKE LOWER(?)
+"""
@@ -0,0 +1,234 @@
+"""
+Arquivamento de temporadas encerradas.
+
+Move os jogos, enquetes e votos de uma temporada encerrada do nba.db para
+um arquivo só dela (nba_2024.db, ao lado do banco), para o banco do dia a
+dia — e o WAL, e as consultas do bot — não crescerem a cada temporada. O
+que continua no banco: usuários, pontuação acumulada (ranking geral) e
+ESTATISTICA_USUARIO (inclusive as linhas das temporadas arquivadas, que
+alimentam os relatórios de consultas.py).
+
+Os arquivos são anexados (ATTACH, só leitura) a cada conexão do
+database.py, para os cálculos que precisam de todas as temporadas.
+
+Com vários grupos (GROUP_IDS, veja grupos.py), cada banco de grupo é
+arquivado junto, nos arquivos dele (nba_<id>_2024.db).
+
+Uso:
+    python arquivo.py                      # temporadas no banco e arquivadas
+    python arquivo.py --arquivar           # arquiva todas as encerradas
+    python arquivo.py --arquivar 2023 2024 # só essas
+    python arquivo.py --arquivar --vacuum  # e devolve o espaço ao disco
+"""
+import argparse
+import os
+import sqlite3
+
+import database
+from database import transacao
+from grupos import em_cada_grupo
+
+# Linhas de cada tabela que pertencem à temporada ?1, na ordem de cópia
+# (a remoção do banco é na ordem inversa, por causa das chaves estrangeiras)
+ESCOPO = (
+    ("JOGO", "temporada = ?1"),
+    ("ENQUETE", "id_jogo IN (SELECT id_jogo FROM main.JOGO WHERE temporada = ?1)"),
+    ("VOTO", """id_enquete IN (
+        SELECT e.id_enquete FROM main.ENQUETE e
+        JOIN main.JOGO j ON j.id_jogo = e.id_jogo
+        WHERE j.temporada = ?1
+    )"""),
+)
+
+# Índices do arquivo, para as leituras entre temporadas
+INDICES_ARQUIVO = (
+    "CREATE UNIQUE INDEX {esquema}.pk_jogo ON JOGO (id_jogo)",
+    "CREATE UNIQUE INDEX {esquema}.pk_enquete ON ENQUETE (id_enquete)",
+    "CREATE INDEX {esquema}.idx_enquete_jogo ON ENQUETE (id_jogo)",
+    "CREATE INDEX {esquema}.idx_voto_enquete ON VOTO (id_enquete, id_usuario_participante, escolha)",
+    "CREATE INDEX {esquema}.idx_voto_usuario ON VOTO (id_usuario_participante)",
+)
+
+
+def _contar(cur, esquema, temporada=None):
+    """Linhas de cada tabela do ESCOPO (no banco: só as da temporada)."""
+    contagens = {}
+    for tabela, filtro in ESCOPO:
+        if esquema == "main":
+            cur.execute(f"SELECT COUNT(*) FROM main.{tabela} WHERE {filtro}", (temporada,))
+        else:
+            cur.execute(f"SELECT COUNT(*) FROM {esquema}.{tabela}")
+        contagens[tabela] = cur.fetchone()[0]
+    return contagens
+
+
+def listar_temporadas():
+    """Temporadas no banco e arquivadas: lista de dicts com temporada,
+    local ("banco" ou o arquivo), jogos, enquetes e votos."""
+    database.anexar_arquivos()
+    arquivadas = database.temporadas_arquivadas()
+    temporadas = []
+    with transacao(escrita=False) as cur:
+        cur.execute("SELECT DISTINCT temporada FROM JOGO ORDER BY temporada")
+        for (temporada,) in cur.fetchall():
+            temporadas.append({"temporada": temporada, "local": "banco",
+                               **_contar(cur, "main", temporada)})
+        for temporada in sorted(arquivadas):
+            esquema = f"{database.PREFIXO_ARQUIVO}{temporada}"
+            temporadas.append({"temporada": temporada,
+                               "local": os.path.basename(database.caminho_arquivo(temporada)),
+                               **_contar(cur, esquema)})
+    return temporadas
+
+
+def motivo_para_nao_arquivar(cur, temporada):
+    """Por que a temporada não pode ser arquivada agora (None se pode)."""
+    if temporada in database.temporadas_arquivadas():
+        return "já arquivada"
+    cur.execute("""
+        SELECT MAX(temporada),
+               SUM(temporada = ?1),
+               SUM(temporada = ?1 AND vencedor IS NOT NULL AND pontuado = 0)
+        FROM JOGO
+    """, (temporada,))
+    atual, jogos, pendentes = cur.fetchone()
+    if not jogos:
+        return "sem jogos no banco"
+    if temporada >= atual:
+        return "é a temporada atual"
+    if pendentes:
+        return f"{pendentes} jogo(s) com resultado ainda não pontuado (rode atualizar_resultados.py)"
+    return None
+
+
+def temporadas_encerradas():
+    """Temporadas do banco que já podem ser arquivadas."""
+    with transacao(escrita=False) as cur:
+        cur.execute("SELECT DISTINCT temporada FROM JOGO ORDER BY temporada")
+        return [t for (t,) in cur.fetchall() if motivo_para_nao_arquivar(cur, t) is None]
+
+
+def arquivar_temporada(temporada):
+    """Move a temporada para o arquivo dela. Retorna as contagens movidas.
+
+    São duas transações: a cópia para o arquivo e, conferida a cópia, a
+    remoção do banco junto com o registro na META. O SQLite não garante
+    atomicidade entre bancos anexados em modo WAL, então não dá para
+    confiar numa transação só; se algo falhar no meio, o arquivo fica sem
+    registro (ninguém o lê) e basta rodar de novo, que ele é refeito.
+    Levanta ValueError se a temporada não pode ser arquivada.
+    """
+    conn = database.obter_conexao()
+    caminho = database.caminho_arquivo(temporada)
+
+    # 1) cópia, num arquivo anexado como "novo" (ATTACH fora de transação)
+    conn.execute("ATTACH DATABASE ? AS novo", (caminho,))
+    try:
+        with transacao() as cur:
+            motivo = motivo_para_nao_arquivar(cur, temporada)
+            if motivo:
+                raise ValueError(f"Temporada {temporada} não pode ser arquivada: {motivo}")
+            for tabela, filtro in ESCOPO:
+                cur.execute(f"DROP TABLE IF EXISTS novo.{tabela}")
+                cur.execute(f"CREATE TABLE novo.{tabela} AS SELECT * FROM main.{tabela} WHERE {filtro}",
+                            (temporada,))
+            for indice in INDICES_ARQUIVO:
+                cur.execute(indice.format(esquema="novo"))
+            copiados = _contar(cur, "novo")
+    finally:
+        conn.execute("DETACH DATABASE novo")
+
+    # confere o que chegou ao disco, por uma conexão separada
+    with sqlite3.connect(caminho) as arquivo:
+        no_disco = {tabela: arquivo.execute(f"SELECT COUNT(*) FROM {tabela}").fetchone()[0]
+                    for tabela, _ in ESCOPO}
+    arquivo.close()
+    if no_disco != copiados:
+        raise RuntimeError(f"Cópia de {caminho} incompleta: {no_disco} != {copiados}")
+
+    # 2) remoção do banco + registro, se nada mudou desde a cópia
+    with transacao() as cur:
+        if _contar(cur, "main", temporada) != copiados:
+            raise RuntimeError(f"A temporada {temporada} mudou durante o arquivamento; rode de novo")
+        cur.execute("SELECT MAX(ordem_apuracao) FROM JOGO WHERE temporada = ?", (temporada,))
+        ordem = cur.fetchone()[0] or 0
+        for tabela, filtro in reversed(ESCOPO):
+            cur.execute(f"DELETE FROM main.{tabela} WHERE {filtro}", (temporada,))
+        cur.execute("""
+            INSERT INTO META (chave, valor) VALUES (?, ?)
+            ON CONFLICT (chave) DO UPDATE SET valor = excluded.valor
+        """, (f"arquivo:{temporada}", os.path.basename(caminho)))
+        # a numeração da apuração continua depois dos jogos arquivados
+        cur.execute("""
+            INSERT INTO META (chave, valor) VALUES ('ordem_apuracao_arquivada', ?1)
+            ON CONFLICT (chave) DO UPDATE SET valor = MAX(valor, ?1)
+        """, (ordem,))
+
+    database.cache_enquetes.invalidar()
+    database.anexar_arquivos()
+    return copiados
+
+
+def compactar():
+    """Devolve ao disco o espaço liberado no banco (VACUUM + checkpoint do WAL)."""
+    conn = database.obter_conexao()
+    conn.execute("VACUUM main")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def _tamanho(caminho):
+    return sum(os.path.getsize(c) for c in (caminho, caminho + "-wal") if os.path.exists(c))
+
+
+def arquivar(temporadas=None, vacuum=False):
+    """Arquiva no banco atual as `temporadas` (sem nenhuma: todas as
+    encerradas) e, com `vacuum`, compacta o banco.
+
+    Retorna {"arquivadas": [(temporada, caminho, movidos)], "recusadas":
+    [motivo], "tamanho": (bytes antes, bytes depois)}.
+    """
+    banco = database.banco_atual()
+    r = {"arquivadas": [], "recusadas": [], "tamanho": (_tamanho(banco), None)}
+    for temporada in temporadas or temporadas_encerradas():
+        try:
+            movidos = arquivar_temporada(temporada)
+        except ValueError as e:
+            r["recusadas"].append(str(e))
+            continue
+        r["arquivadas"].append((temporada, database.caminho_arquivo(temporada), movidos))
+    if vacuum:
+        compactar()
+    r["tamanho"] = (r["tamanho"][0], _tamanho(banco))
+    return r
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Arquiva temporadas encerradas.")
+    parser.add_argument("--arquivar", nargs="*", type=int, metavar="TEMPORADA",
+                        help="temporadas a arquivar (sem nenhuma: todas as encerradas)")
+    parser.add_argument("--vacuum", action="store_true",
+                        help="compacta o banco depois de arquivar")
+    args = parser.parse_args()
+
+    # cada grupo tem o seu banco e os seus arquivos (nba_<id>_2024.db)
+    em_cada_grupo(database.create_tables)
+
+    if args.arquivar is not None:
+        for grupo, r in em_cada_grupo(arquivar, args.arquivar, args.vacuum):
+            banco = grupo.banco or database.DB_NAME
+            if not r["arquivadas"] and not r["recusadas"]:
+                print(f"Nenhuma temporada encerrada para arquivar em {banco}.")
+            for motivo in r["recusadas"]:
+                print(f"⚠️ {banco}: {motivo}")
+            for temporada, caminho, movidos in r["arquivadas"]:
+                print(f"📦 Temporada {temporada} -> {caminho}: "
+                      f"{movidos['JOGO']} jogos, {movidos['ENQUETE']} enquetes, {movidos['VOTO']} votos")
+            if args.vacuum:
+                antes, depois = r["tamanho"]
+                print(f"🧹 {banco}: {antes / 1e6:.1f} MB -> {depois / 1e6:.1f} MB")
+
+    for grupo, temporadas in em_cada_grupo(listar_temporadas):
+        print(f"🏀 Temporadas ({grupo.banco or database.DB_NAME})")
+        for t in temporadas:
+            print(f"   • {t['temporada']} ({t['local']}): {t['JOGO']} jogos, "
+                  f"{t['ENQUETE']} enquetes, {t['VOTO']} votos")
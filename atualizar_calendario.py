@@ -1,63 +1,45 @@
-import os
-from datetime import datetime
-from get_nba import obter_calendario_completo
-from database import inserir_jogo
+import calendario
+from get_nba import compactar_jogos, obter_jogos_temporada
+from database import sincronizar_jogos
+from grupos import em_cada_grupo
 
 """
 Atualiza a tabela JOGO com TODOS os jogos da temporada NBA.
 Este arquivo é compatível com o modelo físico final do projeto.
+O calendário é baixado uma vez e gravado no banco de cada grupo (grupos.py).
 """
 
-def atualizar_calendario():
-    datas = obter_calendario_completo()
-
-    total_processados = 0
-    total_erros = 0
-
-    for dia in datas:
-        for jogo in dia["games"]:
-            try:
-                game_id = jogo["gameId"]
-
-                # data e hora em UTC (preciso para conversão posterior)
-                game_datetime_utc = jogo.get("gameDateTimeUTC")
-                if not game_datetime_utc:
-                    print(f"⚠️ Jogo {game_id} sem campo gameDateTimeUTC — ignorado.")
-                    total_erros += 1
-                    continue
-
-                dt_utc = datetime.fromisoformat(game_datetime_utc.replace("Z", ""))
-                data_utc = dt_utc.strftime("%Y-%m-%d")
-                hora_utc = dt_utc.strftime("%H:%M:%S")
-
-                home = jogo["homeTeam"]
-                away = jogo["awayTeam"]
-
-                mandante = f"{home['teamCity']} {home['teamName']}"
-                visitante = f"{away['teamCity']} {away['teamName']}"
-
-                status = jogo.get("gameStatusText", "scheduled")
-
-                inserir_jogo(
-                    game_id_nba=game_id,
-                    mandante=mandante,
-                    visitante=visitante,
-                    data_utc=data_utc,
-                    hora_utc=hora_utc,
-                    status=status
-                )
-
-                total_processados += 1
-
-            except Exception as e:
-                print(f"❌ Erro ao processar jogo {game_id}: {e}")
-                total_erros += 1
+def atualizar_calendario(datas=None):
+    """Sincroniza a tabela JOGO com o calendário da temporada. Sem `datas`
+    (as gameDates já carregadas), baixa o calendário e o lê em fluxo."""
+    if datas is None:
+        jogos, erros = obter_jogos_temporada()
+    else:
+        erros = []
+        jogos = list(compactar_jogos((jogo for dia in datas for jogo in dia["games"]), erros))
+    total_erros = len(erros)
+
+    # índice em memória do processo: só os jogos que mudaram são refeitos
+    # (um download que falhou não esvazia o índice)
+    alterados_no_indice = calendario.indice.atualizar(jogos, completo=datas is None and bool(jogos))
+
+    # grava tudo de uma vez, só o que mudou desde a última sincronização
+    # (em cada banco; os números abaixo somam todos)
+    por_grupo = em_cada_grupo(sincronizar_jogos, jogos)
+    resultado = {chave: sum(r[chave] for _, r in por_grupo) for chave in por_grupo[0][1]}
 
     print("="*50)
     print("🏀 CALENDÁRIO DA NBA ATUALIZADO")
-    print(f"   • Jogos processados: {total_processados}")
+    print(f"   • Jogos processados: {len(jogos)}")
+    print(f"   • Novos: {resultado['inseridos']}")
+    print(f"   • Atualizados: {resultado['atualizados']}")
+    print(f"   • Sem mudança: {resultado['inalterados']}")
     print(f"   • Jogos ignorados / erro: {total_erros}")
+    print(f"   • Alterados no índice em memória: {len(alterados_no_indice)}")
+    if len(por_grupo) > 1:
+        print(f"   • Bancos atualizados: {len(por_grupo)} grupos")
     print("="*50)
+    return resultado
 
 
 if __name__ == "__main__":
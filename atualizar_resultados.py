@@ -1,59 +1,54 @@
-from database import connect, atualizar_pontuacao
+from database import registrar_resultados
 from get_nba import obter_json_nba
+from grupos import em_cada_grupo
 
-def atualizar():
-    dados = obter_json_nba()
-    jogos = dados["scoreboard"]["games"]
-
-    conn = connect()
-    cur = conn.cursor()
+# gameStatus do scoreboard
+JOGO_AGENDADO, JOGO_AO_VIVO, JOGO_FINALIZADO = 1, 2, 3
 
-    for g in jogos:
-        if g["gameStatusText"] != "Final":
-            continue
 
-        game_id = g["gameId"]
-        mandante = g["homeTeam"]["teamTricode"]
-        visitante = g["awayTeam"]["teamTricode"]
+def estado_do_jogo(g):
+    """gameStatus do jogo (1 agendado, 2 ao vivo, 3 finalizado). Sem o
+    campo, vale o texto: "Final" e "Final/OT" são finalizados."""
+    estado = g.get("gameStatus")
+    if estado in (JOGO_AGENDADO, JOGO_AO_VIVO, JOGO_FINALIZADO):
+        return estado
+    return JOGO_FINALIZADO if g.get("gameStatusText", "").startswith("Final") else JOGO_AGENDADO
 
-        pm = g["homeTeam"]["score"]
-        pv = g["awayTeam"]["score"]
-        vencedor = "M" if pm > pv else "V"
 
-        # atualiza jogo
-        cur.execute("""
-            UPDATE JOGO
-            SET vencedor=?, placar_mandante=?, placar_visitante=?
-            WHERE game_id_nba=?
-        """, (vencedor, pm, pv, game_id))
+def resultado_do_jogo(g):
+    """(game_id, vencedor, placar_mandante, placar_visitante) de um jogo
+    finalizado do scoreboard, ou None."""
+    if estado_do_jogo(g) != JOGO_FINALIZADO:
+        return None
+    pm = g["homeTeam"]["score"]
+    pv = g["awayTeam"]["score"]
+    return g["gameId"], "M" if pm > pv else "V", pm, pv
 
-        # buscar enquete
-        cur.execute("""
-            SELECT id_enquete FROM ENQUETE 
-            WHERE id_jogo=(SELECT id_jogo FROM JOGO WHERE game_id_nba=?)
-        """, (game_id,))
-        row = cur.fetchone()
 
-        if not row:
-            continue
+def gravar_resultados(resultados):
+    """Grava os resultados e pontua os jogos novos numa única transação por
+    banco (o placar baixado uma vez vale para todos os grupos); gravar de
+    novo o mesmo resultado não pontua duas vezes. Retorna (totais somados,
+    número de grupos)."""
+    por_grupo = em_cada_grupo(registrar_resultados, resultados)
+    r = {chave: sum(res[chave] for _, res in por_grupo) for chave in por_grupo[0][1]}
+    return r, len(por_grupo)
 
-        enquete_id = row[0]
 
-        # votos
-        cur.execute("""
-            SELECT id_usuario_participante, escolha 
-            FROM VOTO WHERE id_enquete=?
-        """, (enquete_id,))
-        votos = cur.fetchall()
+def atualizar():
+    dados = obter_json_nba()
+    jogos = dados["scoreboard"]["games"]
 
-        for uid, escolha in votos:
-            acertou = escolha == vencedor
-            atualizar_pontuacao(uid, acertou)
+    resultados = [r for r in map(resultado_do_jogo, jogos) if r is not None]
+    r, grupos = gravar_resultados(resultados)
 
-    conn.commit()
-    conn.close()
-    print("Resultados atualizados!")
+    print(
+        f"Resultados atualizados! {r['gravados']} jogo(s) gravado(s), "
+        f"{r['jogos_pontuados']} pontuado(s), {r['corrigidos']} corrigido(s)"
+        + (f" em {grupos} grupos." if grupos > 1 else ".")
+    )
+    return r
 
 
 if __name__ == "__main__":
-    atualizar()
\ No newline at end of file
+    atualizar()
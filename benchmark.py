@@ -0,0 +1,1614 @@
+"""
+Micro-benchmarks do bot. Rodam sempre num banco temporário, nunca no nba.db.
+Só medem tempos; o comportamento é conferido pelos testes (tests/, pytest).
+
+Uso:
+    python benchmark.py            # roda todos
+    python benchmark.py conexao    # roda só um
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import database
+from apoio_bench import (SQL_AGRUPAMENTO_ANTIGO, SQL_BUSCA_ANTIGA, SQL_JOIN_COMPLEXO_ANTIGO,
+                         BotFalso, ServidorBotAPI, ServidorCDN, banco_temporario,
+                         calendario_da_cdn, calendario_sintetico, contexto, grupo_unico,
+                         importar_main, jogos_do_dia_antigo, medir_com_lock, popular, popular_votos,
+                         query_voto, salvar_calendario, scoreboard_da_noite, segurar_lock,
+                         update_json_comando, update_json_resposta, update_mensagem)
+
+
+def _resumo(nome, amostras):
+    """Imprime média, p50 e p99 (em microssegundos) de uma lista de tempos."""
+    amostras = sorted(amostras)
+    p50 = amostras[len(amostras) // 2]
+    p99 = amostras[min(len(amostras) - 1, int(len(amostras) * 0.99))]
+    print(
+        f"   • {nome:<28} média {statistics.mean(amostras) * 1e6:8.1f} µs"
+        f" | p50 {p50 * 1e6:8.1f} µs | p99 {p99 * 1e6:8.1f} µs"
+    )
+    return statistics.mean(amostras)
+
+
+def _registrar_voto_por_conexao(id_usuario, id_enquete, escolha):
+    """Versão antiga de registrar_voto: abre, aplica PRAGMAs, commita e fecha."""
+    conn = sqlite3.connect(database.DB_NAME, timeout=5)
+    conn.execute("PRAGMA foreign_keys = ON;")
+    conn.execute("PRAGMA journal_mode = WAL;")
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO VOTO (id_usuario_participante, id_enquete, escolha, data_hora)
+        VALUES (?, ?, ?, ?)
+    """, (id_usuario, id_enquete, escolha, datetime.utcnow().isoformat()))
+    cur.execute("""
+        UPDATE USUARIO_PARTICIPANTE
+        SET frequencia_participacao = frequencia_participacao + 1
+        WHERE id_usuario_participante = ?
+    """, (id_usuario,))
+    conn.commit()
+    conn.close()
+
+
+def _buscar_enquete_por_conexao(message_id):
+    """Versão antiga da busca feita em main.votar / main.callback_voto."""
+    conn = sqlite3.connect(database.DB_NAME, timeout=5)
+    conn.execute("PRAGMA foreign_keys = ON;")
+    conn.execute("PRAGMA journal_mode = WAL;")
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT e.id_enquete, j.time_visitante, j.time_mandante
+        FROM ENQUETE e
+        JOIN JOGO j ON j.id_jogo = e.id_jogo
+        WHERE e.message_id = ?
+    """, (message_id,))
+    row = cur.fetchone()
+    conn.close()
+    return row
+
+
+def bench_conexao(n_usuarios=500, n_jogos=4):
+    """Latência por chamada: conexão por chamada (antes) x conexão longa (depois)."""
+    banco_temporario()
+    enquetes = popular(n_usuarios, n_jogos)
+    metade = n_usuarios // 2
+
+    print(f"\n📊 conexao — {n_usuarios} usuários x {n_jogos} enquetes")
+
+    antes, depois = [], []
+    for id_enquete in enquetes:
+        for uid in range(1, metade + 1):
+            t0 = time.perf_counter()
+            _registrar_voto_por_conexao(uid, id_enquete, "M")
+            antes.append(time.perf_counter() - t0)
+        for uid in range(metade + 1, n_usuarios + 1):
+            t0 = time.perf_counter()
+            database.registrar_voto(uid, id_enquete, "V")
+            depois.append(time.perf_counter() - t0)
+
+    m_antes = _resumo("registrar_voto (antes)", antes)
+    m_depois = _resumo("registrar_voto (depois)", depois)
+    print(f"     ganho: {m_antes / m_depois:.1f}x")
+
+    antes, depois = [], []
+    for _ in range(5):
+        for message_id in range(10_000, 10_000 + n_jogos):
+            t0 = time.perf_counter()
+            _buscar_enquete_por_conexao(message_id)
+            antes.append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            database.buscar_enquete(message_id)
+            depois.append(time.perf_counter() - t0)
+
+    m_antes = _resumo("buscar_enquete (antes)", antes)
+    m_depois = _resumo("buscar_enquete (depois)", depois)
+    print(f"     ganho: {m_antes / m_depois:.1f}x")
+
+
+def bench_handlers_assincronos(n_usuarios=200, segundos_lock=1.0):
+    """Latência dos handlers enquanto outro processo segura o lock de escrita."""
+    banco_temporario()
+    popular(n_usuarios, 1)
+    main = importar_main()
+
+    print(f"\n📊 handlers_assincronos — lock externo por {segundos_lock:.1f}s")
+
+    # referência: mesmos handlers chamando o sqlite3 direto no event loop
+    async def start_sincrono(update, context):
+        user = update.message.from_user
+        database.registrar_usuario(user.id, user.username)
+        await update.message.reply_text("ok")
+
+    async def ranking_sincrono(update, context):
+        database.listar_ranking()
+        await update.message.reply_text("ok")
+
+    with database.transacao() as cur:
+        cur.execute("DELETE FROM USUARIO_PARTICIPANTE WHERE telegram_user_id = 999999")
+    latencias, atrasos = asyncio.run(medir_com_lock(start_sincrono, ranking_sincrono, segundos_lock))
+    _resumo("/ranking (sqlite no loop)", latencias)
+    print(f"     maior atraso do event loop: {max(atrasos) * 1000:.0f} ms")
+
+    with database.transacao() as cur:
+        cur.execute("DELETE FROM USUARIO_PARTICIPANTE WHERE telegram_user_id = 999999")
+    latencias, atrasos = asyncio.run(medir_com_lock(main.start, main.ranking, segundos_lock))
+    _resumo("/ranking (database_async)", latencias)
+    print(f"     maior atraso do event loop: {max(atrasos) * 1000:.0f} ms")
+
+
+def bench_fila_votos(n_usuarios=2000, n_jogos=2):
+    """Vazão de ingestão (votos/s): commit por voto x fila com gravação em lote."""
+    from database_async import escrever
+    from fila_votos import FilaVotos
+
+    print(f"\n📊 fila_votos — {n_usuarios} usuários votando em {n_jogos} enquetes")
+
+    async def commit_por_voto(enquetes):
+        await asyncio.gather(*(
+            escrever(database.registrar_voto, uid, id_enquete, "M")
+            for id_enquete in enquetes
+            for uid in range(1, n_usuarios + 1)
+        ))
+
+    async def em_lote(enquetes, fila):
+        await fila.iniciar()
+        await asyncio.gather(*(
+            fila.registrar(uid, id_enquete, "M")
+            for id_enquete in enquetes
+            for uid in range(1, n_usuarios + 1)
+        ))
+        await fila.encerrar()
+
+    total = n_usuarios * n_jogos
+
+    banco_temporario()
+    enquetes = popular(n_usuarios, n_jogos)
+    t0 = time.perf_counter()
+    asyncio.run(commit_por_voto(enquetes))
+    antes = total / (time.perf_counter() - t0)
+    print(f"   • commit por voto              {antes:10.0f} votos/s")
+
+    pasta = os.path.dirname(banco_temporario())
+    enquetes = popular(n_usuarios, n_jogos)
+    fila = FilaVotos(arquivo=os.path.join(pasta, "pendentes.jsonl"))
+    t0 = time.perf_counter()
+    asyncio.run(em_lote(enquetes, fila))
+    depois = total / (time.perf_counter() - t0)
+    print(f"   • fila com gravação em lote    {depois:10.0f} votos/s  ({depois / antes:.1f}x)")
+
+    # um lote com um voto numa enquete que não existe mais
+    fila = FilaVotos(arquivo=os.path.join(pasta, "pendentes_recusa.jsonl"))
+
+    async def com_voto_invalido():
+        await fila.iniciar()
+        for uid in range(1, 101):
+            await fila.responder(uid, 999_999 if uid == 50 else enquetes[0], "V")
+        t0 = time.perf_counter()
+        await fila.descarregar()
+        ms = (time.perf_counter() - t0) * 1000
+        await fila.encerrar()
+        return ms
+
+    ms = asyncio.run(com_voto_invalido())
+    print(f"   • lote com 1 voto inválido     {ms:10.1f} ms  (isolado em {os.path.basename(fila.arquivo_recusados)})")
+
+
+def _inserir_jogo_por_conexao(game_id_nba, mandante, visitante, data_utc, hora_utc, status):
+    """Versão antiga de inserir_jogo: uma conexão e um commit por jogo."""
+    conn = sqlite3.connect(database.DB_NAME, timeout=5)
+    conn.execute("PRAGMA foreign_keys = ON;")
+    conn.execute("PRAGMA journal_mode = WAL;")
+    conn.execute("""
+        INSERT OR IGNORE INTO JOGO (game_id_nba, time_mandante, time_visitante, data_utc, hora_utc, status)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (game_id_nba, mandante, visitante, data_utc, hora_utc, status))
+    conn.commit()
+    conn.close()
+
+
+def bench_calendario(n_jogos=1300):
+    """Sincronização da temporada: um commit por jogo x upsert em lote com hash."""
+    from contextlib import redirect_stdout
+    from io import StringIO
+    from atualizar_calendario import atualizar_calendario
+
+    datas = calendario_sintetico(n_jogos)
+    print(f"\n📊 calendario — {n_jogos} jogos")
+
+    banco_temporario()
+    t0 = time.perf_counter()
+    for dia in datas:
+        for j in dia["games"]:
+            dt = datetime.fromisoformat(j["gameDateTimeUTC"].replace("Z", ""))
+            _inserir_jogo_por_conexao(
+                j["gameId"],
+                f"{j['homeTeam']['teamCity']} {j['homeTeam']['teamName']}",
+                f"{j['awayTeam']['teamCity']} {j['awayTeam']['teamName']}",
+                dt.strftime("%Y-%m-%d"), dt.strftime("%H:%M:%S"), j["gameStatusText"],
+            )
+    print(f"   • um commit por jogo (antes)   {(time.perf_counter() - t0) * 1000:8.1f} ms")
+
+    banco_temporario()
+    conn = database.obter_conexao()
+    execucoes = [("carga inicial", None), ("sem mudanças", None), ("5 jogos remarcados", 5)]
+    for nome, remarcar in execucoes:
+        if remarcar:
+            for jogo in datas[3]["games"][:remarcar]:
+                dt = datetime.fromisoformat(jogo["gameDateTimeUTC"].replace("Z", ""))
+                jogo["gameDateTimeUTC"] = (dt + timedelta(minutes=15)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        escritas_antes = conn.total_changes
+        t0 = time.perf_counter()
+        with redirect_stdout(StringIO()):
+            r = atualizar_calendario(datas)
+        ms = (time.perf_counter() - t0) * 1000
+        print(
+            f"   • {nome:<28} {ms:8.1f} ms  | novos {r['inseridos']}, atualizados "
+            f"{r['atualizados']}, iguais {r['inalterados']}, linhas escritas "
+            f"{conn.total_changes - escritas_antes}"
+        )
+
+
+def bench_cache_http(n_jogos=1300, chamadas=5):
+    """Downloads do calendário: requests.get puro x sessão + cache condicional."""
+    import requests
+    import get_nba
+
+    cdn = ServidorCDN({"/schedule.json": {"leagueSchedule": {"gameDates": calendario_sintetico(n_jogos)}}})
+    url = cdn.url + "/schedule.json"
+    get_nba.URL_TEMPORADA = url
+    get_nba.PASTA_CACHE = tempfile.mkdtemp(prefix="nba_cache_")
+
+    print(f"\n📊 cache_http — calendário de {n_jogos} jogos, {chamadas} chamadas")
+
+    def medir(nome, func):
+        r0, c0, b0 = cdn.contadores()
+        t0 = time.perf_counter()
+        for _ in range(chamadas):
+            dados = func()
+        ms = (time.perf_counter() - t0) * 1000 / chamadas
+        r1, c1, b1 = cdn.contadores()
+        print(
+            f"   • {nome:<28} {ms:7.1f} ms/chamada | {r1 - r0} requisições, "
+            f"{c1 - c0} conexões, {(b1 - b0) / 1024:8.0f} KiB"
+        )
+        return dados, r1 - r0, b1 - b0
+
+    medir("requests.get (antes)", lambda: requests.get(url, timeout=20).json()["leagueSchedule"]["gameDates"])
+
+    get_nba.MAX_IDADE_CALENDARIO = 0
+    medir("revalidação (304)", get_nba.obter_calendario_completo)
+
+    get_nba.MAX_IDADE_CALENDARIO = 3600
+    medir("dentro do max-age", get_nba.obter_calendario_completo)
+
+    get_nba.MAX_IDADE_CALENDARIO = 0
+    cdn.falhar = True
+    from contextlib import redirect_stdout
+    from io import StringIO
+    with redirect_stdout(StringIO()):
+        dados, _, _ = medir("CDN fora do ar (stale)", get_nba.obter_calendario_completo)
+    print(f"   • {'CDN fora do ar (stale)':<28} devolveu {len(dados)} datas do cache")
+
+    cdn.parar()
+
+
+def bench_jogos_do_dia(n_jogos=1300):
+    """Jogos do dia: varredura do calendário baixado x consulta indexada no banco."""
+    from contextlib import redirect_stdout
+    from io import StringIO
+    importar_main()
+    import criar_enquetes_do_dia
+    from atualizar_calendario import atualizar_calendario
+
+    print(f"\n📊 jogos_do_dia — temporada de {n_jogos} jogos")
+
+    datas = calendario_sintetico(n_jogos)
+    banco_temporario()
+    with redirect_stdout(StringIO()):
+        atualizar_calendario(datas)
+
+    agora = datetime(2025, 11, 20, 18, 0)
+    t0 = time.perf_counter()
+    for _ in range(20):
+        jogos_do_dia_antigo(datas, agora)
+    print(f"   • varredura da temporada       {(time.perf_counter() - t0) * 1000 / 20:8.2f} ms")
+    t0 = time.perf_counter()
+    for _ in range(20):
+        criar_enquetes_do_dia.jogos_do_dia(agora)
+    print(f"   • consulta no banco            {(time.perf_counter() - t0) * 1000 / 20:8.2f} ms")
+
+
+def bench_pontuacao(n_usuarios=10_000, n_jogos=10):
+    """Pontuação de 100k votos: UPDATE por voto x UPDATE em conjunto idempotente."""
+    total = n_usuarios * n_jogos
+    resultados = [(f"00224{i:05d}", "M" if i % 2 else "V", 100 + i, 99) for i in range(n_jogos)]
+    print(f"\n📊 pontuacao — {total} votos em {n_jogos} jogos")
+
+    banco_temporario()
+    popular_votos(n_usuarios, n_jogos)
+    t0 = time.perf_counter()
+    with database.transacao() as cur:
+        # versão antiga: um UPDATE por voto certo, em toda execução
+        for game_id, vencedor, pm, pv in resultados:
+            cur.execute("""
+                UPDATE JOGO SET vencedor=?, placar_mandante=?, placar_visitante=?
+                WHERE game_id_nba=?
+            """, (vencedor, pm, pv, game_id))
+            cur.execute("""
+                SELECT v.id_usuario_participante, v.escolha
+                FROM VOTO v JOIN ENQUETE e ON e.id_enquete = v.id_enquete
+                JOIN JOGO j ON j.id_jogo = e.id_jogo WHERE j.game_id_nba = ?
+            """, (game_id,))
+            for uid, escolha in cur.fetchall():
+                if escolha == vencedor:
+                    cur.execute("""
+                        UPDATE USUARIO_PARTICIPANTE SET pontuacao = pontuacao + 1
+                        WHERE id_usuario_participante = ?
+                    """, (uid,))
+    print(f"   • UPDATE por voto (antes)      {(time.perf_counter() - t0) * 1000:8.1f} ms")
+
+    banco_temporario()
+    popular_votos(n_usuarios, n_jogos)
+    conn = database.obter_conexao()
+    for nome, func in [
+        ("em conjunto (depois)", lambda: database.registrar_resultados(resultados)),
+        ("rodando de novo", lambda: database.registrar_resultados(resultados)),
+        ("recálculo completo", database.recalcular_pontuacao),
+    ]:
+        escritas = conn.total_changes
+        t0 = time.perf_counter()
+        r = func()
+        print(
+            f"   • {nome:<28} {(time.perf_counter() - t0) * 1000:8.1f} ms  | {r}, "
+            f"linhas escritas {conn.total_changes - escritas}"
+        )
+
+    corrigido = [(resultados[0][0], "M" if resultados[0][1] == "V" else "V", 90, 100)]
+    t0 = time.perf_counter()
+    r = database.registrar_resultados(corrigido)
+    print(f"   • correção de um resultado     {(time.perf_counter() - t0) * 1000:8.1f} ms  | {r}")
+
+
+def bench_ranking(n_usuarios=50_000):
+    """/ranking: ORDER BY + concatenação por comando x ranking em memória."""
+    import random
+    main = importar_main()
+    rnd = random.Random(7)
+
+    banco_temporario()
+    with database.transacao() as cur:
+        cur.executemany("""
+            INSERT INTO USUARIO_PARTICIPANTE (telegram_user_id, apelido, pontuacao, frequencia_participacao)
+            VALUES (?, ?, ?, ?)
+        """, [(1000 + i, f"user{i}", rnd.randint(0, 80), rnd.randint(0, 100)) for i in range(n_usuarios)])
+
+    print(f"\n📊 ranking — {n_usuarios} usuários")
+    respostas = []
+
+    async def guardar(texto, *args, **kwargs):
+        respostas.append(texto)
+
+    def update(uid, texto):
+        u = update_mensagem(uid, texto)
+        u.message.reply_text = guardar
+        return u
+
+    def antigo():
+        # versão antiga do handler: lê e monta o texto com todo mundo
+        conn = sqlite3.connect(database.DB_NAME)
+        linhas = conn.execute("""
+            SELECT apelido, pontuacao, frequencia_participacao
+            FROM USUARIO_PARTICIPANTE
+            ORDER BY pontuacao DESC, frequencia_participacao DESC
+        """).fetchall()
+        conn.close()
+        texto = "🏆 RANKING OFICIAL 🏆\n\n"
+        for nome, pts, freq in linhas:
+            texto += f"{nome}: {pts} pontos | {freq} palpites\n"
+        return texto
+
+    t0 = time.perf_counter()
+    texto = antigo()
+    print(f"   • /ranking antigo              {(time.perf_counter() - t0) * 1000:8.1f} ms  | {len(texto)} caracteres")
+
+    async def medir():
+        amostras = {"1ª /ranking (carga)": [], "/ranking": [], "/ranking 50": [], "/meu_rank": []}
+        t0 = time.perf_counter()
+        await main.ranking(update(1000, "/ranking"), contexto())
+        amostras["1ª /ranking (carga)"].append(time.perf_counter() - t0)
+        for i in range(200):
+            for nome, ctx in (("/ranking", contexto()), ("/ranking 50", contexto("50"))):
+                t0 = time.perf_counter()
+                await main.ranking(update(1000, "/ranking"), ctx)
+                amostras[nome].append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            await main.meu_rank(update(1000 + rnd.randrange(n_usuarios), "/meu_rank"), contexto())
+            amostras["/meu_rank"].append(time.perf_counter() - t0)
+        return amostras
+
+    for nome, amostras in asyncio.run(medir()).items():
+        _resumo(nome, amostras)
+    maior = max(len(r) for r in respostas)
+    print(f"     maior resposta: {maior} caracteres (limite do Telegram: 4096)")
+
+    # lotes de votos gravados pela fila entre uma consulta e outra
+    classificacao = grupo_unico(main).classificacao
+
+    async def depois_de_lotes(lote=200, n=50):
+        amostras = {"lote gravado + /ranking": [], "recarga completa": []}
+        for _ in range(n):
+            ids = rnd.sample(range(1, n_usuarios + 1), lote)
+            with database.transacao() as cur:
+                cur.executemany("""
+                    UPDATE USUARIO_PARTICIPANTE SET frequencia_participacao = frequencia_participacao + 1
+                    WHERE id_usuario_participante = ?
+                """, [(i,) for i in ids])
+            classificacao.alterados(ids)
+            t0 = time.perf_counter()
+            await main.ranking(update(1000, "/ranking"), contexto())
+            amostras["lote gravado + /ranking"].append(time.perf_counter() - t0)
+        classificacao.invalidar()
+        t0 = time.perf_counter()
+        await classificacao.atualizar()
+        amostras["recarga completa"].append(time.perf_counter() - t0)
+        return amostras
+
+    for nome, amostras in asyncio.run(depois_de_lotes()).items():
+        _resumo(nome, amostras)
+
+
+def bench_cache_enquetes(n_usuarios=2000, n_jogos=2):
+    """Clique de voto: consultas no banco a cada clique x caches em memória."""
+    from fila_votos import FilaVotos
+    main = importar_main()
+
+    pasta = os.path.dirname(banco_temporario())
+    popular(n_usuarios, n_jogos)
+    with database.transacao() as cur:
+        cur.execute("UPDATE JOGO SET inicio_epoch = ?", (int(time.time()) + 3600,))
+    cache_enquetes, cache_usuarios = database.cache_enquetes, database.cache_usuarios
+
+    print(f"\n📊 cache_enquetes — {n_usuarios} usuários votando em {n_jogos} enquetes")
+
+    # conta as transações abertas (cada consulta ao SQLite passa por uma)
+    transacoes = [0]
+    transacao_original = database.transacao
+
+    def transacao_contada(*args, **kwargs):
+        transacoes[0] += 1
+        return transacao_original(*args, **kwargs)
+
+    database.transacao = transacao_contada
+
+    async def cliques(message_id):
+        amostras = []
+        for uid in range(n_usuarios):
+            t0 = time.perf_counter()
+            await main.callback_voto(SimpleNamespace(callback_query=query_voto(1000 + uid, message_id)), None)
+            amostras.append(time.perf_counter() - t0)
+        return amostras
+
+    async def rodar():
+        # flush só no encerramento, para não misturar gravações na contagem
+        grupo_unico(main).fila_votos = FilaVotos(arquivo=os.path.join(pasta, "pendentes.jsonl"),
+                                    intervalo_ms=60_000, lote_maximo=10 ** 9)
+        resultados = {}
+
+        # sem cache: cada clique consulta enquete, usuário (e votantes na 1ª vez)
+        await grupo_unico(main).fila_votos.iniciar()
+        transacoes[0] = 0
+        amostras = []
+        for uid in range(n_usuarios):
+            cache_enquetes.invalidar((database.banco_atual(), 10_000))
+            cache_usuarios.invalidar((database.banco_atual(), 1000 + uid))
+            t0 = time.perf_counter()
+            await main.callback_voto(SimpleNamespace(callback_query=query_voto(1000 + uid, 10_000)), None)
+            amostras.append(time.perf_counter() - t0)
+        resultados["sem cache"] = (amostras, transacoes[0])
+
+        # como na inicialização do bot: aquece as enquetes do dia e seus
+        # votantes; os usuários já ficaram no cache pelos cliques acima
+        inicio_utc, fim_utc = main.janela_do_dia(datetime.utcnow())
+        ids = database.aquecer_cache_enquetes(database.epoch_utc(inicio_utc), database.epoch_utc(fim_utc))
+        await grupo_unico(main).fila_votos.carregar_enquetes(ids)
+        transacoes[0] = 0
+        resultados["com cache"] = (await cliques(10_001), transacoes[0])
+
+        await grupo_unico(main).fila_votos.encerrar()
+        return resultados
+
+    try:
+        resultados = asyncio.run(rodar())
+    finally:
+        database.transacao = transacao_original
+
+    for nome, (amostras, n) in resultados.items():
+        _resumo(f"clique ({nome})", amostras)
+        print(f"     consultas ao SQLite: {n}")
+    for nome, cache in (("enquetes", cache_enquetes), ("usuarios", cache_usuarios)):
+        print(f"     cache {nome}: {cache.estatisticas()}")
+
+
+def bench_resposta_enquete(n_usuarios=2000):
+    """Palpite oficial: /votar_ + botão (antes) x resposta direta na enquete."""
+    from fila_votos import FilaVotos
+    main = importar_main()
+
+    pasta = os.path.dirname(banco_temporario())
+    popular(n_usuarios // 2, 2)      # metade dos votantes nunca usou /start
+    with database.transacao() as cur:
+        cur.execute("UPDATE JOGO SET inicio_epoch = ?", (int(time.time()) + 3600,))
+        cur.execute("UPDATE ENQUETE SET poll_id = 'poll' || id_enquete")
+
+    print(f"\n📊 resposta_enquete — {n_usuarios} votantes")
+
+    chamadas_api = [0]
+
+    async def chamada_api(*args, **kwargs):
+        chamadas_api[0] += 1
+
+    def usuario(uid):
+        return SimpleNamespace(id=uid, username=f"u{uid}", first_name="U")
+
+    async def pelo_botao(uid):
+        # /votar_X no grupo -> resposta com botões -> clique -> edição
+        mensagem = SimpleNamespace(from_user=usuario(uid), text="/votar_10000", reply_text=chamada_api)
+        await main.votar(SimpleNamespace(message=mensagem), None)
+        query = SimpleNamespace(data="10000|M", from_user=usuario(uid),
+                                answer=chamada_api, edit_message_text=chamada_api)
+        await main.callback_voto(SimpleNamespace(callback_query=query), None)
+
+    async def pela_enquete(uid, opcoes):
+        resposta = SimpleNamespace(poll_id="poll2", user=usuario(uid), option_ids=opcoes)
+        await main.resposta_enquete(SimpleNamespace(poll_answer=resposta), None)
+
+    async def rodar():
+        grupo_unico(main).fila_votos = FilaVotos(arquivo=os.path.join(pasta, "pendentes.jsonl"))
+        await grupo_unico(main).fila_votos.iniciar()
+        resultados = {}
+        for nome, votar in (("/votar_ + botão", pelo_botao),
+                            ("resposta na enquete", lambda uid: pela_enquete(uid, [1]))):
+            chamadas_api[0] = 0
+            # no fluxo antigo só quem tem cadastro consegue votar
+            uids = range(1000, 1000 + (n_usuarios // 2 if votar is pelo_botao else n_usuarios))
+            amostras = []
+            for uid in uids:
+                t0 = time.perf_counter()
+                await votar(uid)
+                amostras.append(time.perf_counter() - t0)
+            resultados[nome] = (amostras, chamadas_api[0] / len(uids))
+        await grupo_unico(main).fila_votos.encerrar()
+        return resultados
+
+    for nome, (amostras, por_voto) in asyncio.run(rodar()).items():
+        _resumo(nome, amostras)
+        # com ~250 ms por chamada, o tempo de rede domina o do handler
+        print(f"     chamadas à API do Telegram por voto: {por_voto:.0f} "
+              f"(~{por_voto * 250:.0f} ms de rede a 250 ms cada)")
+
+
+def bench_webhook(n_updates=1000, por_segundo=200, latencia_api=0.1):
+    """Carga de updates: long polling (um por vez, como antes) x long polling
+    e webhook com processamento concorrente por usuário.
+
+    Os updates chegam a `por_segundo`: 90% respostas às enquetes e 10%
+    /ranking (cuja resposta espera `latencia_api` s na API falsa). Há
+    também usuários que votam, trocam e retiram o voto em sequência (a
+    ordem é conferida em tests/test_webhook.py).
+    """
+    import random
+    import socket
+    from concurrent.futures import ThreadPoolExecutor
+    import requests
+    from telegram import Update
+    from telegram.ext import TypeHandler
+    from fila_votos import FilaVotos
+    main = importar_main()
+    rnd = random.Random(3)
+
+    # roteiro: (update, usuário que precisa terminar sem voto ou None)
+    roteiro = []
+    uid = 1000
+    while len(roteiro) < n_updates:
+        uid += 1
+        if rnd.random() < 0.1:
+            roteiro.append(("ranking", 1000 + rnd.randrange(uid - 1000)))
+        elif rnd.random() < 0.05:
+            # vota, troca e retira em updates seguidos
+            for opcoes in ([1], [0], []):
+                roteiro.append(("resposta", uid, opcoes))
+        else:
+            roteiro.append(("resposta", uid, [rnd.randrange(2)]))
+
+    def montar(i, item):
+        if item[0] == "ranking":
+            return update_json_comando(i + 1, item[1], "/ranking")
+        return update_json_resposta(i + 1, item[1], "poll1", item[2])
+
+    print(f"\n📊 webhook — {len(roteiro)} updates a {por_segundo}/s, "
+          f"API com {latencia_api * 1000:.0f} ms de latência")
+
+    def porta_livre():
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            return sock.getsockname()[1]
+
+    def rodar(modo):
+        pasta = os.path.dirname(banco_temporario())
+        popular(1, 1)
+        with database.transacao() as cur:
+            cur.execute("UPDATE JOGO SET inicio_epoch = ?", (int(time.time()) + 3600,))
+            cur.execute("UPDATE ENQUETE SET poll_id = 'poll1'")
+
+        api = ServidorBotAPI(latencia=latencia_api, por_chat=10 ** 9, por_segundo=10 ** 9)
+        app = main.criar_aplicacao("123:bench", base_url=api.url + "/bot",
+                                   concorrente=modo != "polling, um por vez")
+        app.post_init = app.post_shutdown = None
+        inicio, fim = {}, {}
+
+        async def registrar_fim(update, context):
+            fim[update.update_id] = time.perf_counter()
+
+        app.add_handler(TypeHandler(Update, registrar_fim), group=1)
+
+        porta, segredo = porta_livre(), "segredo-bench"
+        url = f"http://127.0.0.1:{porta}/telegram"
+        sessao = requests.Session()
+
+        def alimentar():
+            # como o Telegram, não manda o próximo update de um usuário antes
+            # da resposta ao anterior: cada usuário sempre na mesma conexão
+            conexoes = [ThreadPoolExecutor(max_workers=1) for _ in range(40)]
+            intervalo = 1 / por_segundo
+            proximo = time.perf_counter()
+            try:
+                for i, item in enumerate(roteiro):
+                    proximo += intervalo
+                    time.sleep(max(0, proximo - time.perf_counter()))
+                    update = montar(i, item)
+                    inicio[update["update_id"]] = time.perf_counter()
+                    if modo == "webhook":
+                        conexoes[item[1] % len(conexoes)].submit(
+                            sessao.post, url, json=update,
+                            headers={"X-Telegram-Bot-Api-Secret-Token": segredo})
+                    else:
+                        api.adicionar_update(update)
+            finally:
+                for pool in conexoes:
+                    pool.shutdown()
+
+        async def executar():
+            grupo_unico(main).fila_votos = FilaVotos(arquivo=os.path.join(pasta, "pendentes.jsonl"))
+            await grupo_unico(main).fila_votos.iniciar()
+            async with app:
+                await app.start()
+                if modo == "webhook":
+                    await app.updater.start_webhook(listen="127.0.0.1", port=porta,
+                                                    url_path="telegram", webhook_url=url,
+                                                    secret_token=segredo)
+                else:
+                    await app.updater.start_polling(poll_interval=0, timeout=2)
+                alimentador = threading.Thread(target=alimentar)
+                alimentador.start()
+                limite = time.perf_counter() + 120
+                while len(fim) < len(roteiro) and time.perf_counter() < limite:
+                    await asyncio.sleep(0.05)
+                alimentador.join()
+                await app.updater.stop()
+                await app.stop()
+            await grupo_unico(main).fila_votos.encerrar()
+
+        asyncio.run(executar())
+        api.parar()
+
+        latencias = [fim[u] - inicio[u] for u in fim]
+        vazao = len(fim) / (max(fim.values()) - min(inicio.values()))
+        return latencias, vazao
+
+    for modo in ("polling, um por vez", "polling, concorrente", "webhook"):
+        latencias, vazao = rodar(modo)
+        _resumo(modo, latencias)
+        print(f"     {vazao:.0f} updates/s | {len(latencias)}/{len(roteiro)} processados")
+
+
+def bench_agendador(n_jogos=5, antecedencia=600):
+    """Precisão do fechamento das enquetes: cron de 1 min x heap de prazos."""
+    from contextlib import redirect_stdout
+    from io import StringIO
+    importar_main()
+    from agendador import Agendador
+
+    banco_temporario()
+    popular(10, n_jogos + 1)
+    agora = int(time.time())
+    prazos = {}
+    with database.transacao() as cur:
+        # enquetes fechando daqui a 1..n s; o último jogo começou há 2h e
+        # ainda espera o resultado
+        for i in range(n_jogos):
+            cur.execute("UPDATE JOGO SET inicio_epoch = ? WHERE id_jogo = ?",
+                        (agora + antecedencia + 1 + i, i + 1))
+            prazos[10_000 + i] = agora + 1 + i
+        cur.execute("UPDATE JOGO SET inicio_epoch = ? WHERE id_jogo = ?",
+                    (agora - 2 * 3600 - 5, n_jogos + 1))
+        cur.execute("UPDATE JOGO SET enquete_encerrada = 1 WHERE id_jogo = ?", (n_jogos + 1,))
+
+    print(f"\n📊 agendador — {n_jogos} enquetes fechando nos próximos {n_jogos}s")
+
+    consultas_placar = []
+
+    def scoreboard_falso():
+        consultas_placar.append(time.time())
+        return {"scoreboard": {"games": [{
+            "gameId": f"00224{n_jogos:05d}", "gameStatus": 3, "gameStatusText": "Final",
+            "homeTeam": {"score": 110}, "awayTeam": {"score": 100}}]}}
+
+    bot = BotFalso()
+
+    async def rodar():
+        agendador = Agendador(bot, hora_enquetes="23:59", antecedencia=antecedencia)
+        agendador.placar.obter = scoreboard_falso
+        await agendador.iniciar()
+        await asyncio.sleep(n_jogos + 1.5)
+        await agendador.encerrar()
+
+    with redirect_stdout(StringIO()):
+        asyncio.run(rodar())
+
+    atrasos = [t - prazos[kw["message_id"]] for metodo, t, kw in bot.chamadas if metodo == "stop_poll"]
+    print(f"   • cron a cada 60s (esperado)   atraso médio {30_000:8.0f} ms | pior {60_000:8.0f} ms")
+    print(f"   • agendador                    atraso médio {statistics.mean(atrasos) * 1000:8.1f} ms"
+          f" | pior {max(atrasos) * 1000:8.1f} ms")
+    print(f"     consultas ao scoreboard: {len(consultas_placar)} (1 jogo aguardando resultado)")
+
+
+def bench_placar_ao_vivo(n_usuarios=2000):
+    """Uma noite de jogos num relógio simulado: consulta a cada 60s
+    reenviando todos os finalizados (antes) x placar ao vivo adaptativo."""
+    import calendar
+    import calendario
+    import get_nba
+    import placar_ao_vivo
+    from atualizar_resultados import resultado_do_jogo
+    from contextlib import redirect_stdout
+    from io import StringIO
+
+    inicio = calendar.timegm((2025, 10, 21, 23, 0, 0))
+    comeco = inicio - 2 * 3600
+    fins = {"0022400000": inicio + 130 * 60 + 37, "0022400001": inicio + 175 * 60 + 37,
+            "0022400002": inicio + 190 * 60 + 37}
+    correcao = fins["0022400000"] + 300
+    print(f"\n📊 placar_ao_vivo — noite de 3 jogos (1 na prorrogação, 1 corrigido), {n_usuarios} usuários")
+
+    # o placar tira os horários de início do calendário em memória
+    calendario.indice.atualizar([
+        (game_id, "Home Team", "Away Team",
+         *datetime.utcfromtimestamp(inicio + atraso * 60).strftime("%Y-%m-%d %H:%M:%S").split(),
+         "scheduled", "", "", "")
+        for game_id, atraso in zip(fins, (0, 30, 60))
+    ], completo=True)
+
+    def rodar(consultar, passo):
+        """`consultar(agora)` faz uma consulta e devolve o próximo intervalo
+        (None encerra); `passo` mede atrasos e escritas."""
+        banco_temporario()
+        popular_votos(n_usuarios, 3)
+        conn = database.obter_conexao()
+        escritas = conn.total_changes
+        vistos, agora, consultas = {}, comeco, 0
+        instantes = []
+        while True:
+            intervalo = consultar(agora)
+            consultas += 1
+            instantes.append((agora, intervalo))
+            for game_id, resultado in passo().items():
+                vistos.setdefault((game_id, resultado), agora)
+            if intervalo is None:
+                break
+            agora += intervalo
+        return SimpleNamespace(
+            consultas=consultas, escritas=conn.total_changes - escritas, vistos=vistos,
+            instantes=instantes,
+        )
+
+    def resumo(nome, r, enviados, transacoes):
+        atrasos = [r.vistos[(g, res)] - fim for (g, res), fim in esperados.items() if (g, res) in r.vistos]
+        faltando = len(esperados) - len(atrasos)
+        print(
+            f"   • {nome:<26} {r.consultas:4d} consultas, {transacoes:3d} transações, "
+            f"{enviados:4d} resultados enviados, {r.escritas:5d} linhas escritas | atraso médio "
+            f"{statistics.mean(atrasos) if atrasos else 0:5.1f} s, pior {max(atrasos, default=0):3.0f} s"
+            + (f" | {faltando} nunca gravado(s)" if faltando else "")
+        )
+
+    # o que cada abordagem deveria gravar, e a partir de quando
+    esperados = {}
+    for game_id, fim in fins.items():
+        g = next(j for j in scoreboard_da_noite(inicio, fim)["scoreboard"]["games"] if j["gameId"] == game_id)
+        esperados[(game_id, resultado_do_jogo(g))] = fim
+    g = scoreboard_da_noite(inicio, correcao)["scoreboard"]["games"][0]
+    esperados[(g["gameId"], resultado_do_jogo(g))] = correcao
+
+    # antes: a cada 60s, todos os jogos com gameStatusText == "Final" iam
+    # para o banco, do começo ao fim da noite
+    ultima = max(esperados.values())
+    antes = SimpleNamespace(enviados=0, transacoes=0, gravados={})
+
+    def consultar_antes(agora):
+        resultados = []
+        for g in scoreboard_da_noite(inicio, agora)["scoreboard"]["games"]:
+            if g["gameStatusText"] == "Final":
+                resultados.append(resultado_do_jogo(g))
+        database.registrar_resultados(resultados)
+        antes.enviados += len(resultados)
+        antes.transacoes += 1
+        antes.gravados = {r[0]: r for r in resultados}
+        return None if agora >= ultima else 60
+
+    r_antes = rodar(consultar_antes, lambda: antes.gravados)
+    resumo("a cada 60s (antes)", r_antes, antes.enviados, antes.transacoes)
+
+    # depois: placar ao vivo pela CDN local, revalidando a cada consulta
+    relogio = [comeco]
+    cdn = ServidorCDN({})
+    get_nba.URL_SCOREBOARD = cdn.url + "/scoreboard.json"
+    get_nba.PASTA_CACHE = tempfile.mkdtemp(prefix="nba_cache_")
+    depois = SimpleNamespace(enviados=0)
+
+    def obter():
+        cdn.arquivos["/scoreboard.json"] = scoreboard_da_noite(inicio, relogio[0])
+        return get_nba.obter_json_nba(max_idade=0)
+
+    def gravar(resultados):
+        depois.enviados += len(resultados)
+        return database.registrar_resultados(resultados), 1
+
+    placar = placar_ao_vivo.PlacarAoVivo(obter=obter, gravar=gravar)
+
+    def consultar_depois(agora):
+        relogio[0] = agora
+        return placar.rodada(agora)
+
+    with redirect_stdout(StringIO()):
+        r_depois = rodar(consultar_depois, lambda: placar._gravados)
+    resumo("placar ao vivo (depois)", r_depois, depois.enviados, placar.gravacoes)
+
+    intervalos = [i for _, i in r_depois.instantes]
+    ritmo = {i: intervalos.count(i) for i in (placar_ao_vivo.INTERVALO_EM_ANDAMENTO,
+                                              placar_ao_vivo.INTERVALO_RETA_FINAL)}
+    ociosas = len(intervalos) - sum(ritmo.values()) - 1
+    print(f"     ritmo: {ociosas} espera(s) até o início, {ritmo[60]} consultas a 60s, "
+          f"{ritmo[10]} a 10s (4º período/prorrogação)")
+    cdn.parar()
+
+
+def bench_recuperar_resultados(n_jogos=300, n_usuarios=500, latencia=0.02, threads=8):
+    """Recuperação de resultados passados numa CDN local com `latencia` s por
+    requisição: um jogo por vez, com uma transação e uma pontuação por jogo
+    (antes) x pool de threads, gravação em lote e uma pontuação no fim."""
+    import calendar
+    import get_nba
+    import recuperar_resultados
+    from atualizar_resultados import resultado_do_jogo
+    from contextlib import redirect_stdout
+    from grupos import Grupo
+    from io import StringIO
+
+    inicio = calendar.timegm((2025, 10, 21, 23, 0, 0))
+    ids = [f"00224{i:05d}" for i in range(n_jogos)]
+    arquivos = {}
+    for i, game_id in enumerate(ids):
+        if i % 50 == 7:
+            continue                                    # adiado: 404
+        jogo = {"gameId": game_id, "gameStatus": 3, "gameStatusText": "Final" if i % 9 else "Final/OT",
+                "homeTeam": {"score": 100 + i % 17}, "awayTeam": {"score": 100 + i % 13}}
+        if i % 50 == 13:
+            jogo.update(gameStatus=2, gameStatusText="Q3")   # ainda em andamento
+        arquivos[f"/boxscore_{game_id}.json"] = {"game": jogo}
+    cdn = ServidorCDN(arquivos)
+    cdn.latencia = latencia
+    get_nba.URL_BOXSCORE = cdn.url + "/boxscore_{game_id}.json"
+    grupos = [Grupo(None, principal=True)]
+    finalizados = sum(1 for a in arquivos.values() if a["game"]["gameStatus"] == 3)
+    print(f"\n📊 recuperar_resultados — {n_jogos} jogos sem resultado ({finalizados} finalizados), "
+          f"CDN com {latencia * 1000:.0f} ms por requisição")
+
+    def preparar():
+        banco_temporario()
+        popular_votos(n_usuarios, n_jogos)
+        with database.transacao() as cur:
+            cur.execute("UPDATE JOGO SET inicio_epoch = ? + (id_jogo - 1) * 14400", (inicio,))
+        return recuperar_resultados.janela(datetime.utcfromtimestamp(inicio).date() - timedelta(days=1),
+                                           datetime.utcfromtimestamp(inicio + n_jogos * 14400).date())
+
+    def medir(nome, func):
+        faixa = preparar()
+        r0, c0, _ = cdn.contadores()
+        t0 = time.perf_counter()
+        with redirect_stdout(StringIO()):
+            r = func(faixa)
+        segundos = time.perf_counter() - t0
+        r1, c1, _ = cdn.contadores()
+        print(f"   • {nome:<28} {segundos * 1000:8.0f} ms | {n_jogos / segundos:6.0f} jogos/s, "
+              f"{r1 - r0} requisições, {c1 - c0} conexões")
+        return r, segundos
+
+    def um_por_vez(faixa):
+        for game_id, _ in database.listar_jogos_sem_resultado(*faixa):
+            jogo = get_nba.obter_boxscore(game_id)
+            resultado = resultado_do_jogo(jogo) if jogo else None
+            if resultado is not None:
+                database.registrar_resultados([resultado])
+
+    _, t_antes = medir("um por vez (antes)", um_por_vez)
+    medir("pool de 1 thread", lambda faixa: recuperar_resultados.recuperar(*faixa, threads=1, grupos=grupos))
+    r, t_depois = medir(f"pool de {threads} threads", lambda faixa: recuperar_resultados.recuperar(
+        *faixa, threads=threads, grupos=grupos))
+    print(f"     {t_antes / t_depois:.1f}x mais rápido; {r['sem_resultado']} jogo(s) adiado(s) ou em andamento")
+    cdn.parar()
+
+
+def bench_envio(n_jogos=15, latencia=0.25, escala=20):
+    """Noite de n jogos na API falsa: envio em série (antigo) x Enviador.
+
+    Na criação o limite do grupo (20 mensagens/min) é atingido, então o
+    tempo roda `escala` vezes mais rápido (janela e latência divididas pelo
+    fator, tempos impressos já convertidos de volta). O fechamento não chega
+    ao limite e roda em tempo real.
+    """
+    from contextlib import redirect_stdout
+    from io import StringIO
+    from telegram import Bot
+    from telegram.request import HTTPXRequest
+    importar_main()
+    import criar_enquetes_do_dia
+    import stopper
+    from envio import JANELA_CHAT, Enviador
+
+    banco_temporario()
+    popular(10, n_jogos)
+    jogos = [{
+        "id_jogo": i + 1, "game_id": f"00224{i:05d}", "mandante": "Home Team",
+        "visitante": "Away Team", "sigla_mandante": "HOM", "sigla_visitante": "AWY",
+        "canal": None, "inicio_epoch": 0, "hora_local": f"{20 + i // 4}h{(i % 4) * 15:02d}",
+    } for i in range(n_jogos)]
+    chat = int(os.environ["GROUP_ID"])
+
+    print(f"\n📊 envio — {n_jogos} jogos, latência {latencia * 1000:.0f} ms, "
+          f"20 mensagens/min no grupo")
+
+    def rodar(fabrica, escala):
+        api = ServidorBotAPI(latencia=latencia / escala, janela_chat=60 / escala)
+
+        async def com_bot():
+            bot = Bot("123:bench", base_url=api.url + "/bot",
+                      request=HTTPXRequest(connection_pool_size=16))
+            async with bot:
+                enviador = Enviador(bot, janela_chat=JANELA_CHAT / escala)
+                t0 = time.perf_counter()
+                resultado = await fabrica(bot, enviador)
+                return (time.perf_counter() - t0) * escala, resultado
+
+        with redirect_stdout(StringIO()):
+            duracao, resultado = asyncio.run(com_bot())
+        api.parar()
+        return duracao, resultado, api
+
+    async def criar_antigo(bot, enviador):
+        # como era: tudo em série, erro (inclusive 429) vira print e segue
+        perdidos = 0
+        for metodo, kwargs in (("send_message", {"text": "resumo"}),
+                               ("pin_chat_message", {"message_id": 1})):
+            try:
+                await getattr(bot, metodo)(chat_id=chat, **kwargs)
+            except Exception:
+                perdidos += 1
+        for jogo in jogos:
+            try:
+                poll = await bot.send_poll(chat_id=chat, question=jogo["hora_local"],
+                                           options=["V", "M"], is_anonymous=False)
+                await bot.send_message(chat_id=chat, text=f"👉 /votar_{poll.message_id}")
+            except Exception:
+                perdidos += 1
+        return perdidos
+
+    async def criar_novo(bot, enviador):
+        await criar_enquetes_do_dia.criar_enquetes(jogos=jogos, enviador=enviador)
+        return enviador.falhas
+
+    linhas = [{"message_id": 50_000 + i, "game_id_nba": j["game_id"], "time_visitante": "A",
+               "time_mandante": "H", "hora_utc": "00:00:00"} for i, j in enumerate(jogos)]
+
+    async def fechar_antigo(bot, enviador):
+        for linha in linhas:
+            await bot.stop_poll(chat_id=chat, message_id=linha["message_id"])
+
+    async def fechar_novo(bot, enviador):
+        await asyncio.gather(*(stopper.fechar_enquete(enviador, linha) for linha in linhas))
+
+    duracao, perdidos, api = rodar(criar_antigo, escala)
+    print(f"   • criação em série (antes)     {duracao:6.1f} s | {api.recusadas_429} respostas 429, "
+          f"{perdidos} jogo(s) sem enquete/link")
+
+    duracao, perdidos, api = rodar(criar_novo, escala)
+    enquetes = [p for metodo, _, p, _ in api.aceitas if metodo == "sendPoll"]
+    # as enquetes saem na ordem do horário dos jogos
+    ordem_ok = [p["question"] for p in enquetes] == sorted(p["question"] for p in enquetes)
+    print(f"   • criação com Enviador         {duracao:6.1f} s | {api.recusadas_429} respostas 429, "
+          f"{perdidos} perdidos, {len(enquetes)} enquetes, {len(api.aceitas)} mensagens")
+    if not ordem_ok:
+        print("     ⚠️ enquetes chegaram fora da ordem dos horários")
+
+    duracao, _, api = rodar(fechar_antigo, 1)
+    print(f"   • fechamento em série          {duracao:6.2f} s")
+    duracao, _, api = rodar(fechar_novo, 1)
+    print(f"   • fechamento com Enviador      {duracao:6.2f} s | {api.recusadas_429} respostas 429")
+
+
+def bench_metricas(n_usuarios=2000, n=5000):
+    """Custo das métricas: consultas e clique de voto com METRICAS desligado
+    x ligado (o que sai no /metrics e no /stats)."""
+    import metricas
+    from fila_votos import FilaVotos
+    main = importar_main()
+    print(f"\n📊 metricas — {n} consultas e {n_usuarios} cliques")
+
+    def rodar(ativo):
+        metricas.ATIVO = ativo
+        metricas.limpar()
+        pasta = os.path.dirname(banco_temporario())   # conexão nova
+        popular(n_usuarios, 1)
+        with database.transacao() as cur:
+            cur.execute("UPDATE JOGO SET inicio_epoch = ?", (int(time.time()) + 3600,))
+
+        consultas = []
+        for _ in range(n):
+            t0 = time.perf_counter()
+            database.buscar_enquete(10_000)
+            consultas.append(time.perf_counter() - t0)
+
+        callback = metricas.medir_handler(main.callback_voto)
+
+        async def cliques():
+            grupo_unico(main).fila_votos = FilaVotos(arquivo=os.path.join(pasta, "pendentes.jsonl"))
+            await grupo_unico(main).fila_votos.iniciar()
+            amostras = []
+            for uid in range(n_usuarios):
+                update = SimpleNamespace(callback_query=query_voto(1000 + uid, 10_000))
+                t0 = time.perf_counter()
+                await callback(update, None)
+                amostras.append(time.perf_counter() - t0)
+            await grupo_unico(main).fila_votos.encerrar()
+            return amostras
+
+        return consultas, asyncio.run(cliques())
+
+    try:
+        desligado = rodar(False)
+        ligado = rodar(True)
+        texto = metricas.exportar()
+        resumo = metricas.resumo()
+    finally:
+        metricas.ATIVO = False
+        metricas.limpar()
+
+    for nome, (consultas, cliques) in (("desligado", desligado), ("ligado", ligado)):
+        _resumo(f"buscar_enquete ({nome})", consultas)
+        _resumo(f"clique ({nome})", cliques)
+
+    print(f"     /metrics: {len(texto.splitlines())} linhas")
+    print("     " + "\n     ".join(resumo.splitlines()[:8]))
+
+
+def bench_estatisticas(n_usuarios=10_000, n_jogos=20):
+    """Relatórios de consultas.py: agregação da VOTO inteira x leitura de
+    ESTATISTICA_USUARIO, e o custo de manter a tabela a cada resultado."""
+    import random
+    import consultas
+    rnd = random.Random(7)
+    print(f"\n📊 estatisticas — {n_usuarios} usuários x {n_jogos} jogos")
+
+    banco_temporario()
+    enquetes = popular(n_usuarios, n_jogos)
+    with database.transacao() as cur:
+        # jogos de hora em hora, metade na temporada seguinte
+        cur.execute("UPDATE JOGO SET inicio_epoch = 1735700000 + id_jogo * 3600")
+        cur.execute("""
+            UPDATE JOGO SET game_id_nba = '00225' || substr(game_id_nba, 6)
+            WHERE id_jogo > ?
+        """, (n_jogos // 2,))
+
+    # votos pelo caminho do bot (registrar_palpites), em lotes como a fila
+    palpites = [(uid, id_enquete, rnd.choice("MV"), "2025-01-01T00:00:00")
+                for id_enquete in enquetes for uid in range(1, n_usuarios + 1)
+                if rnd.random() < 0.8]
+    t0 = time.perf_counter()
+    for i in range(0, len(palpites), 500):
+        database.registrar_palpites(palpites[i:i + 500])
+    print(f"   • {len(palpites)} votos gravados      {(time.perf_counter() - t0):6.2f} s")
+
+    # alguns retiram o voto
+    database.registrar_palpites([(uid, enquetes[-1], None, "2025-01-01T00:00:01")
+                                 for uid in range(1, 200)])
+
+    # resultados saindo um a um (incremental), um jogo anterior apurado por
+    # último (prorrogação) e uma correção (recálculo)
+    def resultado(i):
+        return (f"{'00224' if i < n_jogos // 2 else '00225'}{i:05d}", rnd.choice("MV"), 100, 99)
+
+    ordem = list(range(n_jogos - 2)) + [n_jogos - 1]
+    tempos = []
+    for i in ordem:
+        t0 = time.perf_counter()
+        database.registrar_resultados([resultado(i)])
+        tempos.append(time.perf_counter() - t0)
+    _resumo("pontuar um jogo (incremental)", tempos)
+
+    t0 = time.perf_counter()
+    database.registrar_resultados([resultado(n_jogos - 2)])
+    print(f"   • jogo anterior apurado depois {(time.perf_counter() - t0) * 1000:8.1f} ms")
+
+    t0 = time.perf_counter()
+    database.reconstruir_estatisticas()
+    print(f"   • reconstrução completa        {(time.perf_counter() - t0) * 1000:8.1f} ms")
+
+    game_id, vencedor, pm, pv = resultado(0)
+    with database.transacao(escrita=False) as cur:
+        cur.execute("SELECT vencedor FROM JOGO WHERE game_id_nba = ?", (game_id,))
+        vencedor = "V" if cur.fetchone()[0] == "M" else "M"
+    t0 = time.perf_counter()
+    database.registrar_resultados([(game_id, vencedor, 90, 100)])
+    print(f"   • correção de um resultado     {(time.perf_counter() - t0) * 1000:8.1f} ms")
+
+    conn = database.obter_conexao()
+    for nome, antigo, novo in (
+        ("consulta_agrupamento", SQL_AGRUPAMENTO_ANTIGO, consultas.consulta_agrupamento),
+        ("consulta_join_complexo", SQL_JOIN_COMPLEXO_ANTIGO, consultas.consulta_join_complexo),
+    ):
+        t0 = time.perf_counter()
+        conn.execute(antigo).fetchall()
+        m_antes = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        novo()
+        m_depois = time.perf_counter() - t0
+        print(f"   • {nome:<24} {m_antes * 1000:7.1f} ms -> {m_depois * 1000:6.1f} ms "
+              f"({m_antes / m_depois:.0f}x)")
+
+    with database.transacao(escrita=False) as cur:
+        cur.execute("""
+            SELECT temporada, COUNT(*), MAX(melhor_sequencia), ROUND(AVG(aproveitamento), 3)
+            FROM ESTATISTICA_USUARIO GROUP BY temporada
+        """)
+        for temporada, n, melhor, media in cur.fetchall():
+            print(f"     temporada {temporada or 'geral'}: {n} usuários, "
+                  f"melhor sequência {melhor}, aproveitamento médio {media}")
+
+
+def bench_busca(n_usuarios=100_000, n=50):
+    """Busca por apelido: LIKE '%x%' varrendo a tabela x índice FTS5 trigram,
+    e custo dos triggers de sincronização na inserção."""
+    import random
+    import busca
+    rnd = random.Random(19)
+    print(f"\n🔎 busca — {n_usuarios} usuários")
+
+    banco_temporario()
+    silabas = ["ma", "ri", "jo", "ao", "lu", "ca", "pe", "dro", "ana", "bel", "gui", "fer",
+               "nan", "da", "ra", "fa", "el", "the", "ko", "be", "kd", "lebron", "curry"]
+    apelidos = ["".join(rnd.choice(silabas) for _ in range(rnd.randint(2, 4))) + str(rnd.randrange(100))
+                for _ in range(n_usuarios)]
+
+    conn = database.obter_conexao()
+    metade = n_usuarios // 2
+    t0 = time.perf_counter()
+    with database.transacao() as cur:
+        cur.executemany("INSERT INTO USUARIO_PARTICIPANTE (telegram_user_id, apelido) VALUES (?, ?)",
+                        [(1000 + i, a) for i, a in enumerate(apelidos[:metade])])
+    com_triggers = time.perf_counter() - t0
+    conn.execute("DROP TRIGGER busca_usuario_inserir")
+    t0 = time.perf_counter()
+    with database.transacao() as cur:
+        cur.executemany("INSERT INTO USUARIO_PARTICIPANTE (telegram_user_id, apelido) VALUES (?, ?)",
+                        [(1000 + i, a) for i, a in enumerate(apelidos[metade:], metade)])
+    sem_triggers = time.perf_counter() - t0
+    print(f"   • inserir {metade} usuários         {sem_triggers * 1000:7.1f} ms sem índice -> "
+          f"{com_triggers * 1000:7.1f} ms com índice")
+    # recria o trigger (migração 10 é idempotente) e indexa a segunda metade
+    with database.transacao() as cur:
+        database._migracao_10(cur)
+
+    casos = {
+        "substring": [apelido[1:5] for apelido in rnd.sample(apelidos, n)],
+        "substring rara": [apelido[-5:] for apelido in rnd.sample(apelidos, n)],
+        "curta (2 letras)": [rnd.choice(silabas)[:2] for _ in range(n)],
+    }
+    for nome, termos in casos.items():
+        antes, depois = [], []
+        for termo in termos:
+            t0 = time.perf_counter()
+            conn.execute(SQL_BUSCA_ANTIGA, (f"%{termo}%",)).fetchall()
+            antes.append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            busca.buscar("apelido", termo, limite=None)
+            depois.append(time.perf_counter() - t0)
+        m_antes, m_depois = statistics.median(antes), statistics.median(depois)
+        print(f"   • {nome:<18} (p50)     {m_antes * 1000:7.2f} ms -> {m_depois * 1000:7.2f} ms "
+              f"({m_antes / m_depois:.1f}x)")
+
+    # o caso comum do bot: as 50 primeiras, exato e prefixo na frente
+    termos = [apelido[:4] for apelido in rnd.sample(apelidos, n)]
+    tempos = []
+    for termo in termos:
+        t0 = time.perf_counter()
+        busca.buscar("apelido", termo, modo="prefixo")
+        tempos.append(time.perf_counter() - t0)
+    _resumo("prefixo, top 50", tempos)
+
+
+def bench_arquivo(n_usuarios=1000, n_jogos=400, temporadas=(2021, 2022, 2023, 2024, 2025)):
+    """Arquivamento das temporadas encerradas: tamanho do banco e consultas
+    antes x depois, e recálculo lendo os arquivos anexados."""
+    import random
+    import arquivo
+    import consultas
+    rnd = random.Random(20)
+    print(f"\n📦 arquivo — {len(temporadas)} temporadas x {n_jogos} jogos, {n_usuarios} usuários")
+
+    banco_temporario()
+    atual = temporadas[-1]
+    with database.transacao() as cur:
+        cur.executemany("INSERT INTO USUARIO_PARTICIPANTE (telegram_user_id, apelido) VALUES (?, ?)",
+                        [(1000 + i, f"user{i}") for i in range(n_usuarios)])
+        for temporada in temporadas:
+            inicio = int(datetime(temporada, 10, 20).timestamp())
+            cur.executemany("""
+                INSERT INTO JOGO (game_id_nba, time_mandante, time_visitante, data_utc,
+                                  hora_utc, inicio_epoch, vencedor)
+                VALUES (?, 'Home Team', 'Away Team', '2025-01-01', '00:00:00', ?, ?)
+            """, [(f"002{temporada % 100:02d}{i:05d}", inicio + i * 20_000,
+                   rnd.choice("MV") if temporada < atual or i < n_jogos // 2 else None)
+                  for i in range(n_jogos)])
+        cur.execute("INSERT INTO ENQUETE (id_jogo, message_id) SELECT id_jogo, id_jogo FROM JOGO")
+        cur.execute("SELECT id_enquete FROM ENQUETE")
+        enquetes = [r[0] for r in cur.fetchall()]
+        cur.executemany("""
+            INSERT INTO VOTO (id_usuario_participante, id_enquete, escolha, data_hora)
+            VALUES (?, ?, ?, '2025-01-01T00:00:00')
+        """, ((uid, e, rnd.choice("MV")) for e in enquetes
+              for uid in range(1, n_usuarios + 1) if rnd.random() < 0.3))
+    database.pontuar_jogos_finalizados()
+    database.reconstruir_estatisticas()
+
+    conn = database.obter_conexao()
+    calendario = [(f"002{atual % 100:02d}{i:05d}", "Home Team", "Away Team", "2025-01-01",
+                   "00:00:00", "scheduled", "", "", "") for i in range(n_jogos)]
+    database.sincronizar_jogos(calendario)
+    proximo = [n_jogos // 2]
+
+    def medir():
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        tempos = {}
+        t0 = time.perf_counter()
+        database.sincronizar_jogos(calendario)
+        tempos["calendário sem mudanças"] = time.perf_counter() - t0
+        game_id = f"002{atual % 100:02d}{proximo[0]:05d}"
+        proximo[0] += 1
+        t0 = time.perf_counter()
+        database.registrar_resultados([(game_id, "M", 100, 90)])
+        tempos["pontuar um jogo"] = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        consultas.consulta_agrupamento()
+        tempos["consulta_agrupamento"] = time.perf_counter() - t0
+        tamanho = os.path.getsize(database.DB_NAME) / 1e6
+        return tamanho, tempos
+
+    tamanho_antes, antes = medir()
+    t0 = time.perf_counter()
+    for temporada in arquivo.temporadas_encerradas():
+        arquivo.arquivar_temporada(temporada)
+    arquivar = time.perf_counter() - t0
+    arquivo.compactar()
+    print(f"   • arquivar {len(temporadas) - 1} temporadas + VACUUM   {arquivar * 1000:8.1f} ms")
+
+    tamanho_depois, depois = medir()
+    print(f"   • tamanho do banco             {tamanho_antes:8.1f} MB -> {tamanho_depois:6.1f} MB")
+    for nome in antes:
+        print(f"   • {nome:<28} {antes[nome] * 1000:8.2f} ms -> {depois[nome] * 1000:6.2f} ms")
+
+    # recálculo e conferência leem os arquivos anexados
+    t0 = time.perf_counter()
+    database.recalcular_pontuacao()
+    print(f"   • recálculo completo           {(time.perf_counter() - t0) * 1000:8.1f} ms")
+    t0 = time.perf_counter()
+    database.verificar_estatisticas()
+    print(f"   • conferência das estatísticas {(time.perf_counter() - t0) * 1000:8.1f} ms")
+
+def bench_grupos(n_escritas=4000, shards=(1, 2, 4, 8), n_grupos=3, n_usuarios=200):
+    """Vários grupos: vazão de escrita com 1 banco x um banco por grupo, e
+    custo do roteamento dos updates para o banco do grupo."""
+    import grupos
+    main = importar_main()
+    print(f"\n📊 grupos — {n_escritas} cadastros espalhados por {shards} banco(s)")
+
+    # 1) vazão: cada banco tem a sua thread de escrita no database_async
+    async def escrever_em(bancos):
+        async def uma(i):
+            with database.usando_banco(bancos[i % len(bancos)]):
+                await database_async.escrever(database.registrar_usuario, 1_000_000 + i, f"u{i}")
+        t0 = time.perf_counter()
+        await asyncio.gather(*(uma(i) for i in range(n_escritas)))
+        return time.perf_counter() - t0
+
+    import database_async
+    vazao = {}
+    for n in shards:
+        pasta = os.path.dirname(banco_temporario())
+        bancos = [os.path.join(pasta, f"bench_{k}.db") for k in range(n)]
+        for banco in bancos:
+            with database.usando_banco(banco):
+                database.create_tables()
+        vazao[n] = n_escritas / asyncio.run(escrever_em(bancos))
+        print(f"   • {n} banco(s)                    {vazao[n]:8.0f} escritas/s "
+              f"({vazao[n] / vazao[shards[0]]:.1f}x)")
+
+    # um script segura o lock do banco do grupo A: quanto esperam os votos
+    # do grupo B, no mesmo banco (antes) x no banco dele
+    async def com_lock(banco_a, banco_b, segundos=0.5, n=200):
+        pronto = threading.Event()
+        t = threading.Thread(target=segurar_lock, args=(segundos, pronto, banco_a))
+        t.start()
+        pronto.wait()
+        with database.usando_banco(banco_a):
+            bloqueada = asyncio.ensure_future(
+                database_async.escrever(database.registrar_usuario, 2_000_000, "a"))
+        await asyncio.sleep(0)
+        t0 = time.perf_counter()
+        with database.usando_banco(banco_b):
+            for i in range(n):
+                await database_async.escrever(database.registrar_usuario, 2_000_001 + i, "b")
+        espera = time.perf_counter() - t0
+        await bloqueada
+        t.join()
+        return espera / n
+
+    pasta = os.path.dirname(banco_temporario())
+    bancos = [os.path.join(pasta, f"bench_{k}.db") for k in range(2)]
+    for banco in bancos:
+        with database.usando_banco(banco):
+            database.create_tables()
+    for nome, (a, b) in (("mesmo banco (antes)", (bancos[0], bancos[0])),
+                         ("um banco por grupo", (bancos[0], bancos[1]))):
+        print(f"   • grupo B com A travado, {nome:<20} {asyncio.run(com_lock(a, b)) * 1e3:7.2f} ms/escrita")
+
+    # 2) roteamento: n_grupos grupos com os mesmos message_id nas enquetes
+    banco_temporario()
+    ids = [int(os.environ["GROUP_ID"])] + [-100900 - g for g in range(1, n_grupos)]
+    grupos_antes, group_ids_antes = main.GRUPOS, os.environ.get("GROUP_IDS")
+    os.environ["GROUP_IDS"] = ",".join(map(str, ids))
+    try:
+        main.GRUPOS = main._preparar_grupos()
+        for grupo in main.GRUPOS.values():
+            grupo.fila_votos.arquivo = os.path.join(os.path.dirname(database.DB_NAME),
+                                                    grupo.arquivo_pendentes)
+        for grupo, _ in grupos.em_cada_grupo(database.create_tables):
+            with database.usando_banco(grupo.banco):
+                popular(0, 2)
+                with database.transacao() as cur:
+                    cur.execute("UPDATE JOGO SET inicio_epoch = ?", (int(time.time()) + 3600,))
+                    cur.execute("UPDATE ENQUETE SET poll_id = ? || '_' || id_enquete",
+                                (str(grupo.chat_id),))
+
+        def usuario(uid):
+            return SimpleNamespace(id=uid, username=f"u{uid}", first_name="U")
+
+        async def rodar():
+            for grupo in main.GRUPOS.values():
+                await grupo.fila_votos.iniciar()
+            tarefas = []
+            for g, chat_id in enumerate(ids):
+                for uid in range(10_000 * (g + 1), 10_000 * (g + 1) + n_usuarios):
+                    # resposta na enquete: sem chat, roteada pelo poll_id
+                    resposta = SimpleNamespace(poll_id=f"{chat_id}_1", user=usuario(uid), option_ids=[1])
+                    tarefas.append(main.resposta_enquete(SimpleNamespace(poll_answer=resposta), None))
+            t0 = time.perf_counter()
+            await asyncio.gather(*tarefas)
+            roteamento = (time.perf_counter() - t0) / len(tarefas)
+            for grupo in main.GRUPOS.values():
+                await grupo.fila_votos.encerrar()
+            return roteamento
+
+        roteamento = asyncio.run(rodar())
+        print(f"   • resposta na enquete roteada  {roteamento * 1e6:8.1f} µs/update ({n_grupos} grupos)")
+    finally:
+        main.GRUPOS = grupos_antes
+        if group_ids_antes is None:
+            os.environ.pop("GROUP_IDS", None)
+        else:
+            os.environ["GROUP_IDS"] = group_ids_antes
+
+
+# Mede uma leitura do calendário num processo novo. O pico vem do VmHWM,
+# que zera no exec (o ru_maxrss herda o do processo pai no Linux)
+_MEDIR_LEITURA = """
+import json, resource, sys, time
+import get_nba
+
+def pico_kib():
+    try:
+        with open("/proc/self/status") as f:
+            for linha in f:
+                if linha.startswith("VmHWM:"):
+                    return int(linha.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+modo, caminho = sys.argv[1], sys.argv[2]
+antes = pico_kib()
+t0 = time.perf_counter()
+if modo == "arvore":
+    with open(caminho, "rb") as f:
+        datas = json.loads(f.read())["leagueSchedule"]["gameDates"]
+    jogos = list(get_nba.compactar_jogos(j for dia in datas for j in dia["games"]))
+else:
+    jogos = list(get_nba.jogos_da_temporada(caminho))
+segundos = time.perf_counter() - t0
+print(json.dumps({"jogos": len(jogos), "segundos": segundos, "pico_kib": pico_kib() - antes}))
+"""
+
+
+def bench_calendario_fluxo(n_jogos=1300, repeticoes=5):
+    """Leitura do scheduleLeagueV2_1.json: json.loads da árvore inteira
+    (antes) x leitura em fluxo de get_nba.jogos_da_temporada."""
+    import subprocess
+    import tracemalloc
+    import get_nba
+
+    caminho = os.path.join(tempfile.mkdtemp(prefix="nba_calendario_"), "scheduleLeagueV2_1.json")
+    salvar_calendario(caminho, calendario_da_cdn(n_jogos))
+    print(f"\n📊 calendario_fluxo — {n_jogos} jogos, {os.path.getsize(caminho) / 1e6:.1f} MB de JSON")
+
+    def arvore():
+        with open(caminho, "rb") as f:
+            datas = json.loads(f.read())["leagueSchedule"]["gameDates"]
+        return list(get_nba.compactar_jogos(j for dia in datas for j in dia["games"]))
+
+    def fluxo():
+        return list(get_nba.jogos_da_temporada(caminho))
+
+    for nome, func in (("json.loads inteiro (antes)", arvore), ("leitura em fluxo", fluxo)):
+        tempos = []
+        for _ in range(repeticoes):
+            t0 = time.perf_counter()
+            func()
+            tempos.append(time.perf_counter() - t0)
+        tracemalloc.start()
+        func()
+        pico_python = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        modo = "arvore" if func is arvore else "fluxo"
+        saida = subprocess.run([sys.executable, "-c", _MEDIR_LEITURA, modo, caminho], check=True,
+                               capture_output=True, text=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        rss = json.loads(saida.strip().splitlines()[-1])
+        print(f"   • {nome:<28} {statistics.median(tempos) * 1000:7.1f} ms | pico Python "
+              f"{pico_python / 1e6:6.1f} MB | pico RSS +{rss['pico_kib'] / 1024:6.1f} MB")
+
+
+def bench_indice_calendario(n_jogos=1300, n=2000):
+    """Calendário em memória: gameDates da CDN (lista de dicts) x
+    calendario.IndiceCalendario (__slots__ + índices por data e gameId)."""
+    import random
+    import tracemalloc
+    import calendario
+    import get_nba
+    rnd = random.Random(23)
+
+    corpo = json.dumps({"leagueSchedule": {"gameDates": calendario_da_cdn(n_jogos)}})
+    print(f"\n📊 indice_calendario — {n_jogos} jogos")
+
+    def medir_memoria(func):
+        tracemalloc.start()
+        objeto = func()
+        atual = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return objeto, atual
+
+    datas, mem_dicts = medir_memoria(lambda: json.loads(corpo)["leagueSchedule"]["gameDates"])
+    compactos = list(get_nba.compactar_jogos(j for dia in datas for j in dia["games"]))
+    indice, mem_indice = medir_memoria(lambda: _indice_de(calendario, compactos))
+    print(f"   • memória: dicts da CDN        {mem_dicts / 1e6:7.2f} MB")
+    print(f"   • memória: IndiceCalendario    {mem_indice / 1e6:7.2f} MB "
+          f"({mem_dicts / mem_indice:.0f}x menor)")
+
+    fuso = calendario.FUSO_LOCAL
+
+    def data_local(jogo):
+        return (datetime.fromisoformat(jogo["gameDateTimeUTC"].replace("Z", "")) + fuso).date()
+
+    def por_data_lista(data):
+        return [j["gameId"] for dia in datas for j in dia["games"] if data_local(j) == data]
+
+    def por_id_lista(game_id):
+        for dia in datas:
+            for j in dia["games"]:
+                if j["gameId"] == game_id:
+                    return j
+
+    todas_datas = sorted({data_local(j) for dia in datas for j in dia["games"]})
+    ids = [c[0] for c in compactos]
+    consultas_data = [rnd.choice(todas_datas) for _ in range(n)]
+    consultas_id = [rnd.choice(ids) for _ in range(n)]
+
+    for nome, lista, com_indice, consultas in (
+            ("jogos da data", por_data_lista, indice.jogos_da_data, consultas_data),
+            ("jogo por gameId", por_id_lista, indice.jogo, consultas_id)):
+        t0 = time.perf_counter()
+        for consulta in consultas[:n // 10]:
+            lista(consulta)
+        t_lista = (time.perf_counter() - t0) / (n // 10)
+        t0 = time.perf_counter()
+        for consulta in consultas:
+            com_indice(consulta)
+        t_indice = (time.perf_counter() - t0) / n
+        print(f"   • {nome:<20} varredura {t_lista * 1e6:8.1f} µs | índice {t_indice * 1e6:6.2f} µs")
+
+    # atualização: só os jogos remarcados mexem no índice
+    for k in rnd.sample(range(len(compactos)), 5):
+        c = list(compactos[k])
+        c[4] = "02:30:00" if c[4] != "02:30:00" else "03:30:00"
+        compactos[k] = tuple(c)
+    t0 = time.perf_counter()
+    indice.atualizar(compactos, completo=True)
+    t_incremental = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    _indice_de(calendario, compactos)
+    t_completo = time.perf_counter() - t0
+    print(f"   • 5 jogos remarcados           {t_incremental * 1000:7.2f} ms "
+          f"(refazer o índice: {t_completo * 1000:.2f} ms)")
+
+
+def _indice_de(calendario, compactos):
+    indice = calendario.IndiceCalendario()
+    indice.atualizar(compactos)
+    return indice
+
+
+BENCHMARKS = {
+    "conexao": bench_conexao,
+    "handlers_assincronos": bench_handlers_assincronos,
+    "fila_votos": bench_fila_votos,
+    "calendario": bench_calendario,
+    "calendario_fluxo": bench_calendario_fluxo,
+    "indice_calendario": bench_indice_calendario,
+    "cache_http": bench_cache_http,
+    "jogos_do_dia": bench_jogos_do_dia,
+    "pontuacao": bench_pontuacao,
+    "ranking": bench_ranking,
+    "cache_enquetes": bench_cache_enquetes,
+    "agendador": bench_agendador,
+    "placar_ao_vivo": bench_placar_ao_vivo,
+    "recuperar_resultados": bench_recuperar_resultados,
+    "envio": bench_envio,
+    "resposta_enquete": bench_resposta_enquete,
+    "webhook": bench_webhook,
+    "metricas": bench_metricas,
+    "estatisticas": bench_estatisticas,
+    "busca": bench_busca,
+    "arquivo": bench_arquivo,
+    "grupos": bench_grupos,
+}
+
+
+if __name__ == "__main__":
+    nomes = sys.argv[1:] or list(BENCHMARKS)
+    for nome in nomes:
+        BENCHMARKS[nome]()
@@ -0,0 +1,104 @@
+"""
+Busca por apelido e por nome de time.
+
+Usa os índices FTS5 com tokenizador trigram (BUSCA_USUARIO e BUSCA_JOGO,
+criados na migração 10 e mantidos por triggers): qualquer trecho com 3 ou
+mais caracteres é encontrado pelo índice, sem varrer a tabela, e sem
+diferenciar maiúsculas/minúsculas. Termos de 1 ou 2 caracteres não formam
+um trigrama; esses caem numa comparação LIKE (mais lenta, mas correta).
+
+Só os campos de CAMPOS podem ser buscados: o nome do campo nunca vem de
+fora para dentro do SQL.
+"""
+from database import transacao
+
+# campo -> (índice FTS, tabela, chave, colunas comparadas)
+CAMPOS = {
+    "apelido": ("BUSCA_USUARIO", "USUARIO_PARTICIPANTE", "id_usuario_participante", ("apelido",)),
+    "time_mandante": ("BUSCA_JOGO", "JOGO", "id_jogo", ("time_mandante",)),
+    "time_visitante": ("BUSCA_JOGO", "JOGO", "id_jogo", ("time_visitante",)),
+    "time": ("BUSCA_JOGO", "JOGO", "id_jogo", ("time_mandante", "time_visitante")),
+}
+
+MODOS = ("substring", "prefixo")
+
+# Menor termo que o tokenizador trigram consegue indexar
+MINIMO_TRIGRAMA = 3
+
+
+def _escapar_like(texto):
+    return texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _qualquer(colunas, condicao):
+    """`condicao` (com {c} no lugar da coluna) valendo para alguma coluna."""
+    return "(" + " OR ".join(condicao.format(c=f"t.{c}") for c in colunas) + ")"
+
+
+def montar_busca(campo, modo="substring", curto=False):
+    """SQL da busca (parâmetros nomeados :termo, :consulta, :padrao,
+    :prefixo e :limite). Separado de `buscar` para o verificador de planos."""
+    if campo not in CAMPOS:
+        raise ValueError(f"Campo de busca inválido: {campo!r} (use um de {', '.join(CAMPOS)})")
+    if modo not in MODOS:
+        raise ValueError(f"Modo de busca inválido: {modo!r} (use um de {', '.join(MODOS)})")
+    indice, tabela, chave, colunas = CAMPOS[campo]
+
+    if curto:
+        # sem trigrama o índice não ajuda: LIKE direto na tabela
+        origem = f"{tabela} t"
+        filtro = _qualquer(colunas, "{c} LIKE :padrao ESCAPE '\\'")
+        relevancia = "NULL"
+    else:
+        origem = f"{indice} b JOIN {tabela} t ON t.{chave} = b.rowid"
+        filtro = f"{indice} MATCH :consulta"
+        relevancia = f"bm25({indice})"
+    if modo == "prefixo":
+        filtro += " AND " + _qualquer(colunas, "{c} LIKE :prefixo ESCAPE '\\'")
+
+    # exato > começa com o termo > relevância do FTS > texto mais curto
+    exato = _qualquer(colunas, "lower({c}) = lower(:termo)")
+    comeca = _qualquer(colunas, "{c} LIKE :prefixo ESCAPE '\\'")
+    tamanho = f"min({', '.join(f'length(t.{c})' for c in colunas)})" if len(colunas) > 1 \
+        else f"length(t.{colunas[0]})"
+
+    return f"""
+        SELECT t.*
+        FROM {origem}
+        WHERE {filtro}
+        ORDER BY {exato} DESC, {comeca} DESC, {relevancia}, {tamanho}, t.{chave}
+        LIMIT :limite
+    """
+
+
+def _consulta_fts(campo, termo):
+    """Frase FTS5 com o termo literal (aspas dobradas), restrita às colunas
+    do campo."""
+    _, _, _, colunas = CAMPOS[campo]
+    frase = '"' + termo.replace('"', '""') + '"'
+    if len(colunas) == 1:
+        return f"{colunas[0]} : {frase}"
+    return "{" + " ".join(colunas) + "} : " + frase
+
+
+def buscar(campo, termo, modo="substring", limite=50):
+    """Linhas da tabela do campo (USUARIO_PARTICIPANTE para "apelido", JOGO
+    para os campos de time) que contêm `termo` (modo="substring") ou começam
+    com ele (modo="prefixo"), das mais relevantes para as menos.
+
+    limite=None devolve todas. Campo ou modo fora da lista: ValueError.
+    """
+    termo = (termo or "").strip()
+    sql = montar_busca(campo, modo, curto=len(termo) < MINIMO_TRIGRAMA)
+    if not termo:
+        return []
+
+    with transacao(escrita=False) as cur:
+        cur.execute(sql, {
+            "termo": termo,
+            "consulta": _consulta_fts(campo, termo),
+            "padrao": f"%{_escapar_like(termo)}%",
+            "prefixo": f"{_escapar_like(termo)}%",
+            "limite": -1 if limite is None else limite,
+        })
+        return cur.fetchall()
@@ -0,0 +1,180 @@
+"""
+Calendário da temporada em memória, para o processo de longa duração (bot
+com agendador, placar ao vivo).
+
+Cada jogo é um JogoCalendario (__slots__, sem __dict__), com os nomes e
+siglas dos times internados (sys.intern): os ~1.300 jogos compartilham as
+mesmas 30 strings de cada. Dois índices respondem sem varrer a temporada:
+  - game_id -> jogo (dict);
+  - data local -> jogos do dia, em ordem de início (dict de listas).
+
+O índice é alimentado com os jogos compactos de get_nba.jogo_compacto (o
+mesmo formato de database.sincronizar_jogos) e atualizado só no que mudou
+a cada atualizar_calendario(); o agendador o carrega do banco ao iniciar e
+antes de cada criação de enquetes (pega sincronizações de outro processo).
+Quem consulta: o agendador (há jogos do dia por começar?), o placar ao vivo
+(horário de início por gameId) e jogos_dos_grupos (o calendário cobre a
+janela?), sem ir a cada banco.
+"""
+import bisect
+import calendar
+import sys
+import threading
+from datetime import date, datetime, timedelta
+from operator import attrgetter
+
+from database import listar_calendario
+
+# Fuso do grupo (GMT-3, sem horário de verão): define a "data local" dos jogos
+FUSO_LOCAL = timedelta(hours=-3)
+
+# ordem dos jogos de cada data (o gameId desempata jogos no mesmo horário)
+_ordem = attrgetter("inicio_epoch", "game_id")
+
+
+def _epoch(data_utc, hora_utc):
+    """Epoch de "AAAA-MM-DD" + "HH:MM:SS" em UTC (fatiando; o strptime custa
+    dez vezes mais, e roda para cada jogo a cada atualização)."""
+    return calendar.timegm((int(data_utc[:4]), int(data_utc[5:7]), int(data_utc[8:10]),
+                            int(hora_utc[:2]), int(hora_utc[3:5]), int(hora_utc[6:8])))
+
+
+def _texto(valor):
+    return sys.intern(valor) if valor else valor
+
+
+class JogoCalendario:
+    __slots__ = ("game_id", "mandante", "visitante", "sigla_mandante", "sigla_visitante",
+                 "inicio_epoch", "status", "canal", "assinatura")
+
+    def __init__(self, game_id, mandante, visitante, sigla_mandante, sigla_visitante,
+                 inicio_epoch, status, canal, assinatura=None):
+        self.game_id = game_id
+        self.mandante = _texto(mandante)
+        self.visitante = _texto(visitante)
+        self.sigla_mandante = _texto(sigla_mandante)
+        self.sigla_visitante = _texto(sigla_visitante)
+        self.inicio_epoch = inicio_epoch
+        self.status = _texto(status)
+        self.canal = _texto(canal)
+        self.assinatura = assinatura    # hash() do jogo compacto de origem
+
+    @classmethod
+    def de_compacto(cls, jogo):
+        """A partir de (game_id, mandante, visitante, data_utc, hora_utc,
+        status, sigla_mandante, sigla_visitante, canal)."""
+        game_id, mandante, visitante, data_utc, hora_utc, status, sigla_m, sigla_v, canal = jogo
+        return cls(game_id, mandante, visitante, sigla_m, sigla_v, _epoch(data_utc, hora_utc),
+                   status, canal, hash(jogo))
+
+    def _campos(self):
+        return tuple(getattr(self, campo) for campo in self.__slots__[:-1])
+
+    def __eq__(self, outro):
+        return isinstance(outro, JogoCalendario) and self._campos() == outro._campos()
+
+    def __repr__(self):
+        return (f"JogoCalendario({self.game_id}, {self.sigla_visitante} x {self.sigla_mandante}, "
+                f"{datetime.utcfromtimestamp(self.inicio_epoch):%Y-%m-%d %H:%M} UTC)")
+
+
+class IndiceCalendario:
+    """Jogos da temporada por game_id e por data local.
+
+    Pode ser lido de várias threads; as atualizações trocam as listas de
+    cada data por listas novas, então quem está lendo não vê uma lista pela
+    metade.
+    """
+
+    def __init__(self, fuso=FUSO_LOCAL):
+        self._fuso = int(fuso.total_seconds())
+        self._por_id = {}       # game_id -> JogoCalendario
+        self._por_data = {}     # date local -> [JogoCalendario] em ordem de início
+        self._lock = threading.Lock()
+
+    def data_local(self, inicio_epoch):
+        return date.fromordinal(date(1970, 1, 1).toordinal() + (inicio_epoch + self._fuso) // 86400)
+
+    def atualizar(self, jogos, completo=False):
+        """Aplica os jogos compactos `jogos`; só os novos ou diferentes mexem
+        nos índices. Com `completo=True` (o calendário inteiro), jogos que
+        sumiram dele saem do índice. Retorna o conjunto de game_id alterados
+        (novos, mudados ou removidos)."""
+        alterados = set()
+        vistos = set()
+        with self._lock:
+            for compacto in jogos:
+                compacto = tuple(compacto)
+                vistos.add(compacto[0])
+                atual = self._por_id.get(compacto[0])
+                # jogo igual ao da última vez: nem monta o JogoCalendario
+                if atual is not None and atual.assinatura == hash(compacto):
+                    continue
+                novo = JogoCalendario.de_compacto(compacto)
+                if atual == novo:
+                    atual.assinatura = novo.assinatura
+                    continue
+                if atual is not None:
+                    self._tirar(atual)
+                self._por_id[novo.game_id] = novo
+                data = self.data_local(novo.inicio_epoch)
+                dia = list(self._por_data.get(data, ()))
+                bisect.insort(dia, novo, key=_ordem)
+                self._por_data[data] = dia
+                alterados.add(novo.game_id)
+            if completo:
+                for game_id in self._por_id.keys() - vistos:
+                    self._tirar(self._por_id.pop(game_id))
+                    alterados.add(game_id)
+        return alterados
+
+    def _tirar(self, jogo):
+        data = self.data_local(jogo.inicio_epoch)
+        dia = [j for j in self._por_data.get(data, ()) if j is not jogo]
+        if dia:
+            self._por_data[data] = dia
+        else:
+            self._por_data.pop(data, None)
+
+    def jogo(self, game_id):
+        """O jogo pelo gameId da NBA (ou None)."""
+        return self._por_id.get(game_id)
+
+    def jogos_da_data(self, data):
+        """Jogos da data local `data` (datetime.date), em ordem de início
+        (e de gameId)."""
+        return self._por_data.get(data, [])
+
+    def jogos_entre(self, inicio_epoch, fim_epoch):
+        """Jogos com início em [inicio_epoch, fim_epoch), em ordem de início."""
+        jogos = []
+        data, ultima = self.data_local(inicio_epoch), self.data_local(fim_epoch)
+        while data <= ultima:
+            dia = self._por_data.get(data, ())
+            jogos.extend(dia[bisect.bisect_left(dia, (inicio_epoch,), key=_ordem):
+                             bisect.bisect_left(dia, (fim_epoch,), key=_ordem)])
+            data += timedelta(days=1)
+        return jogos
+
+    def cobre(self, fim_epoch):
+        """True se algum jogo começa a partir de `fim_epoch` (o calendário
+        carregado vai além dessa janela), como database.calendario_cobre."""
+        if not self._por_data:
+            return False
+        return self._por_data[max(self._por_data)][-1].inicio_epoch >= fim_epoch
+
+    def __len__(self):
+        return len(self._por_id)
+
+    def __contains__(self, game_id):
+        return game_id in self._por_id
+
+
+# Índice do processo: atualizar_calendario() o mantém em dia
+indice = IndiceCalendario()
+
+
+def carregar_do_banco():
+    """Preenche o índice com os jogos do banco atual (database.usando_banco).
+    Retorna quantos jogos entraram, mudaram ou saíram."""
+    return len(indice.atualizar(listar_calendario(), completo=True))
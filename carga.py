@@ -0,0 +1,397 @@
+"""
+Carga sintética e suíte de benchmarks dos caminhos quentes do bot.
+
+Semeia um banco com usuários, jogos, enquetes e votos em quantidades
+configuráveis e mede:
+  - os handlers /start, /votar_X, o clique do voto (callback_voto) e
+    /ranking do main.py, com Updates falsos e sem falar com o Telegram;
+  - atualizar_calendario (calendário sintético) e atualizar_resultados
+    (scoreboard sintético, sem rede);
+  - as consultas de consultas.py.
+
+O resultado (vazão e percentis de latência por cenário) sai em JSON para
+ser comparado entre execuções; com --comparar, o script termina com código
+1 se algum cenário piorar além do limite.
+
+Uso:
+    python carga.py --saida base.json
+    python carga.py --usuarios 50000 --comparar base.json --limite 0.2
+    python carga.py --so handlers.votar,consultas --saida -
+
+Cada rodada usa um banco novo numa pasta temporária e o resultado é a
+mediana das rodadas; o nba.db nunca é tocado. Para só gerar um banco
+sintético (ex.: para testar o bot à mão): python carga.py --banco teste.db
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import database
+from apoio_bench import (banco_temporario, calendario_sintetico, contexto, grupo_unico, importar_main,
+                         update_clique, update_mensagem)
+
+# Métricas comparadas e em que direção "piorar" significa
+MENOR_MELHOR = ("p50_ms", "p99_ms")
+MAIOR_MELHOR = ("ops_s",)
+
+# Opções que não mudam a carga (não entram na comparação de parâmetros)
+NAO_PARAMETROS = ("so", "banco", "saida", "comparar", "limite", "limite_p99")
+
+# Diferenças abaixo disso (ms) são ruído, mesmo que a variação relativa seja grande
+PISO_MS = 0.05
+
+
+# ----------------------------
+# Banco sintético
+# ----------------------------
+def semear(n_usuarios, n_jogos, n_votos, semente=42):
+    """Usuários, jogos (metade já disputada, sem resultado; metade por vir),
+    uma enquete por jogo e `n_votos` votos aleatórios, sem repetir
+    usuário/enquete. Retorna {"passados": [...], "futuros": [...]} com
+    (game_id_nba, message_id) de cada jogo."""
+    rnd = random.Random(semente)
+    agora = int(time.time())
+    passados, futuros = [], []
+
+    with database.transacao() as cur:
+        cur.executemany("""
+            INSERT INTO USUARIO_PARTICIPANTE (telegram_user_id, apelido)
+            VALUES (?, ?)
+        """, [(1000 + i, f"user{i}") for i in range(n_usuarios)])
+
+        jogos = []
+        for i in range(n_jogos):
+            # passados: a cada 3h para trás; futuros: a partir de amanhã
+            inicio = agora - 3 * 3600 * (i + 1) if i % 2 == 0 else agora + 86400 + 1800 * i
+            dt = datetime.utcfromtimestamp(inicio)
+            game_id = f"00226{i:05d}"
+            jogos.append((game_id, f"Home {i % 30}", f"Away {i % 30}",
+                          dt.strftime("%Y-%m-%d"), dt.strftime("%H:%M:%S"), inicio))
+            (passados if inicio < agora else futuros).append((game_id, 20_000 + i))
+        cur.executemany("""
+            INSERT INTO JOGO (game_id_nba, time_mandante, time_visitante,
+                              data_utc, hora_utc, inicio_epoch)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, jogos)
+        cur.executemany("""
+            INSERT INTO ENQUETE (id_jogo, message_id, poll_id) VALUES (?, ?, ?)
+        """, [(i + 1, 20_000 + i, f"poll{i}") for i in range(n_jogos)])
+
+        por_enquete = min(n_usuarios, n_votos // max(n_jogos, 1))
+        votos = (
+            (uid, id_enquete, rnd.choice("MV"))
+            for id_enquete in range(1, n_jogos + 1)
+            for uid in rnd.sample(range(1, n_usuarios + 1), por_enquete)
+        )
+        cur.executemany("""
+            INSERT INTO VOTO (id_usuario_participante, id_enquete, escolha, data_hora)
+            VALUES (?, ?, ?, '2025-01-01T00:00:00')
+        """, votos)
+        cur.execute("""
+            UPDATE USUARIO_PARTICIPANTE
+            SET frequencia_participacao = (
+                SELECT COUNT(*) FROM VOTO v
+                WHERE v.id_usuario_participante = USUARIO_PARTICIPANTE.id_usuario_participante
+            )
+        """)
+    # os votos entraram direto na VOTO: as estatísticas saem do recálculo
+    database.reconstruir_estatisticas()
+
+    return {"passados": passados, "futuros": futuros}
+
+
+# ----------------------------
+# Medição
+# ----------------------------
+def _percentil(ordenadas, p):
+    return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * p))]
+
+
+def estatisticas(amostras, duracao):
+    """Resumo de uma lista de latências (s) medidas em `duracao` s de parede."""
+    ordenadas = sorted(amostras)
+    return {
+        "n": len(ordenadas),
+        "ops_s": round(len(ordenadas) / duracao, 1) if duracao else None,
+        "media_ms": round(sum(ordenadas) / len(ordenadas) * 1000, 4),
+        "p50_ms": round(_percentil(ordenadas, 0.50) * 1000, 4),
+        "p95_ms": round(_percentil(ordenadas, 0.95) * 1000, 4),
+        "p99_ms": round(_percentil(ordenadas, 0.99) * 1000, 4),
+        "max_ms": round(ordenadas[-1] * 1000, 4),
+    }
+
+
+def medir(func, argumentos):
+    """Chama func(*args) para cada args, em série (sem os prints da função).
+
+    Se a função falhar, o cenário sai com {"erro": ...} em vez de derrubar a
+    suíte."""
+    amostras = []
+    inicio = time.perf_counter()
+    with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+        for args in argumentos:
+            t0 = time.perf_counter()
+            try:
+                func(*args)
+            except Exception as e:
+                return {"erro": f"{type(e).__name__}: {e}"}
+            amostras.append(time.perf_counter() - t0)
+    return estatisticas(amostras, time.perf_counter() - inicio)
+
+
+async def medir_async(handler, updates, concorrencia):
+    """Roda handler(update, contexto) para cada item, até `concorrencia` de
+    uma vez (como o bot com updates concorrentes)."""
+    limite = asyncio.Semaphore(concorrencia)
+    amostras = []
+
+    async def um(update, contexto):
+        async with limite:
+            t0 = time.perf_counter()
+            await handler(update, contexto)
+            amostras.append(time.perf_counter() - t0)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(um(u, c) for u, c in updates))
+    return estatisticas(amostras, time.perf_counter() - inicio)
+
+
+# ----------------------------
+# Cenários
+# ----------------------------
+def cenario_handlers(p, jogos, rnd):
+    from fila_votos import FilaVotos
+    main = importar_main()
+    pasta = os.path.dirname(database.DB_NAME)
+    usuarios = [1000 + i for i in range(p.usuarios)]
+    futuros = [message_id for _, message_id in jogos["futuros"]]
+    n = p.operacoes
+
+    async def rodar():
+        grupo_unico(main).fila_votos = FilaVotos(arquivo=os.path.join(pasta, "pendentes.jsonl"))
+        await grupo_unico(main).fila_votos.iniciar()
+        r = {}
+        try:
+            r["handlers.start"] = await medir_async(main.start, [
+                (update_mensagem(5_000_000 + i, "/start"), contexto()) for i in range(n)
+            ], p.concorrencia)
+            r["handlers.votar"] = await medir_async(main.votar, [
+                (update_mensagem(rnd.choice(usuarios), f"/votar_{rnd.choice(futuros)}"), contexto())
+                for _ in range(n)
+            ], p.concorrencia)
+            # cada clique é de um par usuário/enquete diferente (voto novo)
+            pares = rnd.sample(range(len(usuarios) * len(futuros)), min(n, len(usuarios) * len(futuros)))
+            r["handlers.callback_voto"] = await medir_async(main.callback_voto, [
+                (update_clique(usuarios[k % len(usuarios)], futuros[k // len(usuarios)], rnd.choice("MV")),
+                 contexto())
+                for k in pares
+            ], p.concorrencia)
+            paginas = max(1, p.usuarios // 20)
+            r["handlers.ranking"] = await medir_async(main.ranking, [
+                (update_mensagem(rnd.choice(usuarios), "/ranking"), contexto(str(rnd.randint(1, paginas))))
+                for _ in range(n)
+            ], p.concorrencia)
+        finally:
+            await grupo_unico(main).fila_votos.encerrar()
+        return r
+
+    return asyncio.run(rodar())
+
+
+def cenario_calendario(p, jogos, rnd):
+    from atualizar_calendario import atualizar_calendario
+    datas = calendario_sintetico(p.jogos_calendario)
+    r = {"calendario.primeira_carga": medir(atualizar_calendario, [(datas,)])}
+    # execuções seguintes: calendário inalterado (o caso de todo dia)
+    r["calendario.sem_mudancas"] = medir(atualizar_calendario, [(datas,)] * p.repeticoes)
+    return r
+
+
+def cenario_resultados(p, jogos, rnd):
+    import atualizar_resultados
+    passados = [game_id for game_id, _ in jogos["passados"]]
+    # cada execução vê um scoreboard com jogos que acabaram de terminar
+    por_rodada = max(1, len(passados) // p.repeticoes)
+    placares = []
+    for i in range(0, len(passados), por_rodada):
+        placares.append({"scoreboard": {"games": [
+            {"gameId": game_id, "gameStatusText": "Final",
+             "homeTeam": {"score": 100 + rnd.randrange(20)},
+             "awayTeam": {"score": 100 + rnd.randrange(20)}}
+            for game_id in passados[i:i + por_rodada]
+        ]}})
+
+    obter_original = atualizar_resultados.obter_json_nba
+    fila = iter(placares)
+    atualizar_resultados.obter_json_nba = lambda: next(fila)
+    try:
+        return {"resultados.atualizar": medir(atualizar_resultados.atualizar, [()] * len(placares))}
+    finally:
+        atualizar_resultados.obter_json_nba = obter_original
+
+
+def cenario_consultas(p, jogos, rnd):
+    import consultas
+    return {
+        "consultas.agrupamento": medir(consultas.consulta_agrupamento, [()] * p.repeticoes),
+        "consultas.ordenacao": medir(consultas.consulta_ordenacao, [()] * p.repeticoes),
+        "consultas.busca_substring": medir(consultas.busca_substring, [
+            ("apelido", f"user{rnd.randrange(p.usuarios)}") for _ in range(p.repeticoes)
+        ]),
+        "consultas.join_complexo": medir(consultas.consulta_join_complexo, [()] * p.repeticoes),
+        "consultas.com_any": medir(consultas.consulta_com_any, [()] * p.repeticoes),
+    }
+
+
+CENARIOS = {
+    "handlers": cenario_handlers,
+    "calendario": cenario_calendario,
+    "resultados": cenario_resultados,
+    "consultas": cenario_consultas,
+}
+
+
+# ----------------------------
+# Comparação com uma execução anterior
+# ----------------------------
+def comparar(atual, base, limite, limite_p99):
+    """Lista as regressões de `atual` em relação a `base` (dicts de resultados).
+
+    Latência: piora se subir mais que `limite` (p99: `limite_p99`) e mais que
+    PISO_MS. Vazão: piora se cair mais que `limite`. Cenários que só existem
+    num dos lados são ignorados; um cenário que passou a falhar é regressão.
+    """
+    regressoes = []
+    for nome, antes in base.items():
+        depois = atual.get(nome)
+        if depois is None:
+            continue
+        if "erro" in depois:
+            if "erro" not in antes:
+                regressoes.append((nome, "erro", None, depois["erro"]))
+            continue
+        for metrica in MENOR_MELHOR:
+            tolerancia = limite_p99 if metrica == "p99_ms" else limite
+            a, d = antes.get(metrica), depois.get(metrica)
+            if a is not None and d is not None and d - a > PISO_MS and d > a * (1 + tolerancia):
+                regressoes.append((nome, metrica, a, d))
+        for metrica in MAIOR_MELHOR:
+            a, d = antes.get(metrica), depois.get(metrica)
+            if a and d is not None and d < a * (1 - limite):
+                regressoes.append((nome, metrica, a, d))
+    return regressoes
+
+
+def _argumentos(argv):
+    parser = argparse.ArgumentParser(description="Carga sintética e benchmarks do bot.")
+    parser.add_argument("--usuarios", type=int, default=10_000)
+    parser.add_argument("--jogos", type=int, default=200, help="jogos/enquetes no banco")
+    parser.add_argument("--votos", type=int, default=200_000)
+    parser.add_argument("--jogos-calendario", type=int, default=1300)
+    parser.add_argument("--operacoes", type=int, default=2000, help="chamadas por handler")
+    parser.add_argument("--repeticoes", type=int, default=20, help="execuções por função síncrona")
+    parser.add_argument("--concorrencia", type=int, default=32, help="updates simultâneos nos handlers")
+    parser.add_argument("--rodadas", type=int, default=3,
+                        help="rodadas (cada uma num banco novo); vale a mediana")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--so", help="cenários ou métricas (ex.: handlers,consultas.ordenacao)")
+    parser.add_argument("--banco", help="só semeia este arquivo (novo) e sai, sem medir")
+    parser.add_argument("--saida", help="grava o JSON neste arquivo ('-' = stdout)")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior")
+    parser.add_argument("--limite", type=float, default=0.25,
+                        help="piora relativa tolerada em p50 e vazão (0.20 = 20%%)")
+    parser.add_argument("--limite-p99", type=float, default=0.50,
+                        help="piora relativa tolerada no p99")
+    return parser.parse_args(argv)
+
+
+def _rodada(p, filtros, log):
+    """Semeia um banco temporário novo e roda os cenários escolhidos nele."""
+    banco_temporario()
+    t0 = time.perf_counter()
+    jogos = semear(p.usuarios, p.jogos, p.votos, p.semente)
+    print(f"🌱 Banco semeado em {time.perf_counter() - t0:.1f}s ({database.DB_NAME})", file=log)
+
+    resultados = {}
+    for nome, cenario in CENARIOS.items():
+        if filtros and not any(f.split(".")[0] == nome for f in filtros):
+            continue
+        rnd = random.Random(f"{p.semente}:{nome}")
+        for chave, r in cenario(p, jogos, rnd).items():
+            if not filtros or any(chave.startswith(f) for f in filtros):
+                resultados[chave] = r
+    return resultados
+
+
+def _mediana(rodadas):
+    """Junta as rodadas de um cenário: mediana de cada métrica."""
+    if any("erro" in r for r in rodadas):
+        return next(r for r in rodadas if "erro" in r)
+    return {k: statistics.median(r[k] for r in rodadas) if rodadas[0][k] is not None else None
+            for k in rodadas[0]}
+
+
+def executar(argv=None):
+    p = _argumentos(argv)
+    filtros = p.so.split(",") if p.so else None
+    log = sys.stderr if p.saida == "-" else sys.stdout
+
+    if p.banco:
+        if os.path.exists(p.banco):
+            sys.exit(f"❌ {p.banco} já existe; a carga só semeia bancos novos.")
+        database.DB_NAME = p.banco
+        database.create_tables()
+        semear(p.usuarios, p.jogos, p.votos, p.semente)
+        print(f"🌱 {p.banco} semeado: {p.usuarios} usuários, {p.jogos} jogos, {p.votos} votos")
+        return
+
+    print(f"📊 carga — {p.usuarios} usuários, {p.jogos} jogos, {p.votos} votos, "
+          f"{p.rodadas} rodada(s)", file=log)
+    rodadas = [_rodada(p, filtros, log) for _ in range(p.rodadas)]
+    resultados = {chave: _mediana([r[chave] for r in rodadas]) for chave in rodadas[0]}
+    for chave, r in resultados.items():
+        if "erro" in r:
+            print(f"   ⚠️ {chave:<27} {r['erro']}", file=log)
+        else:
+            print(f"   • {chave:<28} {r['ops_s'] or 0:10.1f} ops/s | p50 {r['p50_ms']:9.3f} ms"
+                  f" | p99 {r['p99_ms']:9.3f} ms | n={r['n']}", file=log)
+
+    relatorio = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "parametros": {k: v for k, v in vars(p).items() if k not in NAO_PARAMETROS},
+        "ambiente": {"python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+                     "plataforma": platform.platform()},
+        "resultados": resultados,
+    }
+    if p.saida == "-":
+        json.dump(relatorio, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    elif p.saida:
+        with open(p.saida, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, indent=2, ensure_ascii=False)
+        print(f"💾 Resultados em {p.saida}", file=log)
+
+    if p.comparar:
+        with open(p.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+        if base.get("parametros") != relatorio["parametros"]:
+            print("⚠️ Parâmetros diferentes da execução de base; a comparação pode não valer.", file=log)
+        regressoes = comparar(resultados, base["resultados"], p.limite, p.limite_p99)
+        for nome, metrica, antes, depois in regressoes:
+            print(f"❌ Regressão em {nome}.{metrica}: {antes} → {depois}", file=log)
+        if regressoes:
+            sys.exit(1)
+        print(f"✅ Sem regressões em relação a {p.comparar}", file=log)
+
+
+if __name__ == "__main__":
+    executar()
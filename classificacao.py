@@ -0,0 +1,140 @@
+"""
+Ranking mantido em memória pelo bot.
+
+O /ranking lia e ordenava a tabela inteira a cada comando. Aqui o ranking
+é carregado uma vez (pela ordem do índice de pontuação) e depois:
+  - é recarregado inteiro só quando a pontuação muda (atualizar_resultados
+    incrementa `versao_pontuacao` no banco, que é uma leitura por chave
+    primária) ou num cadastro pelo /start (`invalidar()`);
+  - a cada lote de votos gravado pela fila (`alterados(ids)`), só as
+    linhas desses usuários são relidas e reposicionadas, já que a
+    frequência de participação também entra na ordem e no texto.
+
+Além da lista ordenada, guarda um índice telegram_user_id -> posição, então
+o /meu_rank não varre nada.
+"""
+import asyncio
+import bisect
+
+from database import listar_classificacao, usando_banco, versao_pontuacao
+from database_async import ler
+
+POR_PAGINA = 20
+
+
+class Classificacao:
+    def __init__(self, banco=None):
+        self.banco = banco         # banco do grupo (None = database.DB_NAME)
+        self._linhas = []          # (telegram_user_id, apelido, pontos, freq)
+        self._chaves = []          # (-pontos, -freq, id_usuario_participante), na ordem de _linhas
+        self._posicao = {}         # telegram_user_id -> índice em _linhas
+        self._versao = None
+        self._completa = False     # False: recarrega tudo na próxima consulta
+        self._alterados = set()    # id_usuario_participante a reposicionar
+        self._lock = None
+        self._loop = None
+
+    def _trava(self):
+        """Lock das atualizações no event loop atual (o bot roda um só; os
+        benchmarks, vários em sequência)."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._lock, self._loop = asyncio.Lock(), loop
+        return self._lock
+
+    def invalidar(self):
+        """Marca o ranking para ser recarregado inteiro na próxima consulta."""
+        self._completa = False
+
+    def alterados(self, ids_usuario):
+        """Usuários cujos votos acabaram de ser gravados (FilaVotos chama com
+        os id_usuario_participante de cada lote): na próxima consulta, só as
+        linhas deles são relidas."""
+        self._alterados.update(ids_usuario)
+
+    async def atualizar(self):
+        """Recarrega do banco se a pontuação mudou; senão, reposiciona só os
+        usuários alterados."""
+        async with self._trava():
+            with usando_banco(self.banco):
+                versao = await ler(versao_pontuacao)
+                if versao != self._versao or not self._completa:
+                    # o que mudar durante a leitura fica para a próxima consulta
+                    self._completa = True
+                    self._alterados.clear()
+                    try:
+                        linhas = await ler(listar_classificacao)
+                    except BaseException:
+                        self._completa = False
+                        raise
+                    self._carregar(linhas)
+                    self._versao = versao
+                    return
+
+                if not self._alterados:
+                    return
+                ids, self._alterados = self._alterados, set()
+                try:
+                    linhas = await ler(listar_classificacao, ids)
+                except BaseException:
+                    self._alterados |= ids
+                    raise
+            for linha in linhas:
+                self._reposicionar(*linha)
+
+    def _carregar(self, linhas):
+        self._linhas = [(tg, nome, pts, freq) for _, tg, nome, pts, freq in linhas]
+        self._chaves = [(-pts, -freq, id_usuario) for id_usuario, _, _, pts, freq in linhas]
+        self._posicao = {linha[0]: i for i, linha in enumerate(self._linhas)}
+
+    def _reposicionar(self, id_usuario, tg, nome, pts, freq):
+        """Tira a linha do usuário do lugar antigo e a insere no novo; só as
+        posições entre os dois lugares mudam no índice."""
+        antiga = self._posicao.get(tg)
+        chave = (-pts, -freq, id_usuario)
+        if antiga is not None:
+            # continua entre os mesmos vizinhos: troca no lugar
+            if ((antiga == 0 or self._chaves[antiga - 1] < chave) and
+                    (antiga == len(self._chaves) - 1 or chave < self._chaves[antiga + 1])):
+                self._chaves[antiga] = chave
+                self._linhas[antiga] = (tg, nome, pts, freq)
+                return
+            del self._linhas[antiga]
+            del self._chaves[antiga]
+        nova = bisect.bisect_left(self._chaves, chave)
+        self._chaves.insert(nova, chave)
+        self._linhas.insert(nova, (tg, nome, pts, freq))
+
+        inicio, fim = (nova, len(self._linhas)) if antiga is None else (min(antiga, nova), max(antiga, nova) + 1)
+        for i in range(inicio, fim):
+            self._posicao[self._linhas[i][0]] = i
+
+    def total_paginas(self):
+        return max(1, -(-len(self._linhas) // POR_PAGINA))
+
+    def pagina(self, numero):
+        """Retorna [(posição, apelido, pontos, freq)] da página (começa em 1)."""
+        inicio = (numero - 1) * POR_PAGINA
+        return [
+            (inicio + i + 1, nome, pts, freq)
+            for i, (_, nome, pts, freq) in enumerate(self._linhas[inicio:inicio + POR_PAGINA])
+        ]
+
+    def vizinhanca(self, telegram_user_id, raio=2):
+        """Posição do usuário e de quem está logo acima e abaixo dele.
+
+        Retorna (posição, [(posição, apelido, pontos, freq)]) ou None se o
+        usuário não está no ranking.
+        """
+        i = self._posicao.get(telegram_user_id)
+        if i is None:
+            return None
+
+        inicio = max(0, i - raio)
+        return i + 1, [
+            (inicio + k + 1, nome, pts, freq)
+            for k, (_, nome, pts, freq) in enumerate(self._linhas[inicio:i + raio + 1])
+        ]
+
+    def __len__(self):
+        return len(self._linhas)
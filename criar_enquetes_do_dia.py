@@ -6,65 +6,95 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-from telegram import Bot
-from get_nba import obter_calendario_completo
-from database import connect, registrar_enquete
+import calendario
+from atualizar_calendario import atualizar_calendario
+from calendario import FUSO_LOCAL
+from database import (calendario_cobre, epoch_utc, listar_jogos_entre, registrar_enquete,
+                      usando_banco)
+from database_async import escrever
+from envio import Enviador, criar_bot
+from grupos import em_cada_grupo, grupos_configurados
 
 BOT_TOKEN = os.getenv("BOT_TOKEN")
-GROUP_ID = int(os.getenv("GROUP_ID"))
 
 
-def _extrair_canal(jogo: dict) -> str | None:
-    """Tenta extrair um canal de TV amigável da estrutura broadcasters."""
-    b = jogo.get("broadcasters", {}) or {}
+# Até que hora local da madrugada seguinte um jogo ainda conta como "de
+# hoje" (o fuso, FUSO_LOCAL, fica em calendario.py)
+HORA_LIMITE_MADRUGADA = 2
 
-    # ordem de preferência
-    chaves = [
-        "intlTvBroadcasters",
-        "nationalTvBroadcasters",
-        "homeTvBroadcasters",
-        "awayTvBroadcasters",
-    ]
 
-    for chave in chaves:
-        arr = b.get(chave) or []
-        for item in arr:
-            if item.get("broadcasterMedia") == "tv":
-                return item.get("broadcasterDisplay")
-    return None
+def janela_do_dia(agora_utc):
+    """Retorna (inicio_utc, fim_utc) do 'dia' local que contém `agora_utc`.
 
+    O dia vai das 00h locais de hoje até as 02h locais de amanhã:
+      - todos os jogos da data local == hoje
+      - jogos da data local == amanhã e hora_local < 2 (0h–1h59)
+    """
+    hoje_local = (agora_utc + FUSO_LOCAL).date()
+    inicio_local = datetime.combine(hoje_local, datetime.min.time())
+    fim_local = inicio_local + timedelta(days=1, hours=HORA_LIMITE_MADRUGADA)
+    return inicio_local - FUSO_LOCAL, fim_local - FUSO_LOCAL
 
-def jogos_do_dia():
-    """Retorna jogos do 'dia' considerando GMT-3 e janela até 02h da manhã."""
-    agora_utc = datetime.utcnow()
-    agora_local = agora_utc - timedelta(hours=3)
-    hoje_local = agora_local.date()
-    amanha_local = hoje_local + timedelta(days=1)
 
-    datas = obter_calendario_completo()
-    jogos = []
-
-    for dia in datas:
-        for jogo in dia["games"]:
-            game_datetime = jogo.get("gameDateTimeUTC")
-            if not game_datetime:
-                continue
+def jogos_do_dia(agora_utc=None, sem_enquete=False):
+    """Retorna jogos do 'dia' considerando GMT-3 e janela até 02h da manhã.
 
-            dt_utc = datetime.fromisoformat(game_datetime.replace("Z", ""))
-            dt_local = dt_utc - timedelta(hours=3)
+    Lê do banco (tabela JOGO, já sincronizada por atualizar_calendario).
+    Só baixa o calendário da CDN se o banco ainda não cobre esta janela.
+    Com `sem_enquete`, só os jogos por começar que ainda não têm enquete: os
+    da madrugada (00h–02h) já ganharam a sua na véspera.
+    """
+    if agora_utc is None:
+        agora_utc = datetime.utcnow()
+    inicio_utc, fim_utc = janela_do_dia(agora_utc)
+    inicio, fim = epoch_utc(inicio_utc), epoch_utc(fim_utc)
+    if sem_enquete:
+        inicio = max(inicio, epoch_utc(agora_utc))
 
-            data_local = dt_local.date()
-            hora_local = dt_local.hour
+    if not calendario_cobre(fim):
+        print("Calendário local desatualizado, sincronizando com a NBA...")
+        atualizar_calendario()
 
-            # critério de "dia de hoje":
-            #  - todos os jogos da data local == hoje
-            #  - jogos da data local == amanhã e hora_local < 2 (0h–1h59)
-            if data_local == hoje_local or (data_local == amanha_local and hora_local < 2):
-                jogos.append((jogo, dt_local))
+    jogos = []
+    linhas = listar_jogos_entre(inicio, fim, int(FUSO_LOCAL.total_seconds()), sem_enquete)
+    for (id_jogo, game_id, mandante, visitante, sigla_mandante, sigla_visitante,
+         canal, inicio_epoch, hora_local) in linhas:
+        jogos.append({
+            "id_jogo": id_jogo,
+            "game_id": game_id,
+            "mandante": mandante,
+            "visitante": visitante,
+            "sigla_mandante": sigla_mandante or "",
+            "sigla_visitante": sigla_visitante or "",
+            "canal": canal,
+            "inicio_epoch": inicio_epoch,
+            "hora_local": hora_local,
+        })
 
     return jogos
 
 
+def jogos_dos_grupos(agora_utc=None, grupos=None, sem_enquete=False):
+    """jogos_do_dia() no banco de cada grupo: [(grupo, jogos)].
+
+    Se o calendário não cobre a janela, ele é baixado uma vez só
+    (atualizar_calendario já grava em todos os bancos). No bot, quem
+    responde é o calendário em memória; num script, o banco de cada grupo.
+    """
+    if agora_utc is None:
+        agora_utc = datetime.utcnow()
+    grupos = grupos or grupos_configurados()
+    fim = epoch_utc(janela_do_dia(agora_utc)[1])
+    if len(calendario.indice):
+        cobre = calendario.indice.cobre(fim)
+    else:
+        cobre = all(c for _, c in em_cada_grupo(calendario_cobre, fim, grupos=grupos))
+    if not cobre:
+        print("Calendário local desatualizado, sincronizando com a NBA...")
+        atualizar_calendario()
+    return em_cada_grupo(jogos_do_dia, agora_utc, sem_enquete, grupos=grupos)
+
+
 def limpar_texto_telegram(texto: str) -> str:
     """Remove caracteres problemáticos para o parse do Telegram."""
     # Substituir caracteres que podem causar problemas no parse
@@ -74,81 +104,81 @@ def limpar_texto_telegram(texto: str) -> str:
     return texto
 
 
-async def criar_enquetes():
-    bot = Bot(BOT_TOKEN)
-    jogos = jogos_do_dia()
+async def criar_enquetes(bot=None, jogos=None, enviador=None, chat_id=None):
+    """Envia o resumo do dia e uma enquete por jogo.
+
+    O agendador passa o próprio `enviador` e os `jogos` já carregados (fora
+    do event loop); rodando como script, cria os dois aqui. As enquetes dos
+    jogos saem em paralelo, dentro dos limites de flood do Telegram.
+    Sem `chat_id`, vai para o grupo principal; as enquetes são registradas
+    no banco do contexto (database.usando_banco).
+    """
+    if enviador is None:
+        enviador = Enviador(bot or criar_bot(BOT_TOKEN))
+    if chat_id is None:
+        chat_id = grupos_configurados()[0].chat_id
+    if jogos is None:
+        jogos = jogos_do_dia(sem_enquete=True)
 
     if not jogos:
         print("Nenhum jogo hoje.")
         return
 
-    conn = connect()
-    cur = conn.cursor()
-
     # Enviar mensagem principal com todos os jogos do dia (sem formatação para evitar erros)
     mensagem_principal = "🏀 APOSTAS DE HOJE! 🏀\n\n"
     
-    for jogo, dt_local in jogos:
-        home = jogo["homeTeam"]
-        away = jogo["awayTeam"]
-        mandante_sigla = home.get("teamTricode", "")
-        visitante_sigla = away.get("teamTricode", "")
-        hora_local_str = dt_local.strftime("%Hh%M")
-        canal = _extrair_canal(jogo)
+    for jogo in jogos:
+        mandante_sigla = jogo["sigla_mandante"]
+        visitante_sigla = jogo["sigla_visitante"]
+        hora_local_str = jogo["hora_local"]
+        canal = jogo["canal"]
         
         if canal:
             mensagem_principal += f"• {hora_local_str} {canal} — {visitante_sigla} x {mandante_sigla}\n"
         else:
             mensagem_principal += f"• {hora_local_str} — {visitante_sigla} x {mandante_sigla}\n"
     
-    mensagem_principal += "\nParticipe do ranking oficial usando /votar_ID após cada enquete!"
+    mensagem_principal += "\nVote nas enquetes abaixo: seu voto já vale para o ranking oficial!"
     
     # Enviar mensagem principal (sem parse_mode para evitar erros)
     try:
-        pinned_msg = await bot.send_message(
-            chat_id=GROUP_ID,
+        pinned_msg = await enviador.enviar(
+            "send_message",
+            chat_id=chat_id,
             text=mensagem_principal
         )
-        
-        # Tentar fixar a mensagem
+    except Exception as e:
+        print(f"Erro ao enviar mensagem principal: {e}")
+        # Continuar mesmo se falhar a mensagem principal
+        pinned_msg = None
+
+    async def fixar():
         try:
-            await bot.pin_chat_message(
-                chat_id=GROUP_ID,
+            await enviador.enviar(
+                "pin_chat_message",
+                chat_id=chat_id,
                 message_id=pinned_msg.message_id,
                 disable_notification=True
             )
         except Exception as e:
             print(f"Aviso: Não foi possível fixar a mensagem: {e}")
-    except Exception as e:
-        print(f"Erro ao enviar mensagem principal: {e}")
-        # Continuar mesmo se falhar a mensagem principal
 
-    for jogo, dt_local in jogos:
-        game_id = jogo["gameId"]
-        home = jogo["homeTeam"]
-        away = jogo["awayTeam"]
+    async def publicar(jogo):
+        game_id = jogo["game_id"]
+        id_jogo = jogo["id_jogo"]
 
-        # localizar jogo no banco
-        cur.execute("SELECT id_jogo FROM JOGO WHERE game_id_nba = ?", (game_id,))
-        row = cur.fetchone()
-        if not row:
-            print(f"Jogo {game_id} não está no banco.")
-            continue
-
-        id_jogo = row[0]
-
-        mandante_nome = f"{home['teamCity']} {home['teamName']}"
-        visitante_nome = f"{away['teamCity']} {away['teamName']}"
+        mandante_nome = jogo["mandante"]
+        visitante_nome = jogo["visitante"]
 
         # siglas
-        mandante_sigla = home.get("teamTricode", "")
-        visitante_sigla = away.get("teamTricode", "")
+        mandante_sigla = jogo["sigla_mandante"]
+        visitante_sigla = jogo["sigla_visitante"]
 
         # horário local formatado
-        hora_local_str = dt_local.strftime("%Hh%M")
+        hora_local_str = jogo["hora_local"]
 
         # canal (se existir)
-        canal = _extrair_canal(jogo)
+        canal = jogo["canal"]
         
         # Criar título da enquete com horário e canal
         if canal:
@@ -169,28 +199,48 @@ async def criar_enquetes():
 
         # Enviar enquete única com todas as informações no título
         try:
-            poll = await bot.send_poll(
-                chat_id=GROUP_ID,
+            poll = await enviador.enviar(
+                "send_poll",
+                chat_id=chat_id,
                 question=titulo_enquete,
                 options=[op_visitante, op_mandante],
                 is_anonymous=False
             )
 
-            # registrar enquete no banco (message_id é a chave que usamos na aplicação)
-            registrar_enquete(id_jogo, poll.message_id)
-
-            # comando para voto oficial (privado)
-            await bot.send_message(
-                chat_id=GROUP_ID,
-                text=f"Para palpite oficial (ranking):\n👉 /votar_{poll.message_id}"
-            )
+            # registrar enquete no banco: message_id para o /votar_ das enquetes
+            # antigas, poll_id para as respostas que chegam direto da enquete
+            await escrever(registrar_enquete, id_jogo, poll.message_id, poll.poll.id)
+            return True
         except Exception as e:
             print(f"Erro ao criar enquete para jogo {game_id}: {e}")
-            continue
+            return False
+
+    # os jogos pedem a vez na ordem do horário (os limites atendem por ordem
+    # de chegada)
+    tarefas = [publicar(jogo) for jogo in jogos]
+    if pinned_msg is not None:
+        tarefas.append(fixar())
+    resultados = await asyncio.gather(*tarefas)
+
+    criadas = sum(1 for r in resultados[:len(jogos)] if r)
+    print(f"Enquetes criadas com sucesso! ({criadas}/{len(jogos)})")
+
+
+async def criar_enquetes_dos_grupos(bot=None, enviador=None, agora_utc=None, grupos=None):
+    """criar_enquetes() em todos os grupos (ou só em `grupos`), com um
+    Enviador só (os limites de flood do Telegram valem para o bot inteiro).
+    Cada grupo recebe só os jogos que ainda não têm enquete no seu banco."""
+    if enviador is None:
+        enviador = Enviador(bot or criar_bot(BOT_TOKEN))
+    # jogos_dos_grupos pode baixar o calendário: fica fora do event loop
+    jogos_por_grupo = await asyncio.to_thread(jogos_dos_grupos, agora_utc, grupos, True)
+
+    async def no_grupo(grupo, jogos):
+        with usando_banco(grupo.banco):
+            await criar_enquetes(jogos=jogos, enviador=enviador, chat_id=grupo.chat_id)
 
-    conn.close()
-    print("Enquetes criadas com sucesso!")
+    await asyncio.gather(*(no_grupo(g, jogos) for g, jogos in jogos_por_grupo))
 
 
 if __name__ == "__main__":
-    asyncio.run(criar_enquetes())
\ No newline at end of file
+    asyncio.run(criar_enquetes_dos_grupos())
\ No newline at end of file
@@ -1,20 +1,147 @@
+import calendar
+import contextvars
+import hashlib
+import json
+import os
+import pathlib
 import sqlite3
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 
+import metricas
+from cache import CacheLRU
+
 DB_NAME = "nba.db"
 
+# Quantidade de statements preparados mantidos em cache por conexão
+CACHE_STATEMENTS = 256
+
+# Cada thread mantém a sua própria conexão de longa duração com cada banco
+_local = threading.local()
+
+# Banco da operação em andamento: o do grupo (veja grupos.py) ou, sem grupo,
+# DB_NAME. É um ContextVar: vale para a tarefa asyncio que o definiu e
+# acompanha as chamadas de database_async para as threads.
+_banco = contextvars.ContextVar("banco", default=None)
+
+# Caches das consultas do clique de voto (buscar_enquete e buscar_id_usuario,
+# usados via database_async.ler_com_cache). Só valem dentro do processo:
+# escritas feitas por outros scripts (stopper, criar_enquetes_do_dia) chegam
+# ao bot no máximo depois do TTL. As chaves levam o banco (banco_atual()),
+# já que message_id e o id do usuário mudam de um grupo para outro.
+cache_enquetes = CacheLRU(max_itens=4096, ttl=600)    # (banco, message_id/poll_id) -> linha
+cache_usuarios = CacheLRU(max_itens=50000, ttl=3600)  # (banco, telegram_user_id) -> id
+
+
+def banco_atual():
+    """Arquivo do banco da operação em andamento."""
+    return _banco.get() or DB_NAME
+
+
+@contextmanager
+def usando_banco(caminho):
+    """Faz as funções deste módulo usarem o banco `caminho` (None = DB_NAME)
+    dentro do bloco."""
+    token = _banco.set(caminho)
+    try:
+        yield
+    finally:
+        _banco.reset(token)
+
+
+def connect(db_name=None):
+    """Abre uma conexão nova, já com os PRAGMAs aplicados.
 
-def connect():
-    conn = sqlite3.connect(DB_NAME, timeout=5)
+    As transações são controladas explicitamente por `transacao()`
+    (isolation_level=None), então a conexão fica em autocommit fora dela.
+    """
+    conn = sqlite3.connect(
+        db_name or DB_NAME,
+        timeout=5,
+        isolation_level=None,
+        cached_statements=CACHE_STATEMENTS,
+        uri=True    # para anexar os arquivos de temporada só para leitura
+    )
     conn.execute("PRAGMA foreign_keys = ON;")
     conn.execute("PRAGMA journal_mode = WAL;")
+    return metricas.instrumentar_conexao(conn)
+
+
+def obter_conexao():
+    """Retorna a conexão de longa duração da thread atual com o banco atual
+    (abre na 1ª vez)."""
+    caminho = banco_atual()
+    conexoes = getattr(_local, "conexoes", None)
+    if conexoes is None:
+        conexoes = _local.conexoes = {}
+        _local.profundidade = {}
+
+    conn = conexoes.get(caminho)
+    if conn is None:
+        conn = conexoes[caminho] = connect(caminho)
+        _local.profundidade[caminho] = 0
+        # arquivos registrados depois disso: anexar_arquivos()
+        _anexar_arquivos(conn, caminho)
     return conn
 
 
-def create_tables():
-    conn = connect()
-    cur = conn.cursor()
+def fechar_conexao():
+    """Fecha as conexões da thread atual (ex.: no encerramento de um script)."""
+    for conn in getattr(_local, "conexoes", {}).values():
+        conn.close()
+    _local.conexoes = {}
+    _local.profundidade = {}
+
+
+@contextmanager
+def transacao(escrita=True):
+    """Unidade de trabalho sobre a conexão da thread.
+
+    Faz COMMIT ao sair normalmente e ROLLBACK se houver exceção.
+    Transações aninhadas viram SAVEPOINTs, então os helpers deste módulo
+    podem ser chamados dentro de uma transação maior sem commits parciais.
+    Use escrita=False para leituras (BEGIN DEFERRED, sem reservar o lock).
+    """
+    conn = obter_conexao()
+    caminho = banco_atual()
+    cur = metricas.cursor(conn)
+    nivel = _local.profundidade[caminho]
+
+    if nivel == 0:
+        cur.execute("BEGIN IMMEDIATE" if escrita else "BEGIN")
+    else:
+        cur.execute(f"SAVEPOINT sp{nivel}")
+    _local.profundidade[caminho] = nivel + 1
+
+    try:
+        yield cur
+    except BaseException:
+        _local.profundidade[caminho] = nivel
+        if nivel == 0:
+            cur.execute("ROLLBACK")
+        else:
+            cur.execute(f"ROLLBACK TO sp{nivel}")
+            cur.execute(f"RELEASE sp{nivel}")
+        raise
+    else:
+        _local.profundidade[caminho] = nivel
+        if nivel == 0:
+            cur.execute("COMMIT")
+        else:
+            cur.execute(f"RELEASE sp{nivel}")
+    finally:
+        cur.close()
+
 
+# -------------------------------
+# Schema versionado (PRAGMA user_version)
+# -------------------------------
+# Cada migração leva o banco da versão i para a i+1. Migrações já
+# publicadas não devem ser editadas: mudanças novas entram no fim da lista.
+
+def _migracao_1(cur):
+    """Schema original: tabelas e triggers."""
     cur.execute("""
         CREATE TABLE IF NOT EXISTS USUARIO_PARTICIPANTE (
             id_usuario_participante INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -62,132 +189,1264 @@ def create_tables():
         );
     """)
 
-    conn.commit()
-    conn.close()
+    # Trigger para atualizar automaticamente o status quando placar é atualizado
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS atualiza_status_jogo
+        AFTER UPDATE OF placar_mandante, placar_visitante ON JOGO
+        BEGIN
+            UPDATE JOGO 
+            SET status = 'Finalizado'
+            WHERE NEW.placar_mandante IS NOT NULL 
+              AND NEW.placar_visitante IS NOT NULL
+              AND id_jogo = NEW.id_jogo;
+        END;
+    """)
+
+    # Trigger para evitar votos duplicados na mesma enquete
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS evitar_voto_duplicado
+        BEFORE INSERT ON VOTO
+        FOR EACH ROW
+        BEGIN
+            SELECT CASE
+                WHEN EXISTS (
+                    SELECT 1 FROM VOTO 
+                    WHERE id_usuario_participante = NEW.id_usuario_participante 
+                    AND id_enquete = NEW.id_enquete
+                ) THEN
+                    RAISE(ABORT, 'Usuário já votou nesta enquete')
+            END;
+        END;
+    """)
+
 
+def _migracao_2(cur):
+    """Troca o trigger de voto duplicado por índice UNIQUE e cria os índices
+    usados pelas consultas do bot, do stopper, dos resultados e dos relatórios."""
+    cur.execute("DROP TRIGGER IF EXISTS evitar_voto_duplicado")
 
-def registrar_usuario(telegram_user_id, apelido):
-    conn = connect()
-    cur = conn.cursor()
+    # o trigger já impedia duplicados, mas bancos antigos podem tê-los
     cur.execute("""
-        INSERT OR IGNORE INTO USUARIO_PARTICIPANTE (telegram_user_id, apelido)
-        VALUES (?, ?)
-    """, (telegram_user_id, apelido))
-    conn.commit()
-    conn.close()
+        DELETE FROM VOTO
+        WHERE id_voto NOT IN (
+            SELECT MIN(id_voto) FROM VOTO
+            GROUP BY id_usuario_participante, id_enquete
+        )
+    """)
 
+    cur.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_voto_usuario_enquete
+        ON VOTO (id_usuario_participante, id_enquete)
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_voto_enquete
+        ON VOTO (id_enquete, id_usuario_participante, escolha)
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_enquete_jogo ON ENQUETE (id_jogo)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_jogo_data ON JOGO (data_utc, hora_utc)")
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_usuario_ranking
+        ON USUARIO_PARTICIPANTE (pontuacao DESC, frequencia_participacao DESC)
+    """)
 
-def inserir_jogo(game_id_nba, mandante, visitante, data_utc, hora_utc, status='scheduled'):
-    conn = connect()
-    cur = conn.cursor()
+
+def _migracao_3(cur):
+    """Impressão digital do conteúdo de cada jogo, para a sincronização do
+    calendário só regravar o que mudou."""
+    cur.execute("ALTER TABLE JOGO ADD COLUMN hash_conteudo TEXT")
+
+
+def _migracao_4(cur):
+    """Siglas e canal de TV no JOGO, para montar as enquetes do dia só com o
+    banco, sem baixar o calendário da temporada."""
+    cur.execute("ALTER TABLE JOGO ADD COLUMN sigla_mandante TEXT")
+    cur.execute("ALTER TABLE JOGO ADD COLUMN sigla_visitante TEXT")
+    cur.execute("ALTER TABLE JOGO ADD COLUMN canal TEXT")
+
+
+def _migracao_5(cur):
+    """Horário de início do jogo como epoch UTC indexado, preenchido a partir
+    de data_utc/hora_utc. Substitui o índice por (data_utc, hora_utc)."""
+    cur.execute("ALTER TABLE JOGO ADD COLUMN inicio_epoch INTEGER")
     cur.execute("""
-        INSERT OR IGNORE INTO JOGO (game_id_nba, time_mandante, time_visitante, data_utc, hora_utc, status)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (game_id_nba, mandante, visitante, data_utc, hora_utc, status))
-    conn.commit()
-    conn.close()
+        UPDATE JOGO
+        SET inicio_epoch = CAST(strftime('%s', data_utc || ' ' || hora_utc) AS INTEGER)
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_jogo_inicio ON JOGO (inicio_epoch)")
+    cur.execute("DROP INDEX IF EXISTS idx_jogo_data")
 
 
-def registrar_enquete(id_jogo, message_id):
-    conn = connect()
-    cur = conn.cursor()
+def _migracao_6(cur):
+    """Marcador de jogo já pontuado, para a pontuação ser idempotente.
+
+    Versões antigas pontuavam de novo todo jogo "Final" a cada execução,
+    então a pontuação existente é recalculada a partir dos votos.
+    """
+    cur.execute("ALTER TABLE JOGO ADD COLUMN pontuado INTEGER NOT NULL DEFAULT 0")
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_jogo_a_pontuar ON JOGO (id_jogo)
+        WHERE vencedor IS NOT NULL AND pontuado = 0
+    """)
     cur.execute("""
-        INSERT OR IGNORE INTO ENQUETE (id_jogo, message_id)
-        VALUES (?, ?)
-    """, (id_jogo, message_id))
-    conn.commit()
-    conn.close()
+        UPDATE USUARIO_PARTICIPANTE
+        SET pontuacao = (
+            SELECT COUNT(*)
+            FROM VOTO v
+            JOIN ENQUETE e ON e.id_enquete = v.id_enquete
+            JOIN JOGO j ON j.id_jogo = e.id_jogo
+            WHERE v.id_usuario_participante = USUARIO_PARTICIPANTE.id_usuario_participante
+              AND v.escolha = j.vencedor
+        )
+    """)
+    cur.execute("UPDATE JOGO SET pontuado = 1 WHERE vencedor IS NOT NULL")
 
 
-def registrar_voto(id_usuario, id_enquete, escolha):
-    conn = connect()
-    cur = conn.cursor()
+def _migracao_7(cur):
+    """Tabela chave/valor para metadados (ex.: versão da pontuação, usada
+    pelo ranking em memória do bot para saber quando recarregar)."""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS META (
+            chave TEXT PRIMARY KEY,
+            valor
+        )
+    """)
+
 
+def _migracao_8(cur):
+    """poll_id do Telegram em cada enquete: as respostas às enquetes
+    (PollAnswer) chegam identificadas só por ele."""
+    cur.execute("ALTER TABLE ENQUETE ADD COLUMN poll_id TEXT")
     cur.execute("""
-        INSERT INTO VOTO (id_usuario_participante, id_enquete, escolha, data_hora)
-        VALUES (?, ?, ?, ?)
-    """, (id_usuario, id_enquete, escolha, datetime.utcnow().isoformat()))
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_enquete_poll ON ENQUETE (poll_id)
+    """)
+
+
+def _migracao_9(cur):
+    """Estatísticas por usuário (geral e por temporada), mantidas pelo voto e
+    pela pontuação, no lugar dos relatórios que agregavam a VOTO inteira.
+
+    A temporada sai do game_id_nba ("00225xxxxx" = 2025-26 -> 2025). As
+    sequências de acertos seguem a ordem em que os jogos foram apurados
+    (ordem_apuracao); nos já pontuados, a ordem dos horários."""
+    cur.execute("""
+        ALTER TABLE JOGO ADD COLUMN temporada INTEGER
+        GENERATED ALWAYS AS (2000 + CAST(substr(game_id_nba, 4, 2) AS INTEGER)) VIRTUAL
+    """)
+    cur.execute("ALTER TABLE JOGO ADD COLUMN ordem_apuracao INTEGER")
+    cur.execute("""
+        UPDATE JOGO SET ordem_apuracao = o.ordem
+        FROM (
+            SELECT id_jogo, ROW_NUMBER() OVER (ORDER BY inicio_epoch, id_jogo) AS ordem
+            FROM JOGO WHERE pontuado = 1
+        ) AS o
+        WHERE JOGO.id_jogo = o.id_jogo
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_jogo_ordem_apuracao ON JOGO (ordem_apuracao)")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS ESTATISTICA_USUARIO (
+            id_usuario_participante INTEGER NOT NULL REFERENCES USUARIO_PARTICIPANTE,
+            temporada INTEGER NOT NULL,              -- 0 = todas as temporadas
+            votos INTEGER NOT NULL DEFAULT 0,        -- palpites dados
+            apurados INTEGER NOT NULL DEFAULT 0,     -- palpites em jogos com resultado
+            acertos INTEGER NOT NULL DEFAULT 0,
+            aproveitamento REAL GENERATED ALWAYS AS (
+                CASE WHEN apurados > 0 THEN CAST(acertos AS REAL) / apurados END
+            ) VIRTUAL,
+            sequencia_atual INTEGER NOT NULL DEFAULT 0,
+            melhor_sequencia INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (id_usuario_participante, temporada)
+        ) WITHOUT ROWID
+    """)
+    _reconstruir_estatisticas(cur)
 
-    # atualiza estatísticas
+
+def _migracao_10(cur):
+    """Índices de texto (FTS5, tokenizador trigram) para a busca por
+    apelido e por nome de time, sincronizados por triggers. Veja busca.py."""
+    cur.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS BUSCA_USUARIO USING fts5(
+            apelido,
+            content='USUARIO_PARTICIPANTE', content_rowid='id_usuario_participante',
+            tokenize='trigram'
+        )
+    """)
+    cur.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS BUSCA_JOGO USING fts5(
+            time_mandante, time_visitante,
+            content='JOGO', content_rowid='id_jogo',
+            tokenize='trigram'
+        )
+    """)
+
+    for tabela, indice, chave, colunas in (
+        ("USUARIO_PARTICIPANTE", "BUSCA_USUARIO", "id_usuario_participante", ("apelido",)),
+        ("JOGO", "BUSCA_JOGO", "id_jogo", ("time_mandante", "time_visitante")),
+    ):
+        lista = ", ".join(colunas)
+        novos = ", ".join(f"new.{c}" for c in colunas)
+        antigos = ", ".join(f"old.{c}" for c in colunas)
+        apagar = f"""
+            INSERT INTO {indice} ({indice}, rowid, {lista})
+            VALUES ('delete', old.{chave}, {antigos});
+        """
+        inserir = f"""
+            INSERT INTO {indice} (rowid, {lista}) VALUES (new.{chave}, {novos});
+        """
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {indice.lower()}_inserir
+            AFTER INSERT ON {tabela} BEGIN {inserir} END
+        """)
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {indice.lower()}_apagar
+            AFTER DELETE ON {tabela} BEGIN {apagar} END
+        """)
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {indice.lower()}_alterar
+            AFTER UPDATE OF {lista} ON {tabela} BEGIN {apagar} {inserir} END
+        """)
+        cur.execute(f"INSERT INTO {indice} ({indice}) VALUES ('rebuild')")
+
+
+def _migracao_11(cur):
+    """Corrige a participação dos usuários que tinham votos duplicados: a
+    _migracao_2 apagou os duplicados, mas cada um continuava somado na
+    frequencia_participacao. A contagem certa é a de votos da linha geral
+    das estatísticas (reconstruída da VOTO já sem duplicados na _migracao_9,
+    e que inclui as temporadas arquivadas)."""
     cur.execute("""
         UPDATE USUARIO_PARTICIPANTE
-        SET frequencia_participacao = frequencia_participacao + 1
-        WHERE id_usuario_participante = ?
-    """, (id_usuario,))
+        SET frequencia_participacao = COALESCE((
+            SELECT e.votos FROM ESTATISTICA_USUARIO e
+            WHERE e.id_usuario_participante = USUARIO_PARTICIPANTE.id_usuario_participante
+              AND e.temporada = 0
+        ), 0)
+    """)
+
+
+MIGRACOES = [
+    _migracao_1,
+    _migracao_2,
+    _migracao_3,
+    _migracao_4,
+    _migracao_5,
+    _migracao_6,
+    _migracao_7,
+    _migracao_8,
+    _migracao_9,
+    _migracao_10,
+    _migracao_11,
+]
+
+
+def versao_schema():
+    """Versão atual do schema do banco (0 = banco vazio/antigo)."""
+    return obter_conexao().execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrar():
+    """Aplica as migrações pendentes. Se o schema já está atual, não roda DDL."""
+    if versao_schema() >= len(MIGRACOES):
+        return False
+
+    with transacao() as cur:
+        # relê com o lock de escrita: outro processo pode ter migrado antes
+        versao = cur.execute("PRAGMA user_version").fetchone()[0]
+        for migracao in MIGRACOES[versao:]:
+            migracao(cur)
+        cur.execute(f"PRAGMA user_version = {len(MIGRACOES)}")
+    return True
+
+
+def create_tables():
+    """Cria ou atualiza o schema do banco."""
+    migrar()
+
+
+def obter_ou_criar_usuario(telegram_user_id, apelido):
+    """id_usuario_participante do usuário do Telegram, cadastrando-o se
+    ainda não existir (quem vota direto na enquete sem ter usado /start)."""
+    with transacao() as cur:
+        cur.execute("""
+            INSERT OR IGNORE INTO USUARIO_PARTICIPANTE (telegram_user_id, apelido)
+            VALUES (?, ?)
+        """, (telegram_user_id, apelido))
+        cur.execute("""
+            SELECT id_usuario_participante
+            FROM USUARIO_PARTICIPANTE
+            WHERE telegram_user_id = ?
+        """, (telegram_user_id,))
+        return cur.fetchone()[0]
+
+
+def registrar_usuario(telegram_user_id, apelido):
+    with transacao() as cur:
+        cur.execute("""
+            INSERT OR IGNORE INTO USUARIO_PARTICIPANTE (telegram_user_id, apelido)
+            VALUES (?, ?)
+        """, (telegram_user_id, apelido))
+    cache_usuarios.invalidar((banco_atual(), telegram_user_id))
+
+
+def epoch_utc(dt):
+    """Converte um datetime UTC (sem tzinfo) para segundos desde 1970."""
+    return calendar.timegm(dt.utctimetuple())
 
-    conn.commit()
-    conn.close()
 
+# inicio_epoch é sempre derivado de data_utc/hora_utc pelo próprio SQLite
+_SQL_INICIO_EPOCH = "CAST(strftime('%s', ? || ' ' || ?) AS INTEGER)"
 
-def atualizar_pontuacao(id_usuario, acertou):
-    conn = connect()
-    cur = conn.cursor()
-    if acertou:
+
+def inserir_jogo(game_id_nba, mandante, visitante, data_utc, hora_utc, status='scheduled'):
+    with transacao() as cur:
+        cur.execute(f"""
+            INSERT OR IGNORE INTO JOGO (game_id_nba, time_mandante, time_visitante,
+                                        data_utc, hora_utc, status, inicio_epoch)
+            VALUES (?, ?, ?, ?, ?, ?, {_SQL_INICIO_EPOCH})
+        """, (game_id_nba, mandante, visitante, data_utc, hora_utc, status, data_utc, hora_utc))
+
+
+def _hash_jogo(jogo):
+    return hashlib.sha1("\x1f".join(map(str, jogo)).encode()).hexdigest()
+
+
+def sincronizar_jogos(jogos):
+    """Sincroniza em lote a tabela JOGO com o calendário.
+
+    `jogos` é uma sequência de tuplas (game_id_nba, mandante, visitante,
+    data_utc, hora_utc, status, sigla_mandante, sigla_visitante, canal).
+    Só jogos novos ou com conteúdo diferente da última sincronização são
+    gravados, todos numa única transação; se nada mudou, nada é escrito.
+    Jogos de temporadas arquivadas são ignorados (contam como inalterados).
+
+    Retorna {"inseridos": n, "atualizados": n, "inalterados": n}.
+    """
+    with transacao(escrita=False) as cur:
+        cur.execute("SELECT game_id_nba, hash_conteudo FROM JOGO")
+        existentes = dict(cur.fetchall())
+    arquivadas = temporadas_arquivadas()
+
+    novos, alterados = [], []
+    for jogo in jogos:
+        if arquivadas and temporada_do_jogo(jogo[0]) in arquivadas:
+            continue    # já está no arquivo da temporada
+        h = _hash_jogo(jogo)
+        if jogo[0] not in existentes:
+            novos.append((*jogo, h))
+        elif existentes[jogo[0]] != h:
+            alterados.append((*jogo, h))
+
+    if novos or alterados:
+        with transacao() as cur:
+            cur.executemany("""
+                INSERT INTO JOGO (game_id_nba, time_mandante, time_visitante,
+                                  data_utc, hora_utc, status, sigla_mandante,
+                                  sigla_visitante, canal, hash_conteudo, inicio_epoch)
+                VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, ?9, ?10,
+                        CAST(strftime('%s', ?4 || ' ' || ?5) AS INTEGER))
+                ON CONFLICT (game_id_nba) DO UPDATE SET
+                    time_mandante = excluded.time_mandante,
+                    time_visitante = excluded.time_visitante,
+                    data_utc = excluded.data_utc,
+                    hora_utc = excluded.hora_utc,
+                    inicio_epoch = excluded.inicio_epoch,
+                    status = excluded.status,
+                    sigla_mandante = excluded.sigla_mandante,
+                    sigla_visitante = excluded.sigla_visitante,
+                    canal = excluded.canal,
+                    hash_conteudo = excluded.hash_conteudo
+            """, novos + alterados)
+
+    return {
+        "inseridos": len(novos),
+        "atualizados": len(alterados),
+        "inalterados": len(jogos) - len(novos) - len(alterados),
+    }
+
+
+def registrar_enquete(id_jogo, message_id, poll_id=None):
+    with transacao() as cur:
+        cur.execute("""
+            INSERT OR IGNORE INTO ENQUETE (id_jogo, message_id, poll_id)
+            VALUES (?, ?, ?)
+        """, (id_jogo, message_id, poll_id))
+    cache_enquetes.invalidar((banco_atual(), message_id))
+    cache_enquetes.invalidar((banco_atual(), poll_id))
+
+
+# Soma `delta` aos votos do usuário na linha geral e na da temporada do jogo
+# da enquete (criando as linhas no primeiro voto)
+SQL_CONTAR_VOTO = """
+    INSERT INTO ESTATISTICA_USUARIO (id_usuario_participante, temporada, votos)
+    SELECT ?1, t.temporada, ?2
+    FROM (
+        SELECT 0 AS temporada
+        UNION ALL
+        SELECT j.temporada FROM ENQUETE e JOIN JOGO j ON j.id_jogo = e.id_jogo
+        WHERE e.id_enquete = ?3
+    ) AS t
+    WHERE true
+    ON CONFLICT (id_usuario_participante, temporada)
+    DO UPDATE SET votos = votos + excluded.votos
+"""
+
+
+def registrar_voto(id_usuario, id_enquete, escolha):
+    with transacao() as cur:
+        cur.execute("""
+            INSERT INTO VOTO (id_usuario_participante, id_enquete, escolha, data_hora)
+            VALUES (?, ?, ?, ?)
+        """, (id_usuario, id_enquete, escolha, datetime.utcnow().isoformat()))
+
+        # atualiza estatísticas
         cur.execute("""
             UPDATE USUARIO_PARTICIPANTE
-            SET pontuacao = pontuacao + 1
+            SET frequencia_participacao = frequencia_participacao + 1
             WHERE id_usuario_participante = ?
         """, (id_usuario,))
-    conn.commit()
-    conn.close()
+        cur.execute(SQL_CONTAR_VOTO, (id_usuario, 1, id_enquete))
+
+
+def registrar_palpites(palpites):
+    """Aplica, em ordem e numa única transação, um lote de respostas às
+    enquetes (id_usuario, id_enquete, escolha, data_hora):
+      - primeiro voto na enquete: insere e soma 1 na frequência;
+      - resposta trocada: atualiza a escolha;
+      - escolha None (voto retirado): apaga e tira 1 da frequência.
+    Os votos em ESTATISTICA_USUARIO acompanham a frequência.
+
+    Retorna {"inseridos", "alterados", "removidos"}.
+    """
+    r = {"inseridos": 0, "alterados": 0, "removidos": 0}
+    with transacao() as cur:
+        for id_usuario, id_enquete, escolha, data_hora in palpites:
+            if escolha is None:
+                cur.execute("""
+                    DELETE FROM VOTO
+                    WHERE id_usuario_participante = ? AND id_enquete = ?
+                """, (id_usuario, id_enquete))
+                if cur.rowcount:
+                    cur.execute("""
+                        UPDATE USUARIO_PARTICIPANTE
+                        SET frequencia_participacao = frequencia_participacao - 1
+                        WHERE id_usuario_participante = ?
+                    """, (id_usuario,))
+                    cur.execute(SQL_CONTAR_VOTO, (id_usuario, -1, id_enquete))
+                    r["removidos"] += 1
+                continue
+
+            cur.execute("""
+                INSERT OR IGNORE INTO VOTO (id_usuario_participante, id_enquete, escolha, data_hora)
+                VALUES (?, ?, ?, ?)
+            """, (id_usuario, id_enquete, escolha, data_hora))
+            if cur.rowcount:
+                cur.execute("""
+                    UPDATE USUARIO_PARTICIPANTE
+                    SET frequencia_participacao = frequencia_participacao + 1
+                    WHERE id_usuario_participante = ?
+                """, (id_usuario,))
+                cur.execute(SQL_CONTAR_VOTO, (id_usuario, 1, id_enquete))
+                r["inseridos"] += 1
+                continue
+
+            cur.execute("""
+                UPDATE VOTO SET escolha = ?, data_hora = ?
+                WHERE id_usuario_participante = ? AND id_enquete = ? AND escolha != ?
+            """, (escolha, data_hora, id_usuario, id_enquete, escolha))
+            r["alterados"] += cur.rowcount
+    return r
+
+
+def registrar_resultados(resultados, pontuar=True):
+    """Grava resultados finais e pontua os jogos recém-finalizados.
+
+    `resultados` é uma sequência de (game_id_nba, vencedor, placar_mandante,
+    placar_visitante). Jogos cujo resultado já está gravado igual não são
+    tocados. Se o vencedor de um jogo já pontuado mudar (correção), a
+    pontuação inteira é recalculada a partir dos votos.
+
+    Com pontuar=False, os jogos novos só são gravados, para vários lotes
+    terminarem num único pontuar_jogos_finalizados() (correções continuam
+    recalculando na hora).
+
+    Tudo acontece numa única transação. Retorna
+    {"gravados": n, "corrigidos": n, "jogos_pontuados": n, "usuarios_pontuados": n}
+    (sem as duas últimas se não pontuou).
+    """
+    gravados = corrigidos = 0
+    anexar_arquivos()       # o recálculo de uma correção lê os arquivos
+    with transacao() as cur:
+        for game_id, vencedor, pm, pv in resultados:
+            cur.execute("""
+                SELECT vencedor, placar_mandante, placar_visitante, pontuado
+                FROM JOGO WHERE game_id_nba = ?
+            """, (game_id,))
+            row = cur.fetchone()
+            if row is None or row[:3] == (vencedor, pm, pv):
+                continue
+
+            if row[3] and row[0] != vencedor:
+                corrigidos += 1
+
+            cur.execute("""
+                UPDATE JOGO
+                SET vencedor=?, placar_mandante=?, placar_visitante=?
+                WHERE game_id_nba=?
+            """, (vencedor, pm, pv, game_id))
+            gravados += 1
+
+        if corrigidos:
+            pontuacao = recalcular_pontuacao()
+        elif pontuar:
+            pontuacao = pontuar_jogos_finalizados()
+        else:
+            pontuacao = {}
+
+    return {"gravados": gravados, "corrigidos": corrigidos, **pontuacao}
+
+
+# CROSS JOIN fixa a ordem do plano: parte dos jogos pendentes (índice
+# parcial) em vez de varrer a VOTO inteira para agrupar por usuário.
+SQL_PONTUAR = """
+    UPDATE USUARIO_PARTICIPANTE AS u
+    SET pontuacao = u.pontuacao + a.acertos
+    FROM (
+        SELECT v.id_usuario_participante AS id, COUNT(*) AS acertos
+        FROM JOGO j
+        CROSS JOIN ENQUETE e ON e.id_jogo = j.id_jogo
+        CROSS JOIN VOTO v ON v.id_enquete = e.id_enquete
+        WHERE j.vencedor IS NOT NULL
+          AND j.pontuado = 0
+          AND v.escolha = j.vencedor
+        GROUP BY v.id_usuario_participante
+    ) AS a
+    WHERE u.id_usuario_participante = a.id
+"""
+
+
+def pontuar_jogos_finalizados(reconstruir=False):
+    """Soma 1 ponto por acerto em todos os jogos com vencedor ainda não
+    pontuados (um único UPDATE), atualiza as estatísticas dos votantes e
+    marca esses jogos como pontuados. reconstruir=True recalcula as
+    estatísticas do zero no fim em vez de atualizá-las jogo a jogo.
+
+    Rodar de novo sem jogos novos não muda nada.
+    Retorna {"jogos_pontuados": n, "usuarios_pontuados": n}.
+    """
+    anexar_arquivos()       # a reconstrução lê as temporadas arquivadas
+    with transacao() as cur:
+        cur.execute(SQL_JOGOS_A_PONTUAR)
+        pendentes = cur.fetchall()
+
+        cur.execute(SQL_PONTUAR)
+        usuarios = cur.rowcount
+
+        # as sequências de acertos seguem a ordem de apuração: jogos novos
+        # entram no fim (por horário), os já apurados antes (recálculo)
+        # mantêm o lugar
+        cur.execute(SQL_ULTIMA_APURACAO)
+        ordem = cur.fetchone()[0]
+        for id_jogo, _, _, ordem_apuracao in pendentes:
+            if ordem_apuracao is None:
+                ordem += 1
+                cur.execute("UPDATE JOGO SET ordem_apuracao = ? WHERE id_jogo = ?", (ordem, id_jogo))
+
+        # um lote grande (ex.: o recálculo) reconstrói a tabela de uma vez
+        reconstruir = reconstruir or len(pendentes) > LIMITE_ESTATISTICA_INCREMENTAL
+        if not reconstruir:
+            for id_jogo, vencedor, temporada, _ in pendentes:
+                cur.execute(SQL_APURAR_JOGO, (vencedor, id_jogo, temporada))
+
+        cur.execute("""
+            UPDATE JOGO SET pontuado = 1
+            WHERE vencedor IS NOT NULL AND pontuado = 0
+        """)
+        jogos = cur.rowcount
+        if reconstruir:
+            _reconstruir_estatisticas(cur)
+        if usuarios:
+            _incrementar_versao_pontuacao(cur)
+    return {"jogos_pontuados": jogos, "usuarios_pontuados": usuarios}
+
+
+def recalcular_pontuacao():
+    """Zera e recalcula a pontuação (e as estatísticas) de todos a partir da
+    tabela VOTO (para quando um resultado já pontuado é corrigido).
+
+    Os acertos das temporadas arquivadas são somados de volta a partir dos
+    arquivos; só os jogos do banco são pontuados de novo."""
+    anexar_arquivos()
+    with transacao() as cur:
+        cur.execute("UPDATE USUARIO_PARTICIPANTE SET pontuacao = 0 WHERE pontuacao != 0")
+        arquivados = _esquemas_arquivados(cur)
+        if arquivados:
+            cur.execute(f"""
+                UPDATE USUARIO_PARTICIPANTE AS u
+                SET pontuacao = a.acertos
+                FROM (
+                    SELECT id, SUM(acerto) AS acertos
+                    FROM ({_sql_palpites(arquivados)})
+                    WHERE pontuado = 1
+                    GROUP BY id
+                ) AS a
+                WHERE u.id_usuario_participante = a.id
+            """)
+        cur.execute("UPDATE JOGO SET pontuado = 0 WHERE pontuado = 1")
+        cur.execute("""
+            UPDATE ESTATISTICA_USUARIO
+            SET apurados = 0, acertos = 0, sequencia_atual = 0, melhor_sequencia = 0
+        """)
+        _incrementar_versao_pontuacao(cur)
+        # com arquivos, o incremental partiria de estatísticas zeradas sem eles
+        return pontuar_jogos_finalizados(reconstruir=bool(arquivados))
+
+
+# -------------------------------
+# Estatísticas por usuário
+# -------------------------------
+# Acima disso, um lote de jogos a pontuar reconstrói as estatísticas de uma
+# vez em vez de aplicar um UPDATE por jogo
+LIMITE_ESTATISTICA_INCREMENTAL = 50
+
+# Último número de apuração usado, contando os jogos já arquivados
+SQL_ULTIMA_APURACAO = """
+    SELECT MAX(COALESCE((SELECT MAX(ordem_apuracao) FROM JOGO), 0),
+               COALESCE((SELECT valor FROM META WHERE chave = 'ordem_apuracao_arquivada'), 0))
+"""
+
+SQL_JOGOS_A_PONTUAR = """
+    SELECT id_jogo, vencedor, temporada, ordem_apuracao FROM JOGO
+    WHERE vencedor IS NOT NULL AND pontuado = 0
+    ORDER BY ordem_apuracao IS NULL, ordem_apuracao, inicio_epoch, id_jogo
+"""
+
+# Um jogo recém-apurado nas linhas geral e da temporada de cada votante (no
+# SET, as colunas do lado direito ainda têm os valores antigos). Os votantes
+# são materializados antes para o plano partir deles, pela chave primária,
+# em vez de varrer a tabela de estatísticas.
+SQL_APURAR_JOGO = """
+    WITH a AS MATERIALIZED (
+        SELECT v.id_usuario_participante AS id, v.escolha = ?1 AS acerto
+        FROM ENQUETE e
+        CROSS JOIN VOTO v ON v.id_enquete = e.id_enquete
+        WHERE e.id_jogo = ?2
+    )
+    UPDATE ESTATISTICA_USUARIO AS s
+    SET apurados = s.apurados + 1,
+        acertos = s.acertos + a.acerto,
+        sequencia_atual = CASE WHEN a.acerto THEN s.sequencia_atual + 1 ELSE 0 END,
+        melhor_sequencia = MAX(s.melhor_sequencia,
+                               CASE WHEN a.acerto THEN s.sequencia_atual + 1 ELSE 0 END)
+    FROM a
+    WHERE s.id_usuario_participante = a.id AND s.temporada IN (0, ?3)
+"""
+
+# Palpites de um banco (main ou um arquivo de temporada) para os cálculos
+# do zero; os de todos os bancos são unidos com UNION ALL (_sql_palpites)
+SQL_PALPITES = """
+    SELECT v.id_usuario_participante AS id, j.temporada, j.ordem_apuracao,
+           v.id_enquete, j.pontuado, v.escolha = j.vencedor AS acerto
+    FROM {esquema}.VOTO v
+    JOIN {esquema}.ENQUETE e ON e.id_enquete = v.id_enquete
+    JOIN {esquema}.JOGO j ON j.id_jogo = e.id_jogo
+"""
+
+# Estatísticas calculadas do zero a partir de VOTO/JOGO (do banco e das
+# temporadas arquivadas), no formato da tabela (só jogos já pontuados
+# contam como apurados). Sequência, na ordem de
+# apuração: cada erro abre um novo grupo (soma acumulada dos erros); o
+# tamanho de um grupo é o número de acertos dele, e a sequência atual é o
+# grupo do último erro.
+SQL_ESTATISTICAS_DO_ZERO = """
+    WITH palpites AS ({palpites}),
+    escopos AS (
+        SELECT id, temporada AS t, ordem_apuracao, id_enquete, pontuado, acerto FROM palpites
+        UNION ALL
+        SELECT id, 0, ordem_apuracao, id_enquete, pontuado, acerto FROM palpites
+    ),
+    apurados AS (
+        SELECT id, t, acerto,
+               SUM(1 - acerto) OVER (PARTITION BY id, t ORDER BY ordem_apuracao, id_enquete
+                                     ROWS UNBOUNDED PRECEDING) AS erros
+        FROM escopos WHERE pontuado = 1
+    ),
+    grupos AS (
+        SELECT id, t, erros, SUM(acerto) AS tamanho FROM apurados GROUP BY id, t, erros
+    ),
+    sequencias AS (
+        SELECT g.id, g.t, MAX(g.tamanho) AS melhor,
+               MAX(CASE WHEN g.erros = m.erros THEN g.tamanho END) AS atual
+        FROM grupos g
+        JOIN (SELECT id, t, MAX(erros) AS erros FROM grupos GROUP BY id, t) AS m
+          ON m.id = g.id AND m.t = g.t
+        GROUP BY g.id, g.t
+    )
+    SELECT e.id, e.t, COUNT(*) AS votos,
+           SUM(e.pontuado = 1) AS apurados,
+           COALESCE(SUM(CASE WHEN e.pontuado = 1 THEN e.acerto END), 0) AS acertos,
+           COALESCE(s.atual, 0) AS sequencia_atual,
+           COALESCE(s.melhor, 0) AS melhor_sequencia
+    FROM escopos e
+    LEFT JOIN sequencias s ON s.id = e.id AND s.t = e.t
+    GROUP BY e.id, e.t
+"""
+
+CAMPOS_ESTATISTICA = ("votos", "apurados", "acertos", "sequencia_atual", "melhor_sequencia")
+
+
+def _sql_palpites(esquemas):
+    return " UNION ALL ".join(SQL_PALPITES.format(esquema=e) for e in esquemas)
+
+
+def _sql_estatisticas(cur):
+    return SQL_ESTATISTICAS_DO_ZERO.format(
+        palpites=_sql_palpites(["main", *_esquemas_arquivados(cur)]))
+
+
+def _reconstruir_estatisticas(cur):
+    sql = _sql_estatisticas(cur)
+    cur.execute("DELETE FROM ESTATISTICA_USUARIO")
+    cur.execute(f"""
+        INSERT INTO ESTATISTICA_USUARIO
+            (id_usuario_participante, temporada, {", ".join(CAMPOS_ESTATISTICA)})
+        {sql}
+    """)
+
+
+def reconstruir_estatisticas():
+    """Recalcula ESTATISTICA_USUARIO inteira a partir dos votos e resultados."""
+    anexar_arquivos()
+    with transacao() as cur:
+        _reconstruir_estatisticas(cur)
+
+
+def verificar_estatisticas():
+    """Compara ESTATISTICA_USUARIO com o recálculo do zero, sem gravar nada.
+
+    Retorna a lista de diferenças (id_usuario, temporada, campo, na tabela,
+    esperado); vazia se a tabela está correta.
+    """
+    anexar_arquivos()
+    with transacao(escrita=False) as cur:
+        cur.execute(_sql_estatisticas(cur))
+        esperado = {(r[0], r[1]): r[2:] for r in cur.fetchall()}
+        cur.execute(f"""
+            SELECT id_usuario_participante, temporada, {", ".join(CAMPOS_ESTATISTICA)}
+            FROM ESTATISTICA_USUARIO
+        """)
+        atual = {(r[0], r[1]): r[2:] for r in cur.fetchall()}
+
+    # linhas sem nenhum voto (ex.: todos retirados) equivalem a ausentes
+    zeros = (0,) * len(CAMPOS_ESTATISTICA)
+    diferencas = []
+    for chave in sorted(esperado.keys() | atual.keys()):
+        a, e = atual.get(chave, zeros), esperado.get(chave, zeros)
+        for campo, va, ve in zip(CAMPOS_ESTATISTICA, a, e):
+            if va != ve:
+                diferencas.append((*chave, campo, va, ve))
+    return diferencas
+
+
+# -------------------------------
+# Temporadas arquivadas
+# -------------------------------
+# Temporadas encerradas saem do banco para um arquivo cada (nba_2024.db, ao
+# lado dele; veja arquivo.py). A META registra os arquivos ("arquivo:2024"
+# -> nome do arquivo) e cada conexão os anexa só para leitura como
+# arquivo_2024, para os cálculos que precisam de todas as temporadas
+# (reconstrução e conferência das estatísticas, recálculo da pontuação).
+# A conexão anexa os registrados quando abre; as funções que leem os
+# arquivos chamam anexar_arquivos() antes da transação, e assim uma
+# conexão já aberta (outra thread, o bot rodando) pega os arquivos novos.
+PREFIXO_ARQUIVO = "arquivo_"
+
+
+def temporada_do_jogo(game_id_nba):
+    """Temporada de um jogo pelo game_id_nba ("00224xxxxx" -> 2024), como
+    a coluna JOGO.temporada."""
+    return 2000 + int(game_id_nba[3:5])
+
+
+def caminho_arquivo(temporada):
+    """Arquivo de uma temporada, ao lado do banco (nba.db -> nba_2024.db)."""
+    base, extensao = os.path.splitext(banco_atual())
+    return f"{base}_{temporada}{extensao or '.db'}"
+
+
+def temporadas_arquivadas():
+    """Temporadas registradas na META como arquivadas."""
+    with transacao(escrita=False) as cur:
+        cur.execute("SELECT chave FROM META WHERE chave LIKE 'arquivo:%'")
+        return {int(chave.split(":", 1)[1]) for (chave,) in cur.fetchall()}
+
+
+def _anexar_arquivos(conn, caminho):
+    """Anexa à conexão com o banco `caminho` os arquivos registrados na META
+    que ainda não estão anexados. Precisa estar fora de transação (o SQLite
+    não anexa dentro)."""
+    try:
+        registrados = conn.execute("""
+            SELECT chave, valor FROM META WHERE chave LIKE 'arquivo:%' ORDER BY chave
+        """).fetchall()
+    except sqlite3.OperationalError:
+        return      # banco ainda sem META (antes das migrações)
+
+    anexados = {linha[1] for linha in conn.execute("PRAGMA database_list")}
+    pasta = os.path.dirname(os.path.abspath(caminho))
+    for chave, arquivo in registrados:
+        nome = PREFIXO_ARQUIVO + chave.split(":", 1)[1]
+        if nome in anexados:
+            continue
+        uri = pathlib.Path(pasta, arquivo).as_uri() + "?mode=ro"
+        try:
+            conn.execute(f"ATTACH DATABASE ? AS {nome}", (uri,))
+        except sqlite3.OperationalError as e:
+            # ex.: arquivo removido ou mais arquivos que o limite de ATTACH
+            print(f"⚠️ Não foi possível anexar {arquivo}: {e}")
+
+
+def anexar_arquivos():
+    """Anexa à conexão da thread os arquivos registrados depois que ela foi
+    aberta. Dentro de uma transação não faz nada (o SQLite não anexa); aí
+    vale o que já estava anexado, e _esquemas_arquivados acusa o que faltar."""
+    conn = obter_conexao()
+    caminho = banco_atual()
+    if _local.profundidade[caminho] == 0:
+        _anexar_arquivos(conn, caminho)
+
+
+def _esquemas_arquivados(cur):
+    """Nomes (arquivo_2024, ...) dos arquivos anexados à conexão.
+
+    Levanta RuntimeError se algum arquivo registrado na META não está
+    anexado: um cálculo sem ele sairia errado em silêncio."""
+    cur.execute("PRAGMA database_list")
+    anexados = sorted(linha[1] for linha in cur.fetchall()
+                      if linha[1].startswith(PREFIXO_ARQUIVO))
+    cur.execute("SELECT COUNT(*) FROM META WHERE chave LIKE 'arquivo:%'")
+    if cur.fetchone()[0] != len(anexados):
+        raise RuntimeError("Há temporadas arquivadas que não puderam ser anexadas a esta "
+                           "conexão (veja o aviso do ATTACH)")
+    return anexados
 
 
 def marcar_enquete_encerrada(game_id_nba):
     """Marca uma enquete como encerrada no banco"""
-    conn = connect()
-    cur = conn.cursor()
-    cur.execute("""
-        UPDATE JOGO
-        SET enquete_encerrada = 1
-        WHERE game_id_nba = ?
-    """, (game_id_nba,))
-    conn.commit()
-    conn.close()
-
-
-def criar_triggers():
-    """Cria triggers para o banco de dados"""
-    conn = connect()
-    cur = conn.cursor()
-    
-    # Trigger para atualizar automaticamente o status quando placar é atualizado
-    cur.execute("""
-        CREATE TRIGGER IF NOT EXISTS atualiza_status_jogo
-        AFTER UPDATE OF placar_mandante, placar_visitante ON JOGO
-        BEGIN
-            UPDATE JOGO 
-            SET status = 'Finalizado'
-            WHERE NEW.placar_mandante IS NOT NULL 
-              AND NEW.placar_visitante IS NOT NULL
-              AND id_jogo = NEW.id_jogo;
-        END;
-    """)
-    
-    # Trigger para evitar votos duplicados na mesma enquete
+    with transacao() as cur:
+        cur.execute("""
+            UPDATE JOGO
+            SET enquete_encerrada = 1
+            WHERE game_id_nba = ?
+        """, (game_id_nba,))
+    # o cache é por message_id; são poucas enquetes, então zera tudo
+    cache_enquetes.invalidar()
+
+
+# -------------------------------
+# Consultas usadas pelo bot e scripts
+# -------------------------------
+SQL_BUSCAR_ENQUETE = """
+    SELECT e.id_enquete, j.time_visitante, j.time_mandante,
+           j.inicio_epoch, j.enquete_encerrada
+    FROM ENQUETE e
+    JOIN JOGO j ON j.id_jogo = e.id_jogo
+    WHERE e.message_id = ?
+"""
+
+SQL_BUSCAR_ENQUETE_POR_POLL = """
+    SELECT e.id_enquete, j.time_visitante, j.time_mandante,
+           j.inicio_epoch, j.enquete_encerrada
+    FROM ENQUETE e
+    JOIN JOGO j ON j.id_jogo = e.id_jogo
+    WHERE e.poll_id = ?
+"""
+
+
+def buscar_enquete(message_id):
+    """Retorna (id_enquete, time_visitante, time_mandante, inicio_epoch,
+    enquete_encerrada) ou None. No bot, passa pelo cache_enquetes."""
+    with transacao(escrita=False) as cur:
+        cur.execute(SQL_BUSCAR_ENQUETE, (message_id,))
+        return cur.fetchone()
+
+
+def buscar_enquete_por_poll(poll_id):
+    """Como buscar_enquete, mas pelo poll_id do Telegram (respostas às enquetes)."""
+    with transacao(escrita=False) as cur:
+        cur.execute(SQL_BUSCAR_ENQUETE_POR_POLL, (poll_id,))
+        return cur.fetchone()
+
+
+def buscar_id_usuario(telegram_user_id):
+    """Retorna o id_usuario_participante do usuário do Telegram, ou None.
+    No bot, passa pelo cache_usuarios."""
+    with transacao(escrita=False) as cur:
+        cur.execute("""
+            SELECT id_usuario_participante
+            FROM USUARIO_PARTICIPANTE
+            WHERE telegram_user_id = ?
+        """, (telegram_user_id,))
+        row = cur.fetchone()
+    return row[0] if row else None
+
+
+SQL_ENQUETES_ABERTAS = """
+    SELECT e.message_id, e.poll_id, e.id_enquete, j.time_visitante, j.time_mandante,
+           j.inicio_epoch, j.enquete_encerrada
+    FROM JOGO j
+    JOIN ENQUETE e ON e.id_jogo = j.id_jogo
+    WHERE j.inicio_epoch >= ? AND j.inicio_epoch < ?
+      AND j.enquete_encerrada = 0
+"""
+
+
+def aquecer_cache_enquetes(inicio_epoch, fim_epoch):
+    """Carrega no cache_enquetes as enquetes abertas de jogos com início em
+    [inicio_epoch, fim_epoch). Retorna a lista de id_enquete carregados."""
+    with transacao(escrita=False) as cur:
+        cur.execute(SQL_ENQUETES_ABERTAS, (inicio_epoch, fim_epoch))
+        linhas = cur.fetchall()
+    banco = banco_atual()
+    for message_id, poll_id, *row in linhas:
+        cache_enquetes.guardar((banco, message_id), tuple(row))
+        if poll_id is not None:
+            cache_enquetes.guardar((banco, poll_id), tuple(row))
+    return [row[2] for row in linhas]
+
+
+SQL_CALENDARIO = """
+    SELECT game_id_nba, time_mandante, time_visitante, data_utc, hora_utc, status,
+           sigla_mandante, sigla_visitante, canal
+    FROM JOGO
+"""
+
+
+def listar_calendario():
+    """Todos os jogos do banco, no formato de sincronizar_jogos (para o
+    índice em memória de calendario.py)."""
+    with transacao(escrita=False) as cur:
+        cur.execute(SQL_CALENDARIO)
+        return cur.fetchall()
+
+
+SQL_JOGOS_ENTRE = """
+    SELECT id_jogo, game_id_nba, time_mandante, time_visitante,
+           sigla_mandante, sigla_visitante, canal, inicio_epoch,
+           strftime('%Hh%M', inicio_epoch + ?3, 'unixepoch') AS hora_local
+    FROM JOGO
+    WHERE inicio_epoch >= ?1 AND inicio_epoch < ?2
+    ORDER BY inicio_epoch
+"""
+
+SQL_JOGOS_SEM_ENQUETE_ENTRE = """
+    SELECT id_jogo, game_id_nba, time_mandante, time_visitante,
+           sigla_mandante, sigla_visitante, canal, inicio_epoch,
+           strftime('%Hh%M', inicio_epoch + ?3, 'unixepoch') AS hora_local
+    FROM JOGO j
+    WHERE inicio_epoch >= ?1 AND inicio_epoch < ?2
+      AND NOT EXISTS (SELECT 1 FROM ENQUETE e WHERE e.id_jogo = j.id_jogo)
+    ORDER BY inicio_epoch
+"""
+
+
+def listar_jogos_entre(inicio_epoch, fim_epoch, fuso_segundos=0, sem_enquete=False):
+    """Jogos com início em [inicio_epoch, fim_epoch), por horário.
+
+    Cada linha: (id_jogo, game_id_nba, time_mandante, time_visitante,
+    sigla_mandante, sigla_visitante, canal, inicio_epoch, hora_local), com
+    hora_local já formatada ("21h30") no fuso dado em segundos. Com
+    `sem_enquete`, só os jogos que ainda não têm enquete.
+    """
+    sql = SQL_JOGOS_SEM_ENQUETE_ENTRE if sem_enquete else SQL_JOGOS_ENTRE
+    with transacao(escrita=False) as cur:
+        cur.execute(sql, (inicio_epoch, fim_epoch, fuso_segundos))
+        return cur.fetchall()
+
+
+def calendario_cobre(fim_epoch):
+    """True se o calendário local tem jogos a partir de `fim_epoch` (ou seja,
+    já foi sincronizado além desta janela)."""
+    with transacao(escrita=False) as cur:
+        cur.execute("""
+            SELECT 1 FROM JOGO WHERE inicio_epoch >= ? LIMIT 1
+        """, (fim_epoch,))
+        return cur.fetchone() is not None
+
+
+SQL_ENQUETES_A_FECHAR = """
+    SELECT j.game_id_nba, j.time_visitante, j.time_mandante,
+           strftime('%H:%M:%S', j.inicio_epoch, 'unixepoch') AS hora_utc,
+           e.message_id,
+           j.inicio_epoch - ?2 - ?1 AS segundos_para_fechar
+    FROM JOGO j
+    JOIN ENQUETE e ON j.id_jogo = e.id_jogo
+    WHERE j.inicio_epoch >= ?1 - 86400
+      AND j.inicio_epoch < ?1 + ?2 + ?3
+      AND j.enquete_encerrada = 0
+    ORDER BY j.inicio_epoch
+"""
+
+
+def listar_enquetes_a_fechar(agora_epoch, antecedencia, horizonte):
+    """Enquetes abertas que fecham (início do jogo - `antecedencia` s) até
+    `horizonte` s a partir de agora, incluindo as já vencidas nas últimas 24h.
+
+    Cada linha (sqlite3.Row): game_id_nba, time_visitante, time_mandante,
+    hora_utc, message_id, segundos_para_fechar (<= 0: já deve fechar).
+    """
+    with transacao(escrita=False) as cur:
+        cur.row_factory = sqlite3.Row
+        cur.execute(SQL_ENQUETES_A_FECHAR, (agora_epoch, antecedencia, horizonte))
+        return cur.fetchall()
+
+
+SQL_CONTAR_JOGOS_SEM_ENQUETE = """
+    SELECT COUNT(*)
+    FROM JOGO j
+    WHERE j.inicio_epoch >= ? AND j.inicio_epoch < ?
+      AND NOT EXISTS (SELECT 1 FROM ENQUETE e WHERE e.id_jogo = j.id_jogo)
+"""
+
+
+def contar_jogos_sem_enquete(inicio_epoch, fim_epoch):
+    """Quantos jogos com início em [inicio_epoch, fim_epoch) ainda não têm
+    enquete. A conferência é por jogo: as janelas do dia se sobrepõem (os
+    jogos da madrugada ganham enquete na véspera), então uma enquete na
+    janela não quer dizer que o dia já foi criado."""
+    with transacao(escrita=False) as cur:
+        cur.execute(SQL_CONTAR_JOGOS_SEM_ENQUETE, (inicio_epoch, fim_epoch))
+        return cur.fetchone()[0]
+
+
+SQL_JOGOS_SEM_RESULTADO = """
+    SELECT game_id_nba, inicio_epoch
+    FROM JOGO
+    WHERE inicio_epoch >= ?1 AND inicio_epoch < ?2
+      AND vencedor IS NULL
+    ORDER BY inicio_epoch
+"""
+
+
+def listar_jogos_sem_resultado(inicio_epoch, fim_epoch):
+    """(game_id_nba, inicio_epoch) dos jogos com início em
+    [inicio_epoch, fim_epoch) ainda sem vencedor, por horário."""
+    with transacao(escrita=False) as cur:
+        cur.execute(SQL_JOGOS_SEM_RESULTADO, (inicio_epoch, fim_epoch))
+        return cur.fetchall()
+
+
+SQL_SITUACAO_PLACAR = """
+    SELECT COUNT(CASE WHEN inicio_epoch <= ?1 - ?2 THEN 1 END),
+           MIN(CASE WHEN inicio_epoch > ?1 - ?2 THEN inicio_epoch END)
+    FROM JOGO
+    WHERE vencedor IS NULL
+      AND inicio_epoch >= ?1 - ?3
+      AND inicio_epoch < ?1 + 172800
+"""
+
+
+def situacao_placar(agora_epoch, duracao_minima, duracao_maxima):
+    """Retorna (pendentes, proximo_inicio) dos jogos ainda sem resultado.
+
+    pendentes: jogos que começaram entre `duracao_maxima` e `duracao_minima`
+    segundos atrás (já podem ter terminado); proximo_inicio: epoch do início
+    do próximo jogo que ainda não chegou nessa fase (ou None), nas próximas 48h.
+    """
+    with transacao(escrita=False) as cur:
+        cur.execute(SQL_SITUACAO_PLACAR, (agora_epoch, duracao_minima, duracao_maxima))
+        return cur.fetchone()
+
+
+def listar_votantes(id_enquete):
+    """Lista os id_usuario_participante que já votaram na enquete."""
+    with transacao(escrita=False) as cur:
+        cur.execute("""
+            SELECT id_usuario_participante FROM VOTO WHERE id_enquete = ?
+        """, (id_enquete,))
+        return [r[0] for r in cur.fetchall()]
+
+
+SQL_RANKING = """
+    SELECT telegram_user_id, apelido, pontuacao, frequencia_participacao
+    FROM USUARIO_PARTICIPANTE
+    ORDER BY pontuacao DESC, frequencia_participacao DESC, id_usuario_participante
+"""
+
+
+def listar_ranking():
+    """Lista (telegram_user_id, apelido, pontuacao, frequencia_participacao)
+    em ordem de ranking (empates pela ordem de cadastro)."""
+    with transacao(escrita=False) as cur:
+        cur.execute(SQL_RANKING)
+        return cur.fetchall()
+
+
+SQL_CLASSIFICACAO = """
+    SELECT id_usuario_participante, telegram_user_id, apelido, pontuacao, frequencia_participacao
+    FROM USUARIO_PARTICIPANTE
+    ORDER BY pontuacao DESC, frequencia_participacao DESC, id_usuario_participante
+"""
+
+SQL_CLASSIFICACAO_DE = """
+    SELECT id_usuario_participante, telegram_user_id, apelido, pontuacao, frequencia_participacao
+    FROM USUARIO_PARTICIPANTE
+    WHERE id_usuario_participante IN (SELECT value FROM json_each(?))
+"""
+
+
+def listar_classificacao(ids_usuario=None):
+    """Linhas do ranking com o id interno (id_usuario_participante,
+    telegram_user_id, apelido, pontuacao, frequencia_participacao): todas,
+    em ordem de ranking, ou só as dos usuários `ids_usuario`."""
+    with transacao(escrita=False) as cur:
+        if ids_usuario is None:
+            cur.execute(SQL_CLASSIFICACAO)
+        else:
+            cur.execute(SQL_CLASSIFICACAO_DE, (json.dumps(list(ids_usuario)),))
+        return cur.fetchall()
+
+
+def versao_pontuacao():
+    """Contador que muda sempre que a pontuação de alguém muda."""
+    with transacao(escrita=False) as cur:
+        cur.execute("SELECT valor FROM META WHERE chave = 'versao_pontuacao'")
+        row = cur.fetchone()
+    return int(row[0]) if row else 0
+
+
+def _incrementar_versao_pontuacao(cur):
     cur.execute("""
-        CREATE TRIGGER IF NOT EXISTS evitar_voto_duplicado
-        BEFORE INSERT ON VOTO
-        FOR EACH ROW
-        BEGIN
-            SELECT CASE
-                WHEN EXISTS (
-                    SELECT 1 FROM VOTO 
-                    WHERE id_usuario_participante = NEW.id_usuario_participante 
-                    AND id_enquete = NEW.id_enquete
-                ) THEN
-                    RAISE(ABORT, 'Usuário já votou nesta enquete')
-            END;
-        END;
+        INSERT INTO META (chave, valor) VALUES ('versao_pontuacao', 1)
+        ON CONFLICT (chave) DO UPDATE SET valor = valor + 1
     """)
-    
-    conn.commit()
-    conn.close()
 
 
 # -------------------------------
-# Execução direta para criar tabelas
+# Verificação dos planos de consulta
+# -------------------------------
+# Consultas quentes de main.py, agendador.py, stopper.py,
+# criar_enquetes_do_dia.py, atualizar_resultados.py e consultas.py (as que
+# não usam as constantes SQL_* acima são cópias: mantenha em sincronia; as de
+# busca.py são montadas em verificar_planos). Cada item: (sql,
+# parâmetros, aliases que podem ser varridos por inteiro — ex.: a tabela
+# que dirige um relatório).
+CONSULTAS_QUENTES = {
+    "main.buscar_enquete": (SQL_BUSCAR_ENQUETE, (1,), ()),
+    "main.buscar_enquete_por_poll": (SQL_BUSCAR_ENQUETE_POR_POLL, ("5012345678",), ()),
+    "main.aquecer_cache_enquetes": (
+        SQL_ENQUETES_ABERTAS, (1735700400, 1735794000), ()),
+    "main.buscar_id_usuario": ("""
+        SELECT id_usuario_participante FROM USUARIO_PARTICIPANTE
+        WHERE telegram_user_id = ?
+    """, (1,), ()),
+    "main.listar_ranking": (SQL_RANKING, (), ()),
+    "main.listar_classificacao": (SQL_CLASSIFICACAO, (), ()),
+    "main.listar_classificacao_de": (SQL_CLASSIFICACAO_DE, ("[1, 2]",), ()),
+    "main.versao_pontuacao": ("""
+        SELECT valor FROM META WHERE chave = 'versao_pontuacao'
+    """, (), ()),
+    "criar_enquetes_do_dia.jogos_do_dia": (
+        SQL_JOGOS_ENTRE, (1735700400, 1735794000, -10800), ()),
+    "criar_enquetes_do_dia.jogos_sem_enquete": (
+        SQL_JOGOS_SEM_ENQUETE_ENTRE, (1735700400, 1735794000, -10800), ()),
+    "fila_votos.listar_votantes": ("""
+        SELECT id_usuario_participante FROM VOTO WHERE id_enquete = ?
+    """, (1,), ()),
+    "agendador.jogos_sem_enquete": (
+        SQL_CONTAR_JOGOS_SEM_ENQUETE, (1735700400, 1735794000), ()),
+    "agendador.situacao_placar": (
+        SQL_SITUACAO_PLACAR, (1735700400, 7200, 21600), ()),
+    "recuperar_resultados.jogos_sem_resultado": (
+        SQL_JOGOS_SEM_RESULTADO, (1735700400, 1735794000), ()),
+    "stopper.enquetes_a_fechar": (
+        SQL_ENQUETES_A_FECHAR, (1735700400, 600, 86400), ()),
+    "atualizar_resultados.resultado_atual": ("""
+        SELECT vencedor, placar_mandante, placar_visitante, pontuado
+        FROM JOGO WHERE game_id_nba = ?
+    """, ("0022400001",), ()),
+    "atualizar_resultados.pontuar": (SQL_PONTUAR, (), ("a",)),
+    "atualizar_resultados.jogos_a_pontuar": (SQL_JOGOS_A_PONTUAR, (), ()),
+    "atualizar_resultados.ultima_apuracao": (SQL_ULTIMA_APURACAO, (), ()),
+    "atualizar_resultados.apurar_jogo": (SQL_APURAR_JOGO, ("M", 1, 2025), ("a",)),
+    "fila_votos.contar_voto": (SQL_CONTAR_VOTO, (1, 1, 1), ("t",)),
+    "consultas.consulta_agrupamento": ("""
+        SELECT u.apelido, s.apurados AS total_votos, s.acertos
+        FROM ESTATISTICA_USUARIO s
+        JOIN USUARIO_PARTICIPANTE u ON u.id_usuario_participante = s.id_usuario_participante
+        WHERE s.temporada = ? AND s.apurados > 0
+        ORDER BY s.acertos DESC, s.apurados DESC
+    """, (0,), ("s",)),
+    "consultas.consulta_join_complexo": ("""
+        SELECT u.apelido, COALESCE(s.votos, 0) AS total_votos
+        FROM USUARIO_PARTICIPANTE u
+        LEFT JOIN ESTATISTICA_USUARIO s
+          ON s.id_usuario_participante = u.id_usuario_participante AND s.temporada = ?
+    """, (0,), ("u",)),
+}
+
+
+def verificar_planos():
+    """Roda EXPLAIN QUERY PLAN nas consultas quentes.
+
+    Uma consulta falha se varrer alguma tabela sem índice (linha `SCAN x`
+    sem `USING ... INDEX`), exceto os aliases liberados para ela.
+    Retorna uma lista de (nome, linhas do plano, ok).
+    """
+    import busca    # importa database: aqui dentro para não virar import circular
+
+    consultas = dict(CONSULTAS_QUENTES)
+    for campo in busca.CAMPOS:
+        for modo in busca.MODOS:
+            consultas[f"busca.{campo}.{modo}"] = (busca.montar_busca(campo, modo), {
+                "termo": "abc", "consulta": busca._consulta_fts(campo, "abc"),
+                "padrao": "%abc%", "prefixo": "abc%", "limite": 50,
+            }, ())
+
+    resultado = []
+    with transacao(escrita=False) as cur:
+        for nome, (sql, params, liberados) in consultas.items():
+            cur.execute("EXPLAIN QUERY PLAN " + sql, params)
+            plano = [linha[3] for linha in cur.fetchall()]
+            ok = True
+            for detalhe in plano:
+                partes = detalhe.split()
+                if detalhe == "SCAN CONSTANT ROW":
+                    continue
+                if partes[0] == "SCAN" and "INDEX" not in partes and partes[1] not in liberados:
+                    ok = False
+            resultado.append((nome, plano, ok))
+    return resultado
+
+
+# -------------------------------
+# Execução direta: cria/migra o schema (com --planos, confere os índices; com
+# --estatisticas, confere ESTATISTICA_USUARIO contra o recálculo do zero)
 # -------------------------------
 if __name__ == "__main__":
+    import sys
+
     create_tables()
-    criar_triggers()
-    print(f"Tabelas e triggers criadas/validadas em {DB_NAME}.")
\ No newline at end of file
+    print(f"Schema na versão {versao_schema()} em {DB_NAME}.")
+
+    if "--planos" in sys.argv:
+        falhas = 0
+        for nome, plano, ok in verificar_planos():
+            print(f"{'✅' if ok else '❌'} {nome}")
+            for linha in plano:
+                print(f"      {linha}")
+            falhas += not ok
+        if falhas:
+            sys.exit(1)
+
+    if "--estatisticas" in sys.argv:
+        diferencas = verificar_estatisticas()
+        for id_usuario, temporada, campo, atual, esperado in diferencas[:50]:
+            print(f"❌ usuário {id_usuario}, temporada {temporada or 'geral'}: "
+                  f"{campo} = {atual}, esperado {esperado}")
+        if diferencas:
+            print(f"{len(diferencas)} diferença(s). Para corrigir: --reconstruir-estatisticas")
+            sys.exit(1)
+        print("✅ Estatísticas conferem com o recálculo do zero.")
+
+    if "--reconstruir-estatisticas" in sys.argv:
+        reconstruir_estatisticas()
+        print("✅ Estatísticas reconstruídas.")
\ No newline at end of file
@@ -0,0 +1,80 @@
+"""
+Acesso assíncrono ao banco para os handlers do bot.
+
+Os handlers do python-telegram-bot rodam no event loop; qualquer chamada
+síncrona ao sqlite3 (commit lento, espera pelo lock do WAL) trava todas as
+outras atualizações. Aqui todo o trabalho de banco vai para threads:
+
+  - escritas: uma thread dedicada por banco (o SQLite só tem um escritor
+    por arquivo, então serializar aqui evita disputa pelo lock entre threads
+    do bot; bancos de grupos diferentes escrevem em paralelo);
+  - leituras: um pequeno pool, que no modo WAL não espera pelo escritor.
+
+Cada thread usa a sua conexão de longa duração de `database.obter_conexao()`.
+As chamadas levam o contexto de quem chamou, então o banco escolhido com
+`database.usando_banco()` (o do grupo) vale dentro da thread.
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from database import banco_atual
+
+THREADS_LEITURA = 4
+
+_escritores = {}      # banco -> executor de uma thread
+_lock_escritores = threading.Lock()
+_leitores = ThreadPoolExecutor(max_workers=THREADS_LEITURA, thread_name_prefix="db-leitura")
+
+
+def _escritor():
+    banco = banco_atual()
+    escritor = _escritores.get(banco)
+    if escritor is None:
+        with _lock_escritores:
+            escritor = _escritores.get(banco)
+            if escritor is None:
+                escritor = _escritores[banco] = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="db-escrita")
+    return escritor
+
+
+async def _executar(executor, func, args, kwargs):
+    loop = asyncio.get_running_loop()
+    contexto = contextvars.copy_context()
+    return await loop.run_in_executor(
+        executor, functools.partial(contexto.run, func, *args, **kwargs))
+
+
+async def escrever(func, *args, **kwargs):
+    """Executa `func(*args, **kwargs)` na thread de escrita do banco atual e
+    aguarda o resultado."""
+    return await _executar(_escritor(), func, args, kwargs)
+
+
+async def ler(func, *args, **kwargs):
+    """Executa `func(*args, **kwargs)` numa thread de leitura e aguarda o resultado."""
+    return await _executar(_leitores, func, args, kwargs)
+
+
+async def ler_com_cache(cache, chave, func, *args):
+    """Como `ler(func, *args)`, mas consulta `cache` (um cache.CacheLRU) antes.
+
+    Um acerto responde direto do event loop, sem thread nem SQLite.
+    Resultados None não são guardados.
+    """
+    valor = cache.obter(chave)
+    if valor is None:
+        valor = await ler(func, *args)
+        if valor is not None:
+            cache.guardar(chave, valor)
+    return valor
+
+
+def encerrar():
+    """Espera as operações pendentes terminarem e libera as threads."""
+    for escritor in list(_escritores.values()):
+        escritor.shutdown(wait=True)
+    _leitores.shutdown(wait=True)
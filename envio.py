@@ -0,0 +1,173 @@
+"""
+Envio de mensagens ao Telegram respeitando os limites de flood.
+
+O Telegram recusa (RetryAfter / HTTP 429) um bot que passa de ~30
+mensagens/s no total ou de 20 mensagens/min no mesmo grupo. Antes as
+enquetes eram enviadas uma a uma e um RetryAfter virava só um print (a
+enquete daquele jogo simplesmente não era criada).
+
+O Enviador controla um token bucket global e uma janela deslizante por chat
+(um bucket com a mesma taxa deixaria passar o dobro numa rajada, e o limite
+de grupo do Telegram vale para qualquer minuto), deixa os envios
+acontecerem em paralelo dentro desses limites e, num RetryAfter, pausa o
+chat pelo tempo pedido e tenta de novo. A ordem entre mensagens que
+dependem uma da outra (ex.: fixar a mensagem depois de enviá-la) fica a
+cargo de quem chama: basta aguardar uma antes de enviar a outra.
+"""
+import asyncio
+import time
+from collections import deque
+
+from telegram import Bot
+from telegram.error import BadRequest, NetworkError, RetryAfter, TimedOut
+from telegram.request import HTTPXRequest
+
+import metricas
+
+# Limites do Telegram para bots (a janela do chat leva 1s de folga para
+# a diferença entre o relógio daqui e a chegada no servidor)
+LIMITE_GLOBAL_POR_SEGUNDO = 30
+LIMITE_CHAT = 20
+JANELA_CHAT = 61
+
+# Conexões HTTP simultâneas do bot dos scripts (o padrão do Bot é 1, o que
+# serializaria os envios; o bot do main.py já usa o pool do Application)
+CONEXOES = 16
+
+TENTATIVAS = 5
+ESPERA_INICIAL_ERRO = 1.0      # s; dobra a cada nova falha de rede
+
+# Métodos que podem ser repetidos após um timeout sem risco de duplicar
+# mensagem (o pedido anterior pode ter chegado ao Telegram)
+METODOS_IDEMPOTENTES = {"stop_poll", "pin_chat_message", "get_me"}
+
+
+def _segundos(retry_after):
+    """retry_after vem em segundos (int) ou timedelta, conforme a versão do PTB."""
+    return retry_after.total_seconds() if hasattr(retry_after, "total_seconds") else float(retry_after)
+
+
+def criar_bot(token):
+    """Bot para os scripts/agendador, com conexões para enviar em paralelo."""
+    return Bot(token, request=HTTPXRequest(connection_pool_size=CONEXOES))
+
+
+class Balde:
+    """Token bucket: até `capacidade` envios de rajada, repostos a `taxa`
+    por segundo. Quem pede primeiro é atendido primeiro."""
+
+    def __init__(self, taxa, capacidade):
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self._fichas = capacidade
+        self._atualizado = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def retirar(self):
+        # o lock do asyncio é justo (FIFO), então a ordem de chegada é mantida
+        async with self._lock:
+            while True:
+                agora = time.monotonic()
+                self._fichas = min(self.capacidade,
+                                   self._fichas + (agora - self._atualizado) * self.taxa)
+                self._atualizado = agora
+
+                if self._fichas >= 1:
+                    self._fichas -= 1
+                    return
+                await asyncio.sleep((1 - self._fichas) / self.taxa)
+
+
+class Janela:
+    """No máximo `limite` liberações em qualquer intervalo de `segundos`.
+    Quem pede primeiro é atendido primeiro."""
+
+    def __init__(self, limite, segundos):
+        self.limite = limite
+        self.segundos = segundos
+        self._liberados = deque()
+        self._pausado_ate = 0
+        self._lock = asyncio.Lock()
+
+    async def retirar(self):
+        async with self._lock:
+            while True:
+                agora = time.monotonic()
+                while self._liberados and self._liberados[0] <= agora - self.segundos:
+                    self._liberados.popleft()
+
+                espera = self._pausado_ate - agora
+                if len(self._liberados) >= self.limite:
+                    espera = max(espera, self._liberados[0] + self.segundos - agora)
+                if espera <= 0:
+                    self._liberados.append(agora)
+                    return
+                await asyncio.sleep(espera)
+
+    def pausar(self, segundos):
+        """Não libera nada pelos próximos `segundos` (ex.: após um RetryAfter)."""
+        self._pausado_ate = max(self._pausado_ate, time.monotonic() + segundos)
+
+
+class Enviador:
+    def __init__(self, bot, por_segundo=LIMITE_GLOBAL_POR_SEGUNDO,
+                 por_chat=LIMITE_CHAT, janela_chat=JANELA_CHAT, tentativas=TENTATIVAS):
+        self.bot = bot
+        self.tentativas = tentativas
+        self._global = Balde(por_segundo, por_segundo)
+        self._por_chat = por_chat
+        self._janela_chat = janela_chat
+        self._chats = {}
+
+        # contadores
+        self.enviados = 0
+        self.flood = 0             # RetryAfter recebidos
+        self.falhas = 0            # envios que desistiram
+
+    def _limite_chat(self, chat_id):
+        janela = self._chats.get(chat_id)
+        if janela is None:
+            janela = Janela(self._por_chat, self._janela_chat)
+            self._chats[chat_id] = janela
+        return janela
+
+    async def enviar(self, metodo, **kwargs):
+        """Chama `bot.<metodo>(**kwargs)` dentro dos limites e retorna o resultado.
+
+        RetryAfter: pausa o chat e tenta de novo. Erros de rede: tenta de novo
+        com espera crescente (timeouts só em métodos idempotentes). Qualquer
+        outro erro (ou o fim das tentativas) é repassado a quem chamou.
+        """
+        chat = self._limite_chat(kwargs.get("chat_id"))
+        for tentativa in range(1, self.tentativas + 1):
+            # primeiro o chat, depois o global: quem espera pelo próprio chat
+            # não segura a vez dos outros chats
+            await chat.retirar()
+            await self._global.retirar()
+            try:
+                resultado = await getattr(self.bot, metodo)(**kwargs)
+                self.enviados += 1
+                metricas.contar("bot_telegram_chamadas_total", metodo=metodo, resultado="ok")
+                return resultado
+            except RetryAfter as e:
+                self.flood += 1
+                metricas.contar("bot_telegram_chamadas_total", metodo=metodo, resultado="flood")
+                espera = _segundos(e.retry_after)
+                print(f"⏳ Flood control em {metodo}: aguardando {espera:.0f}s")
+                chat.pausar(espera)
+                erro = e
+            except BadRequest:
+                self.falhas += 1
+                metricas.contar("bot_telegram_chamadas_total", metodo=metodo, resultado="erro")
+                raise
+            except NetworkError as e:
+                metricas.contar("bot_telegram_chamadas_total", metodo=metodo, resultado="erro_rede")
+                if isinstance(e, TimedOut) and metodo not in METODOS_IDEMPOTENTES:
+                    self.falhas += 1
+                    raise
+                erro = e
+                if tentativa < self.tentativas:
+                    await asyncio.sleep(ESPERA_INICIAL_ERRO * 2 ** (tentativa - 1))
+
+        self.falhas += 1
+        raise erro
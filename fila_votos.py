@@ -0,0 +1,205 @@
+"""
+Fila de ingestão de votos com gravação em lote (group commit).
+
+O callback do botão confirma o palpite na hora e o voto fica na fila;
+a cada INTERVALO_MS (ou quando a fila chega a LOTE_MAXIMO) todos os
+votos pendentes são gravados numa única transação.
+
+Garantias:
+  - cada voto aceito é antes anexado ao ARQUIVO_PENDENTES (flush, sem
+    fsync), então um processo derrubado não perde votos: na próxima
+    inicialização o arquivo é regravado no banco (a gravação ignora votos
+    repetidos). Uma queda do sistema (energia, kernel) pode perder os
+    votos ainda no cache de disco do sistema operacional;
+  - `encerrar()` descarrega tudo antes de o bot sair;
+  - votos repetidos pelo botão são detectados na hora, por enquete, e o
+    usuário recebe a resposta certa mesmo com o voto anterior ainda na fila;
+  - respostas às enquetes (`responder`) podem trocar ou retirar o voto
+    enquanto a enquete está aberta; a fila aplica tudo na ordem de chegada;
+  - um voto que o banco recusa (ex.: enquete apagada ou arquivada) não
+    trava a fila: o lote que falha é dividido ao meio até isolá-lo, e ele
+    vai para o arquivo de recusados (<arquivo>_recusados.jsonl). Só erros
+    do banco em si (travado, disco) devolvem o lote para a fila.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+from database import listar_votantes, registrar_palpites, usando_banco
+from database_async import ler, escrever
+
+ARQUIVO_PENDENTES = "votos_pendentes.jsonl"
+INTERVALO_MS = 200
+LOTE_MAXIMO = 200
+
+class FilaVotos:
+    def __init__(self, arquivo=ARQUIVO_PENDENTES, intervalo_ms=INTERVALO_MS,
+                 lote_maximo=LOTE_MAXIMO, ao_gravar=None, banco=None):
+        self.arquivo = arquivo
+        self.arquivo_recusados = os.path.splitext(arquivo)[0] + "_recusados.jsonl"
+        # banco do grupo (None = database.DB_NAME); veja grupos.py
+        self.banco = banco
+        # chamado depois de cada lote gravado, com os id_usuario dos votos
+        self.ao_gravar = ao_gravar
+        self.intervalo = intervalo_ms / 1000
+        self.lote_maximo = lote_maximo
+
+        self._pendentes = []
+        # (id_usuario, id_enquete) que já votaram, no banco ou na fila
+        self._votados = set()
+        self._enquetes_carregadas = set()
+        # id_enquete -> carga em andamento (quem chega junto espera a mesma)
+        self._carregando = {}
+
+        self._arquivo = None
+        self._acordar = asyncio.Event()
+        self._parar = False
+        self._tarefa = None
+
+    async def iniciar(self):
+        """Regrava votos que sobraram de uma execução anterior e liga o flush."""
+        sobras = []
+        if os.path.exists(self.arquivo):
+            with open(self.arquivo, encoding="utf-8") as f:
+                sobras = [tuple(json.loads(linha)) for linha in f if linha.strip()]
+
+        # as sobras continuam no arquivo até serem gravadas (como qualquer
+        # lote, um voto recusado não impede os demais)
+        self._arquivo = open(self.arquivo, "w", encoding="utf-8")
+        if sobras:
+            for voto in sobras:
+                self._arquivo.write(json.dumps(voto) + "\n")
+            self._arquivo.flush()
+            self._pendentes = sobras + self._pendentes
+            await self.descarregar()
+            print(f"♻️ {len(sobras)} voto(s) recuperado(s) de {self.arquivo}")
+
+        self._tarefa = asyncio.create_task(self._loop())
+
+    async def carregar_enquetes(self, ids_enquete):
+        """Carrega de antemão quem já votou nessas enquetes (ex.: as abertas
+        do dia, na inicialização), para o 1º clique não ir ao banco."""
+        for id_enquete in ids_enquete:
+            if id_enquete in self._enquetes_carregadas:
+                continue
+
+            carga = self._carregando.get(id_enquete)
+            if carga is None:
+                carga = asyncio.ensure_future(self._carregar(id_enquete))
+                self._carregando[id_enquete] = carga
+            await carga
+
+    async def _carregar(self, id_enquete):
+        try:
+            with usando_banco(self.banco):
+                votantes = await ler(listar_votantes, id_enquete)
+            self._votados.update((uid, id_enquete) for uid in votantes)
+            self._enquetes_carregadas.add(id_enquete)
+        finally:
+            del self._carregando[id_enquete]
+
+    async def registrar(self, id_usuario, id_enquete, escolha):
+        """Enfileira o voto. Retorna False se o usuário já votou nesta enquete."""
+        await self.carregar_enquetes((id_enquete,))
+
+        chave = (id_usuario, id_enquete)
+        if chave in self._votados:
+            return False
+        self._votados.add(chave)
+        self._enfileirar(id_usuario, id_enquete, escolha)
+        return True
+
+    async def responder(self, id_usuario, id_enquete, escolha):
+        """Enfileira a resposta do usuário à enquete: o primeiro voto, uma
+        troca de escolha ou, com escolha None, a retirada do voto."""
+        await self.carregar_enquetes((id_enquete,))
+
+        chave = (id_usuario, id_enquete)
+        if escolha is None:
+            self._votados.discard(chave)
+        else:
+            self._votados.add(chave)
+        self._enfileirar(id_usuario, id_enquete, escolha)
+
+    def _enfileirar(self, id_usuario, id_enquete, escolha):
+        voto = (id_usuario, id_enquete, escolha, datetime.utcnow().isoformat())
+        self._arquivo.write(json.dumps(voto) + "\n")
+        self._arquivo.flush()
+        self._pendentes.append(voto)
+
+        if len(self._pendentes) >= self.lote_maximo:
+            self._acordar.set()
+
+    async def descarregar(self):
+        """Grava agora todos os votos pendentes numa única transação."""
+        if not self._pendentes:
+            return
+
+        lote, self._pendentes = self._pendentes, []
+        partes = [lote]
+        usuarios = set()
+        while partes:
+            parte = partes.pop(0)
+            try:
+                with usando_banco(self.banco):
+                    await escrever(registrar_palpites, parte)
+            except sqlite3.OperationalError as e:
+                # o banco em si falhou: devolve o que falta gravar para a
+                # frente da fila, na ordem; tenta de novo no próximo ciclo
+                restantes = [voto for p in [parte] + partes for voto in p]
+                self._pendentes = restantes + self._pendentes
+                print(f"❌ Erro ao gravar lote de {len(restantes)} voto(s): {e}")
+                if self.ao_gravar and usuarios:
+                    self.ao_gravar(usuarios)
+                return
+            except Exception as e:
+                if len(parte) == 1:
+                    self._recusar(parte[0], e)
+                else:
+                    meio = len(parte) // 2
+                    partes[:0] = [parte[:meio], parte[meio:]]
+                continue
+            usuarios.update(voto[0] for voto in parte)
+
+        # o arquivo passa a conter só o que chegou durante a gravação
+        self._arquivo.seek(0)
+        self._arquivo.truncate()
+        for voto in self._pendentes:
+            self._arquivo.write(json.dumps(voto) + "\n")
+        self._arquivo.flush()
+
+        if self.ao_gravar and usuarios:
+            self.ao_gravar(usuarios)
+
+    def _recusar(self, voto, erro):
+        """Tira da fila um voto que o banco recusa sozinho (o usuário pode
+        votar de novo: o voto nunca foi gravado)."""
+        self._votados.discard((voto[0], voto[1]))
+        print(f"❌ Voto recusado pelo banco, movido para {self.arquivo_recusados}: {voto} ({erro})")
+        with open(self.arquivo_recusados, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"voto": voto, "erro": str(erro)}) + "\n")
+
+    async def _loop(self):
+        while not self._parar:
+            try:
+                await asyncio.wait_for(self._acordar.wait(), self.intervalo)
+            except asyncio.TimeoutError:
+                pass
+            self._acordar.clear()
+            await self.descarregar()
+
+    async def encerrar(self):
+        """Para o flush periódico e grava o que ainda estiver na fila."""
+        if self._tarefa:
+            # não cancela a tarefa: um lote pode estar no meio da gravação
+            self._parar = True
+            self._acordar.set()
+            await self._tarefa
+            self._tarefa = None
+
+        await self.descarregar()
+        if self._arquivo:
+            self._arquivo.close()
+            self._arquivo = None
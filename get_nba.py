@@ -1,5 +1,13 @@
+import hashlib
+import json
+import os
+import re
+import time
 import requests
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+
+import metricas
 
 # Calendário completo da temporada
 URL_TEMPORADA = "https://cdn.nba.com/static/json/staticData/scheduleLeagueV2_1.json"
@@ -7,34 +15,349 @@ URL_TEMPORADA = "https://cdn.nba.com/static/json/staticData/scheduleLeagueV2_1.j
 # Placar diário (jogos do dia e seus resultados)
 URL_SCOREBOARD = "https://cdn.nba.com/static/json/liveData/scoreboard/todaysScoreboard_00.json"
 
+# Boxscore de um jogo (placar final de jogos passados)
+URL_BOXSCORE = "https://cdn.nba.com/static/json/liveData/boxscore/boxscore_{game_id}.json"
 
-def obter_calendario_completo():
+# Cache em disco das respostas da CDN (corpo + ETag/Last-Modified)
+PASTA_CACHE = os.getenv("NBA_CACHE_DIR", ".cache_nba")
+
+# Idade máxima (s) em que o cache é usado sem nem revalidar na CDN.
+# O calendário muda pouco; o placar precisa estar sempre quase fresco.
+MAX_IDADE_CALENDARIO = int(os.getenv("NBA_CACHE_MAX_IDADE_CALENDARIO", "3600"))
+MAX_IDADE_SCOREBOARD = int(os.getenv("NBA_CACHE_MAX_IDADE_SCOREBOARD", "10"))
+
+# Tamanho dos blocos lidos da rede e do arquivo do calendário (bytes/caracteres)
+TAMANHO_BLOCO = 64 * 1024
+
+_sessao = None
+
+
+def obter_sessao():
+    """Sessão HTTP compartilhada (keep-alive + pool de conexões)."""
+    global _sessao
+    if _sessao is None:
+        _sessao = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        _sessao.mount("https://", adaptador)
+        _sessao.mount("http://", adaptador)
+    return _sessao
+
+
+def _caminhos_cache(url):
+    base = os.path.join(PASTA_CACHE, hashlib.sha1(url.encode()).hexdigest())
+    return base + ".json", base + ".meta"
+
+
+def _gravar_atomico(caminho, conteudo):
+    tmp = caminho + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(conteudo)
+    os.replace(tmp, caminho)
+
+
+def _medir_download(url, resultado, t0, tamanho=0):
+    arquivo = url.rsplit("/", 1)[-1]
+    metricas.observar("bot_cdn_segundos", time.perf_counter() - t0, arquivo=arquivo, resultado=resultado)
+    if tamanho:
+        metricas.contar("bot_cdn_bytes_total", tamanho, arquivo=arquivo)
+
+
+def _baixar(url, max_idade, timeout, ler):
+    """
+    Baixa `url` usando o cache em disco e devolve `ler(caminho)` do corpo:
+      - cópia com menos de `max_idade` segundos: lida sem ir à rede;
+      - senão, GET condicional (If-None-Match / If-Modified-Since);
+        um 304 reaproveita a cópia local sem baixar o corpo de novo;
+      - se a CDN falhar e existir cópia (mesmo vencida), ela é lida.
+    O corpo vai da rede para o disco em blocos, sem passar inteiro pela
+    memória; um corpo que `ler` recusa não substitui a cópia em cache.
+    """
+    t0 = time.perf_counter()
+    caminho_corpo, caminho_meta = _caminhos_cache(url)
+    meta = None
+    if os.path.exists(caminho_corpo) and os.path.exists(caminho_meta):
+        with open(caminho_meta, encoding="utf-8") as f:
+            meta = json.load(f)
+
+    if meta and time.time() - meta["salvo_em"] < max_idade:
+        dados = ler(caminho_corpo)
+        _medir_download(url, "cache", t0)
+        return dados
+
+    headers = {}
+    if meta and meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta and meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+
+    os.makedirs(PASTA_CACHE, exist_ok=True)
+    tmp = caminho_corpo + ".tmp"
+    try:
+        # lido até o fim, o corpo devolve a conexão ao pool (keep-alive)
+        r = obter_sessao().get(url, headers=headers, timeout=timeout, stream=True)
+        if r.status_code == 304 and meta:
+            r.content
+            baixado = None
+        else:
+            r.raise_for_status()
+            baixado = 0
+            with open(tmp, "wb") as f:
+                for bloco in r.iter_content(TAMANHO_BLOCO):
+                    f.write(bloco)
+                    baixado += len(bloco)
+            dados = ler(tmp)
+    except Exception as e:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        if not meta:
+            _medir_download(url, "erro", t0)
+            raise
+        print(f"⚠️ Falha ao acessar {url} ({e}); usando cópia em cache.")
+        dados = ler(caminho_corpo)
+        _medir_download(url, "falha", t0)
+        return dados
+
+    if baixado is None:
+        # 304: o conteúdo local continua válido, só renova o relógio
+        meta["salvo_em"] = time.time()
+        _gravar_atomico(caminho_meta, json.dumps(meta).encode())
+        dados = ler(caminho_corpo)
+        _medir_download(url, "304", t0)
+        return dados
+
+    os.replace(tmp, caminho_corpo)
+    _gravar_atomico(caminho_meta, json.dumps({
+        "url": url,
+        "etag": r.headers.get("ETag"),
+        "last_modified": r.headers.get("Last-Modified"),
+        "salvo_em": time.time(),
+    }).encode())
+    _medir_download(url, "200", t0, baixado)
+    return dados
+
+
+def _ler_json(caminho):
+    with open(caminho, "rb") as f:
+        return json.loads(f.read())
+
+
+def baixar_json(url, max_idade=0, timeout=20):
+    """Baixa um JSON usando o cache em disco (veja _baixar) e devolve o
+    objeto inteiro."""
+    return _baixar(url, max_idade, timeout, _ler_json)
+
+
+def extrair_canal(jogo: dict) -> str | None:
+    """Tenta extrair um canal de TV amigável da estrutura broadcasters."""
+    b = jogo.get("broadcasters", {}) or {}
+
+    # ordem de preferência
+    chaves = [
+        "intlTvBroadcasters",
+        "nationalTvBroadcasters",
+        "homeTvBroadcasters",
+        "awayTvBroadcasters",
+    ]
+
+    for chave in chaves:
+        arr = b.get(chave) or []
+        for item in arr:
+            if item.get("broadcasterMedia") == "tv":
+                return item.get("broadcasterDisplay")
+    return None
+
+
+# Leitura em fluxo do calendário: só os objetos de jogo (dentro das listas
+# "games") são decodificados, um de cada vez; o resto do arquivo é só
+# percorrido, contando chaves/colchetes para saber se ele chegou inteiro
+_DELIMITADOR = re.compile(r'["{}\[\]]')
+_INICIO_JOGOS = re.compile(r'\s*:\s*\[')
+_CHAVE_PARTIDA = re.compile(r'\s*(?::\s*)?\Z')
+_SEPARADOR = re.compile(r'[\s,]*')
+
+
+class _FaltaTexto(Exception):
+    """O bloco lido acabou no meio de um trecho: falta ler mais."""
+
+
+def iterar_jogos(caminho, tamanho_bloco=TAMANHO_BLOCO):
+    """Gera os jogos (dicts) do scheduleLeagueV2_1.json em `caminho`, um por
+    vez, lendo o arquivo em blocos. A memória usada é a de um bloco e um
+    jogo, não a da árvore inteira. ValueError se o arquivo está truncado ou
+    não é JSON válido."""
+    decodificador = json.JSONDecoder()
+    with open(caminho, encoding="utf-8") as f:
+        texto, pos, acabou = "", 0, False
+        profundidade, nos_jogos = 0, False
+        while True:
+            try:
+                if nos_jogos:
+                    pos = _SEPARADOR.match(texto, pos).end()
+                    if pos == len(texto):
+                        raise _FaltaTexto
+                    if texto[pos] == "]":
+                        nos_jogos = False
+                        profundidade -= 1
+                        pos += 1
+                        continue
+                    jogo, pos = decodificador.raw_decode(texto, pos)
+                    yield jogo
+                    continue
+
+                m = _DELIMITADOR.search(texto, pos)
+                if m is None:
+                    pos = len(texto)
+                    raise _FaltaTexto
+                pos = m.start()
+                if texto[pos] == '"':
+                    chave, depois = decodificador.raw_decode(texto, pos)
+                    if chave == "games":
+                        m = _INICIO_JOGOS.match(texto, depois)
+                        if m is None and _CHAVE_PARTIDA.match(texto, depois):
+                            raise _FaltaTexto
+                        if m is not None:
+                            nos_jogos = True
+                            profundidade += 1
+                            depois = m.end()
+                    pos = depois
+                else:
+                    profundidade += 1 if texto[pos] in "{[" else -1
+                    pos += 1
+            except (_FaltaTexto, json.JSONDecodeError) as e:
+                if acabou:
+                    if isinstance(e, _FaltaTexto) and profundidade == 0 and not nos_jogos:
+                        return
+                    raise ValueError(f"Calendário incompleto ou inválido em {caminho}") from None
+                bloco = f.read(tamanho_bloco)
+                acabou = not bloco
+                texto = texto[pos:] + bloco
+                pos = 0
+
+
+def jogo_compacto(jogo):
+    """(game_id, mandante, visitante, data_utc, hora_utc, status,
+    sigla_mandante, sigla_visitante, canal) de um jogo do calendário: só os
+    campos que o bot usa, no formato de database.sincronizar_jogos.
+    ValueError se o jogo não tem horário."""
+    game_id = jogo["gameId"]
+
+    # data e hora em UTC (preciso para conversão posterior)
+    game_datetime_utc = jogo.get("gameDateTimeUTC")
+    if not game_datetime_utc:
+        raise ValueError(f"Jogo {game_id} sem campo gameDateTimeUTC")
+
+    home = jogo["homeTeam"]
+    away = jogo["awayTeam"]
+
+    # "2025-10-21T23:30:00Z": fatiar a string basta; o epoch de início é
+    # calculado pelo SQLite na gravação
+    return (
+        game_id,
+        f"{home['teamCity']} {home['teamName']}",
+        f"{away['teamCity']} {away['teamName']}",
+        game_datetime_utc[:10],
+        game_datetime_utc[11:19],
+        jogo.get("gameStatusText", "scheduled"),
+        home.get("teamTricode", ""),
+        away.get("teamTricode", ""),
+        extrair_canal(jogo),
+    )
+
+
+def compactar_jogos(jogos, erros=None):
+    """Gera jogo_compacto() de cada jogo de `jogos`; os que não dão são
+    avisados, pulados e anotados em `erros` (lista de gameId)."""
+    for jogo in jogos:
+        try:
+            yield jogo_compacto(jogo)
+        except ValueError as e:
+            print(f"⚠️ {e} — ignorado.")
+            if erros is not None:
+                erros.append(jogo.get("gameId"))
+        except Exception as e:
+            print(f"❌ Erro ao processar jogo {jogo.get('gameId')}: {e}")
+            if erros is not None:
+                erros.append(jogo.get("gameId"))
+
+
+def jogos_da_temporada(caminho, erros=None):
+    """Jogos compactos do calendário em `caminho`, lidos em fluxo, um por vez."""
+    return compactar_jogos(iterar_jogos(caminho), erros)
+
+
+def obter_jogos_temporada():
     """
-    Baixa o JSON com o calendário completo da temporada.
+    Baixa (ou revalida) o calendário da temporada e devolve (jogos, erros):
+    os jogos compactos (jogo_compacto) e os gameId que ficaram de fora.
+    O JSON é lido em fluxo, sem montar a árvore inteira na memória.
     Usado em:
-      - atualizar_calendario.py
-      - criar_enquetes_do_dia.py
+      - atualizar_calendario.py (e, por ele, criar_enquetes_do_dia.py
+        quando o banco ainda não tem os jogos do dia)
+    """
+    def ler(caminho):
+        erros = []
+        return list(jogos_da_temporada(caminho, erros)), erros
+
+    try:
+        return _baixar(URL_TEMPORADA, MAX_IDADE_CALENDARIO, 20, ler)
+    except Exception as e:
+        print("❌ Erro ao baixar calendário completo:", e)
+        return [], []
+
+
+def obter_calendario_completo():
+    """
+    Baixa o JSON com o calendário completo da temporada e devolve as
+    `gameDates` inteiras (todos os campos de todos os jogos). Para
+    sincronizar o banco, obter_jogos_temporada() gasta bem menos memória.
     """
     try:
-        r = requests.get(URL_TEMPORADA, timeout=20)
-        r.raise_for_status()
-        data = r.json()
+        data = baixar_json(URL_TEMPORADA, MAX_IDADE_CALENDARIO)
         return data["leagueSchedule"]["gameDates"]
     except Exception as e:
         print("❌ Erro ao baixar calendário completo:", e)
         return []
 
 
-def obter_json_nba():
+def obter_json_nba(max_idade=None):
     """
-    Baixa o JSON de placares do dia (scoreboard).
+    Baixa o JSON de placares do dia (scoreboard). Com `max_idade=0`, sempre
+    revalida na CDN (um 304 não baixa o corpo de novo).
     Usado em:
       - atualizar_resultados.py
+      - placar_ao_vivo.py
     """
+    if max_idade is None:
+        max_idade = MAX_IDADE_SCOREBOARD
     try:
-        r = requests.get(URL_SCOREBOARD, timeout=20)
-        r.raise_for_status()
-        return r.json()
+        return baixar_json(URL_SCOREBOARD, max_idade)
     except Exception as e:
         print("❌ Erro ao baixar scoreboard do dia:", e)
         return {"scoreboard": {"games": []}}
+
+
+def obter_boxscore(game_id, timeout=10):
+    """
+    Baixa o boxscore de um jogo e devolve o objeto "game" (gameId,
+    gameStatus, gameStatusText, homeTeam, awayTeam, ...), ou None se a CDN
+    ainda não tem o jogo (404: adiado ou não começou). Sem cache em disco:
+    cada jogo passado é baixado uma vez e o resultado fica no banco.
+    Pode ser chamado de várias threads (sessão compartilhada).
+    Usado em:
+      - recuperar_resultados.py
+    """
+    url = URL_BOXSCORE.format(game_id=game_id)
+    # métricas com o modelo da URL: um rótulo só, não um por jogo
+    t0 = time.perf_counter()
+    try:
+        r = obter_sessao().get(url, timeout=timeout)
+        if r.status_code == 404:
+            _medir_download(URL_BOXSCORE, "404", t0)
+            return None
+        r.raise_for_status()
+        dados = r.json()["game"]
+    except Exception:
+        _medir_download(URL_BOXSCORE, "erro", t0)
+        raise
+    _medir_download(URL_BOXSCORE, "200", t0, len(r.content))
+    return dados
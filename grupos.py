@@ -0,0 +1,97 @@
+"""
+Vários grupos no mesmo bot, cada um com o seu banco.
+
+GROUP_IDS=-1001111,-1002222,... (ou só GROUP_ID, para um grupo). Cada grupo
+tem os seus usuários, enquetes, votos e ranking num arquivo SQLite próprio,
+então escritas de grupos diferentes não disputam o mesmo lock (e o
+database_async tem uma thread de escrita por banco).
+
+O grupo de GROUP_ID (ou, sem ele, o primeiro de GROUP_IDS) continua no
+banco padrão (database.DB_NAME) e no votos_pendentes.jsonl de sempre, então
+uma instalação de um grupo só não muda nada. Os demais ficam em
+nba_<id>.db e votos_pendentes_<id>.jsonl (<id> sem o sinal).
+
+O banco de cada operação é escolhido com database.usando_banco(grupo.banco).
+Calendário e placares são baixados uma vez e gravados em todos os bancos
+(em_cada_grupo).
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from dotenv import load_dotenv
+
+import database
+
+load_dotenv()
+
+# Quantos bancos em_cada_grupo atualiza ao mesmo tempo
+THREADS_GRUPOS = 8
+
+# Pool único: as threads (e as conexões de obter_conexao, uma por thread e
+# banco) duram o processo inteiro, em vez de serem abertas a cada chamada
+_local = threading.local()
+
+
+def _marcar_thread():
+    _local.no_pool = True
+
+
+_pool = ThreadPoolExecutor(max_workers=THREADS_GRUPOS, thread_name_prefix="grupo",
+                           initializer=_marcar_thread)
+
+
+class Grupo:
+    """Um grupo do Telegram e o seu banco. `fila_votos` e `classificacao`
+    são preenchidos pelo bot (main.py)."""
+
+    def __init__(self, chat_id, principal=False):
+        self.chat_id = chat_id
+        self.principal = principal
+        if principal:
+            self.banco = None       # database.DB_NAME
+            self.arquivo_pendentes = "votos_pendentes.jsonl"
+        else:
+            base, extensao = os.path.splitext(database.DB_NAME)
+            self.banco = f"{base}_{abs(chat_id)}{extensao or '.db'}"
+            self.arquivo_pendentes = f"votos_pendentes_{abs(chat_id)}.jsonl"
+        self.fila_votos = None
+        self.classificacao = None
+
+    def __repr__(self):
+        return f"Grupo({self.chat_id})"
+
+
+def _ids(texto):
+    return [int(i) for i in (texto or "").replace(" ", "").split(",") if i]
+
+
+def grupos_configurados():
+    """Grupos de GROUP_IDS/GROUP_ID, o principal primeiro. Sem nenhum dos
+    dois (ex.: scripts que só mexem no banco), um grupo sem chat_id no
+    banco padrão."""
+    principal = _ids(os.getenv("GROUP_ID"))
+    ids = principal + [i for i in _ids(os.getenv("GROUP_IDS")) if i not in principal]
+    if not ids:
+        return [Grupo(None, principal=True)]
+    return [Grupo(chat_id, principal=(n == 0)) for n, chat_id in enumerate(ids)]
+
+
+def _no_banco(banco, func, args, kwargs):
+    with database.usando_banco(banco):
+        return func(*args, **kwargs)
+
+
+def em_cada_grupo(func, *args, grupos=None, **kwargs):
+    """Roda `func(*args, **kwargs)` no banco de cada grupo, em paralelo.
+    Retorna [(grupo, resultado)] na ordem dos grupos; a primeira exceção
+    é relançada depois que todos terminam."""
+    grupos = grupos or grupos_configurados()
+    if len(grupos) == 1 or getattr(_local, "no_pool", False):
+        # de dentro do próprio pool (ex.: jogos_do_dia que baixa o
+        # calendário), em sequência: não espera por threads ocupadas
+        return [(g, _no_banco(g.banco, func, args, kwargs)) for g in grupos]
+
+    futuros = [_pool.submit(_no_banco, g.banco, func, args, kwargs) for g in grupos]
+    wait(futuros)
+    return [(g, f.result()) for g, f in zip(grupos, futuros)]
@@ -1,5 +1,11 @@
+import asyncio
+import contextvars
+import functools
 import os
 import re
+import secrets
+import time
+from datetime import datetime
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -11,26 +17,159 @@ from telegram.ext import (
     CallbackQueryHandler,
     ContextTypes,
     MessageHandler,
+    PollAnswerHandler,
     filters
 )
 
 from database import (
     create_tables,
     registrar_usuario,
-    registrar_voto,
-    connect
+    buscar_enquete,
+    buscar_enquete_por_poll,
+    buscar_id_usuario,
+    obter_ou_criar_usuario,
+    aquecer_cache_enquetes,
+    banco_atual,
+    epoch_utc,
+    cache_enquetes,
+    cache_usuarios,
+    usando_banco
 )
+from database_async import ler, ler_com_cache, escrever, encerrar
+from cache import CacheLRU
+from criar_enquetes_do_dia import janela_do_dia
+from fila_votos import FilaVotos
+from classificacao import Classificacao
+from agendador import Agendador
+from grupos import em_cada_grupo, grupos_configurados
+from processador import ProcessadorPorUsuario
+import metricas
 
 BOT_TOKEN = os.getenv("BOT_TOKEN")
-GROUP_ID = int(os.getenv("GROUP_ID"))
+
+# Com AGENDADOR=1 o próprio bot cria/fecha as enquetes e busca os resultados
+# (no lugar do cron com os scripts); veja agendador.py
+USAR_AGENDADOR = os.getenv("AGENDADOR") == "1"
+
+# Grupos atendidos (GROUP_IDS/GROUP_ID), cada um com banco, fila de votos
+# e ranking próprios; veja grupos.py
+def _preparar_grupos():
+    grupos = {}
+    for grupo in grupos_configurados():
+        grupo.classificacao = Classificacao(banco=grupo.banco)
+        grupo.fila_votos = FilaVotos(arquivo=grupo.arquivo_pendentes, banco=grupo.banco,
+                                     ao_gravar=grupo.classificacao.alterados)
+        grupos[grupo.chat_id] = grupo
+    return grupos
+
+
+GRUPOS = _preparar_grupos()
+
+# Grupo do update em andamento (definido por `no_grupo`)
+grupo_atual = contextvars.ContextVar("grupo_atual")
+
+# poll_id de enquetes que não são do ranking de nenhum grupo (evita
+# procurar de novo em todos os bancos a cada resposta)
+enquetes_alheias = CacheLRU(max_itens=1024, ttl=600)
+
+agendador = None
+
+# Opções das enquetes na ordem em que são enviadas (criar_enquetes_do_dia)
+OPCOES_ENQUETE = ("V", "M")
+
+# Só os tipos tratados: sem isso o Telegram também manda um update "poll"
+# (contagem nova) a cada voto numa enquete do bot
+ATUALIZACOES = [Update.MESSAGE, Update.CALLBACK_QUERY, Update.POLL_ANSWER]
+
+# Modo webhook: com WEBHOOK_URL (endereço público HTTPS que chega nesta
+# máquina, ex.: via proxy reverso) o bot recebe os updates por POST em vez
+# de long polling
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+WEBHOOK_ESCUTAR = os.getenv("WEBHOOK_ESCUTAR", "0.0.0.0")
+WEBHOOK_PORTA = int(os.getenv("WEBHOOK_PORTA", "8443"))
+WEBHOOK_CAMINHO = os.getenv("WEBHOOK_CAMINHO", "telegram")
+
+# telegram_user_id de quem pode usar /stats (separados por vírgula)
+ADMIN_IDS = {int(i) for i in os.getenv("ADMIN_IDS", "").replace(" ", "").split(",") if i}
+
+
+def _palpites_encerrados(inicio_epoch, encerrada):
+    """True se a enquete já foi fechada ou o jogo já começou."""
+    return bool(encerrada) or (inicio_epoch is not None and time.time() >= inicio_epoch)
+
+
+def _chave(valor):
+    """Chave dos caches de database.py: o banco do grupo + o valor."""
+    return banco_atual(), valor
+
+
+async def _grupo_da_enquete(poll_id):
+    """Grupo dono da enquete: primeiro pelos caches, senão procurando em
+    todos os bancos ao mesmo tempo. None se não é enquete do ranking."""
+    for grupo in GRUPOS.values():
+        with usando_banco(grupo.banco):
+            if cache_enquetes.obter(_chave(poll_id)) is not None:
+                return grupo
+    if enquetes_alheias.obter(poll_id):
+        return None
+
+    async def procurar(grupo):
+        with usando_banco(grupo.banco):
+            return await ler_com_cache(cache_enquetes, _chave(poll_id),
+                                       buscar_enquete_por_poll, poll_id)
+
+    grupos = list(GRUPOS.values())
+    for grupo, row in zip(grupos, await asyncio.gather(*(procurar(g) for g in grupos))):
+        if row:
+            return grupo
+    enquetes_alheias.guardar(poll_id, True)
+    return None
+
+
+async def _grupo_do_update(update):
+    """Grupo de onde veio o update (pelo chat; respostas às enquetes, que
+    não trazem o chat, pelo poll_id). Com um grupo só, é sempre ele."""
+    chat = getattr(update, "effective_chat", None)
+    if chat is not None and chat.id in GRUPOS:
+        return GRUPOS[chat.id]
+    if len(GRUPOS) == 1:
+        return next(iter(GRUPOS.values()))
+    resposta = getattr(update, "poll_answer", None)
+    if resposta is not None:
+        return await _grupo_da_enquete(resposta.poll_id)
+    return None
+
+
+def no_grupo(handler):
+    """Roda o handler no banco do grupo do update (grupo_atual.get() dentro
+    dele). Com vários grupos, comandos fora deles (ex.: no privado) são
+    recusados."""
+    @functools.wraps(handler)
+    async def roteado(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        grupo = await _grupo_do_update(update)
+        if grupo is None:
+            mensagem = getattr(update, "message", None)
+            if mensagem is not None:
+                await mensagem.reply_text("Use este comando no grupo do ranking.")
+            return
+        token = grupo_atual.set(grupo)
+        try:
+            with usando_banco(grupo.banco):
+                return await handler(update, context)
+        finally:
+            grupo_atual.reset(token)
+    return roteado
 
 
 # ----------------------------
 # /start – cria cadastro
 # ----------------------------
+@no_grupo
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.message.from_user
-    registrar_usuario(user.id, user.username or user.first_name)
+    await escrever(registrar_usuario, user.id, user.username or user.first_name)
+    grupo_atual.get().classificacao.invalidar()
 
     await update.message.reply_text(
         "Cadastro concluído! Você agora participa do Ranking Oficial 🏀"
@@ -38,8 +177,43 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 # ----------------------------
-# /votar_X  (X = message_id da enquete)
+# Resposta direta na enquete do grupo (palpite oficial)
 # ----------------------------
+@no_grupo
+async def resposta_enquete(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    resposta = update.poll_answer
+    usuario = resposta.user
+    if usuario is None:
+        # voto em nome de um canal/grupo (sem usuário para o ranking)
+        return
+    grupo = grupo_atual.get()
+
+    row = await ler_com_cache(cache_enquetes, _chave(resposta.poll_id),
+                              buscar_enquete_por_poll, resposta.poll_id)
+    if not row:
+        return      # enquete que não é do ranking
+
+    id_enquete, _, _, inicio_epoch, encerrada = row
+    if _palpites_encerrados(inicio_epoch, encerrada):
+        return
+
+    # quem vota sem ter usado /start é cadastrado aqui mesmo
+    id_usuario = cache_usuarios.obter(_chave(usuario.id))
+    if id_usuario is None:
+        id_usuario = await escrever(obter_ou_criar_usuario, usuario.id,
+                                    usuario.username or usuario.first_name)
+        cache_usuarios.guardar(_chave(usuario.id), id_usuario)
+        grupo.classificacao.alterados((id_usuario,))
+
+    # lista vazia = voto retirado; outra opção = voto trocado
+    escolha = OPCOES_ENQUETE[resposta.option_ids[0]] if resposta.option_ids else None
+    await grupo.fila_votos.responder(id_usuario, id_enquete, escolha)
+
+
+# ----------------------------
+# /votar_X  (X = message_id da enquete; enquetes criadas antes do poll_id)
+# ----------------------------
+@no_grupo
 async def votar(update: Update, context: ContextTypes.DEFAULT_TYPE):
     texto = update.message.text.strip()
 
@@ -52,16 +226,8 @@ async def votar(update: Update, context: ContextTypes.DEFAULT_TYPE):
     message_id_enquete = int(match.group(1))
 
     # Buscar times no banco para montar os botões com nomes
-    conn = connect()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT j.time_visitante, j.time_mandante
-        FROM ENQUETE e
-        JOIN JOGO j ON j.id_jogo = e.id_jogo
-        WHERE e.message_id = ?
-    """, (message_id_enquete,))
-    row = cur.fetchone()
-    conn.close()
+    row = await ler_com_cache(cache_enquetes, _chave(message_id_enquete),
+                              buscar_enquete, message_id_enquete)
 
     if not row:
         await update.message.reply_text(
@@ -69,7 +235,10 @@ async def votar(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
-    visitante, mandante = row
+    _, visitante, mandante, inicio_epoch, encerrada = row
+    if _palpites_encerrados(inicio_epoch, encerrada):
+        await update.message.reply_text("Os palpites para este jogo já estão encerrados.")
+        return
 
     botoes = [
         [InlineKeyboardButton(f"{visitante}", callback_data=f"{message_id_enquete}|V")],
@@ -85,6 +254,7 @@ async def votar(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # ----------------------------
 # Callback do palpite oficial
 # ----------------------------
+@no_grupo
 async def callback_voto(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
@@ -93,45 +263,37 @@ async def callback_voto(update: Update, context: ContextTypes.DEFAULT_TYPE):
     message_id_enquete_str, opcao = data.split("|")
     message_id_enquete = int(message_id_enquete_str)
 
-    # Descobrir id_enquete real + jogo para confirmação
-    conn = connect()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT e.id_enquete,
-               j.time_visitante,
-               j.time_mandante
-        FROM ENQUETE e
-        JOIN JOGO j ON j.id_jogo = e.id_jogo
-        WHERE e.message_id = ?
-    """, (message_id_enquete,))
-    row = cur.fetchone()
+    # Descobrir id_enquete real + jogo para confirmação (em cache, o clique
+    # normalmente não passa pelo banco)
+    row = await ler_com_cache(cache_enquetes, _chave(message_id_enquete),
+                              buscar_enquete, message_id_enquete)
 
     if not row:
-        conn.close()
         await query.edit_message_text(
             "Erro ao localizar a enquete no banco. Tente novamente mais tarde."
         )
         return
 
-    id_enquete, visitante, mandante = row
+    id_enquete, visitante, mandante, inicio_epoch, encerrada = row
+
+    # o cache pode ainda não ter visto o encerramento feito pelo stopper,
+    # mas o horário do jogo basta para recusar palpites atrasados
+    if _palpites_encerrados(inicio_epoch, encerrada):
+        await query.edit_message_text("Os palpites para este jogo já estão encerrados.")
+        return
 
     # verificar se usuário existe
-    cur.execute("""
-        SELECT id_usuario_participante
-        FROM USUARIO_PARTICIPANTE
-        WHERE telegram_user_id = ?
-    """, (query.from_user.id,))
-    row_u = cur.fetchone()
-    conn.close()
-
-    if not row_u:
+    id_usuario = await ler_com_cache(cache_usuarios, _chave(query.from_user.id),
+                                     buscar_id_usuario, query.from_user.id)
+
+    if id_usuario is None:
         await query.edit_message_text("Use /start para criar seu cadastro.")
         return
 
-    id_usuario = row_u[0]
-
-    # registra voto com id_enquete correto
-    registrar_voto(id_usuario, id_enquete, opcao)
+    # enfileira o voto com id_enquete correto (gravado em lote logo em seguida)
+    if not await grupo_atual.get().fila_votos.registrar(id_usuario, id_enquete, opcao):
+        await query.edit_message_text("Você já registrou seu palpite oficial neste jogo.")
+        return
 
     # montar texto de confirmação
     if opcao == "V":
@@ -149,50 +311,167 @@ async def callback_voto(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 # ----------------------------
-# /ranking
+# /ranking [página]
 # ----------------------------
+@no_grupo
 async def ranking(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    conn = connect()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT apelido, pontuacao, frequencia_participacao
-        FROM USUARIO_PARTICIPANTE
-        ORDER BY pontuacao DESC, frequencia_participacao DESC
-    """)
-    linhas = cur.fetchall()
-    conn.close()
-
-    if not linhas:
+    classificacao = grupo_atual.get().classificacao
+    await classificacao.atualizar()
+
+    if not len(classificacao):
         await update.message.reply_text("Ainda não há participantes no ranking.")
         return
 
-    texto = "🏆 RANKING OFICIAL 🏆\n\n"
-    for nome, pts, freq in linhas:
-        texto += f"{nome}: {pts} pontos | {freq} palpites\n"
+    total = classificacao.total_paginas()
+    try:
+        pagina = int(context.args[0]) if context.args else 1
+    except ValueError:
+        pagina = 1
+    pagina = min(max(pagina, 1), total)
+
+    linhas = [
+        f"{pos}. {nome}: {pts} pontos | {freq} palpites"
+        for pos, nome, pts, freq in classificacao.pagina(pagina)
+    ]
+    texto = "🏆 RANKING OFICIAL 🏆\n\n" + "\n".join(linhas)
+    if total > 1:
+        texto += f"\n\nPágina {pagina}/{total} — use /ranking N para ver outras."
 
     await update.message.reply_text(texto)
 
 
 # ----------------------------
-# ENTRYPOINT
+# /meu_rank
 # ----------------------------
-if __name__ == "__main__":
-    create_tables()
+@no_grupo
+async def meu_rank(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    classificacao = grupo_atual.get().classificacao
+    await classificacao.atualizar()
+
+    resultado = classificacao.vizinhanca(update.message.from_user.id)
+    if resultado is None:
+        await update.message.reply_text("Use /start para criar seu cadastro.")
+        return
 
-    app = ApplicationBuilder().token(BOT_TOKEN).build()
+    posicao, vizinhos = resultado
+    linhas = [
+        f"{'👉 ' if pos == posicao else ''}{pos}. {nome}: {pts} pontos | {freq} palpites"
+        for pos, nome, pts, freq in vizinhos
+    ]
+    texto = f"Você está em {posicao}º de {len(classificacao)}.\n\n" + "\n".join(linhas)
 
-    app.add_handler(CommandHandler("start", start))
-    app.add_handler(CommandHandler("ranking", ranking))
+    await update.message.reply_text(texto)
+
+
+# ----------------------------
+# /stats (só administradores)
+# ----------------------------
+async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.message.from_user.id not in ADMIN_IDS:
+        await update.message.reply_text("Comando restrito aos administradores.")
+        return
+
+    if not metricas.ATIVO:
+        await update.message.reply_text("Métricas desligadas (inicie o bot com METRICAS=1).")
+        return
+
+    await update.message.reply_text(metricas.resumo())
+
+
+async def ao_iniciar(app):
+    global agendador
+    inicio_utc, fim_utc = janela_do_dia(datetime.utcnow())
+
+    async def preparar(grupo):
+        # aquece os caches com as enquetes abertas de hoje e seus votantes
+        with usando_banco(grupo.banco):
+            await grupo.fila_votos.iniciar()
+            ids_enquete = await ler(aquecer_cache_enquetes, epoch_utc(inicio_utc), epoch_utc(fim_utc))
+        await grupo.fila_votos.carregar_enquetes(ids_enquete)
+        return len(ids_enquete)
+
+    abertas = await asyncio.gather(*(preparar(g) for g in GRUPOS.values()))
+    print(f"🔥 {sum(abertas)} enquete(s) aberta(s) em cache ({len(GRUPOS)} grupo(s))")
+
+    if USAR_AGENDADOR:
+        agendador = Agendador(app.bot)
+        await agendador.iniciar()
+
+    metricas.iniciar_servidor()
+
+
+async def ao_encerrar(app):
+    if agendador:
+        await agendador.encerrar()
+
+    # grava os votos ainda na fila e espera as escritas pendentes terminarem
+    await asyncio.gather(*(g.fila_votos.encerrar() for g in GRUPOS.values()))
+    encerrar()
+
+    for nome, cache in (("enquetes", cache_enquetes), ("usuarios", cache_usuarios)):
+        e = cache.estatisticas()
+        print(f"📊 cache {nome}: {e['acertos']} acertos, {e['falhas']} falhas "
+              f"({e['taxa_acerto']:.0%}), {e['itens']} itens")
+
+
+def criar_aplicacao(token=BOT_TOKEN, base_url=None, concorrente=True):
+    """Monta o Application com os handlers do bot.
+
+    Updates de usuários diferentes são processados em paralelo; os de um
+    mesmo usuário, em ordem (veja processador.py). concorrente=False volta
+    ao padrão da biblioteca, um update por vez.
+    """
+    construtor = (
+        ApplicationBuilder()
+        .token(token)
+        .concurrent_updates(ProcessadorPorUsuario() if concorrente else False)
+        .post_init(ao_iniciar)
+        .post_shutdown(ao_encerrar)
+    )
+    if base_url:
+        construtor = construtor.base_url(base_url)
+    app = construtor.build()
+
+    # com METRICAS=1 cada handler tem a latência medida (veja metricas.py)
+    medir = metricas.medir_handler
+    app.add_handler(CommandHandler("start", medir(start)))
+    app.add_handler(CommandHandler("ranking", medir(ranking)))
+    app.add_handler(CommandHandler("meu_rank", medir(meu_rank)))
+    app.add_handler(CommandHandler("stats", stats))
 
     # captura qualquer /votar_X ou /votar_X@bot
     app.add_handler(
         MessageHandler(
             filters.Regex(r"^/votar_\d+(@\w+)?$"),
-            votar
+            medir(votar)
         )
     )
 
-    app.add_handler(CallbackQueryHandler(callback_voto))
+    app.add_handler(CallbackQueryHandler(medir(callback_voto)))
+    app.add_handler(PollAnswerHandler(medir(resposta_enquete)))
+    return app
+
+
+# ----------------------------
+# ENTRYPOINT
+# ----------------------------
+if __name__ == "__main__":
+    em_cada_grupo(create_tables)
+    app = criar_aplicacao()
 
     print("🤖 Bot iniciado...")
-    app.run_polling()
+    if WEBHOOK_URL:
+        # o Telegram entrega cada update num POST ao servidor local; o
+        # segredo (sorteado a cada início se não configurado) é conferido
+        # em toda requisição
+        print(f"🌐 Modo webhook em {WEBHOOK_ESCUTAR}:{WEBHOOK_PORTA}/{WEBHOOK_CAMINHO}")
+        app.run_webhook(
+            listen=WEBHOOK_ESCUTAR,
+            port=WEBHOOK_PORTA,
+            url_path=WEBHOOK_CAMINHO,
+            webhook_url=f"{WEBHOOK_URL.rstrip('/')}/{WEBHOOK_CAMINHO}",
+            secret_token=WEBHOOK_SECRET or secrets.token_urlsafe(32),
+            allowed_updates=ATUALIZACOES
+        )
+    else:
+        app.run_polling(allowed_updates=ATUALIZACOES)
@@ -0,0 +1,323 @@
+"""
+Métricas do bot e dos scripts: tempo de cada SQL por local de chamada,
+latência dos handlers, chamadas à API do Telegram e downloads da CDN.
+
+Desligado por padrão. Com METRICAS=1:
+  - o database.py passa a medir cada statement (veja `CursorMedido` e
+    `rastrear_sql`) e o main.py mede cada handler (`medir_handler`);
+  - METRICAS_PORTA=9464 serve as métricas no formato texto do Prometheus
+    em http://<host>:9464/metrics (o bot liga o servidor ao iniciar);
+  - METRICAS_DIR=/caminho grava, no fim de cada processo, um arquivo
+    <script>.prom nesse formato (para os scripts do cron, via textfile
+    collector do node_exporter);
+  - o comando /stats mostra um resumo aos ADMIN_IDS.
+
+Desligado, nada é embrulhado: handlers e cursores são os originais e as
+funções de registro retornam na primeira linha.
+"""
+import atexit
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from sqlite3 import Cursor
+
+ATIVO = os.getenv("METRICAS") == "1"
+PORTA = os.getenv("METRICAS_PORTA")
+PASTA = os.getenv("METRICAS_DIR")
+
+# Limites dos buckets (s) dos histogramas de latência
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_lock = threading.Lock()
+_histogramas = {}      # (nome, rótulos) -> Histograma
+_contadores = {}       # (nome, rótulos) -> valor
+_local = threading.local()
+
+# Descrição de cada métrica (linha # HELP)
+DESCRICOES = {
+    "bot_sql_segundos": "Tempo de execução de cada statement SQL, por local de chamada",
+    "bot_sql_statements_total": "Statements executados pelo SQLite (inclui BEGIN/COMMIT e triggers)",
+    "bot_handler_segundos": "Latência dos handlers do bot",
+    "bot_handler_erros_total": "Handlers que terminaram com exceção",
+    "bot_telegram_chamadas_total": "Chamadas à API do Telegram, por método e resultado",
+    "bot_cdn_segundos": "Tempo dos downloads da CDN da NBA",
+    "bot_cdn_bytes_total": "Bytes baixados da CDN da NBA",
+}
+
+
+class Histograma:
+    def __init__(self):
+        self.contagens = [0] * (len(BUCKETS) + 1)   # o último é +Inf
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        i = 0
+        while i < len(BUCKETS) and valor > BUCKETS[i]:
+            i += 1
+        self.contagens[i] += 1
+        self.soma += valor
+        self.total += 1
+
+    def quantil(self, q):
+        """Estimativa do quantil `q` (interpolação dentro do bucket, como o
+        histogram_quantile do Prometheus)."""
+        if not self.total:
+            return None
+        alvo = q * self.total
+        acumulado = 0
+        for i, n in enumerate(self.contagens):
+            if acumulado + n >= alvo and n:
+                inicio = BUCKETS[i - 1] if i else 0.0
+                fim = BUCKETS[i] if i < len(BUCKETS) else BUCKETS[-1]
+                return inicio + (fim - inicio) * (alvo - acumulado) / n
+            acumulado += n
+        return BUCKETS[-1]
+
+
+def _chave(nome, rotulos):
+    return nome, tuple(sorted(rotulos.items()))
+
+
+def observar(nome, segundos, **rotulos):
+    """Registra uma duração no histograma `nome` com esses rótulos."""
+    if not ATIVO:
+        return
+    chave = _chave(nome, rotulos)
+    with _lock:
+        h = _histogramas.get(chave)
+        if h is None:
+            h = _histogramas[chave] = Histograma()
+        h.observar(segundos)
+
+
+def contar(nome, valor=1, **rotulos):
+    """Soma `valor` ao contador `nome` com esses rótulos."""
+    if not ATIVO:
+        return
+    chave = _chave(nome, rotulos)
+    with _lock:
+        _contadores[chave] = _contadores.get(chave, 0) + valor
+
+
+def limpar():
+    with _lock:
+        _histogramas.clear()
+        _contadores.clear()
+
+
+# ----------------------------
+# SQL
+# ----------------------------
+def _local_chamada(frame):
+    """"modulo.funcao" do primeiro frame fora deste arquivo e do sqlite3."""
+    while frame is not None and frame.f_code.co_filename == __file__:
+        frame = frame.f_back
+    if frame is None:
+        return "?"
+    modulo = os.path.splitext(os.path.basename(frame.f_code.co_filename))[0]
+    return f"{modulo}.{frame.f_code.co_name}"
+
+
+class CursorMedido(Cursor):
+    """Cursor que mede cada execute/executemany e atribui o tempo à função
+    que o chamou (ex.: "database.buscar_enquete")."""
+
+    def execute(self, sql, parametros=()):
+        local = _local_chamada(sys._getframe(1))
+        _local.sql = local
+        t0 = time.perf_counter()
+        try:
+            return super().execute(sql, parametros)
+        finally:
+            observar("bot_sql_segundos", time.perf_counter() - t0, local=local)
+            _local.sql = None
+
+    def executemany(self, sql, sequencia):
+        local = _local_chamada(sys._getframe(1))
+        _local.sql = local
+        t0 = time.perf_counter()
+        try:
+            return super().executemany(sql, sequencia)
+        finally:
+            observar("bot_sql_segundos", time.perf_counter() - t0, local=local)
+            _local.sql = None
+
+
+def rastrear_sql(statement):
+    """Trace callback do sqlite3: chamado a cada statement que o SQLite roda,
+    inclusive os disparados por triggers e o BEGIN/COMMIT das transações."""
+    local = getattr(_local, "sql", None) or _local_chamada(sys._getframe(1))
+    tipo = "trigger" if statement.startswith("--") else statement.split(None, 1)[0].upper()
+    contar("bot_sql_statements_total", local=local, tipo=tipo)
+
+
+def instrumentar_conexao(conn):
+    """Liga a contagem de statements numa conexão (sem efeito se desligado)."""
+    if ATIVO:
+        conn.set_trace_callback(rastrear_sql)
+    return conn
+
+
+def cursor(conn):
+    """Cursor da conexão: medido se as métricas estiverem ligadas."""
+    return conn.cursor(CursorMedido) if ATIVO else conn.cursor()
+
+
+# ----------------------------
+# Handlers
+# ----------------------------
+def medir_handler(handler):
+    """Embrulha um handler async para medir a latência (e contar exceções).
+    Desligado, devolve o próprio handler."""
+    if not ATIVO:
+        return handler
+    nome = handler.__name__
+
+    async def medido(update, context):
+        t0 = time.perf_counter()
+        try:
+            return await handler(update, context)
+        except Exception:
+            contar("bot_handler_erros_total", handler=nome)
+            raise
+        finally:
+            observar("bot_handler_segundos", time.perf_counter() - t0, handler=nome)
+
+    medido.__name__ = nome
+    return medido
+
+
+# ----------------------------
+# Exposição
+# ----------------------------
+def _rotulos(pares, extra=()):
+    pares = list(pares) + list(extra)
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in pares) + "}"
+
+
+def exportar():
+    """Todas as métricas no formato texto do Prometheus."""
+    with _lock:
+        contadores = sorted(_contadores.items())
+        histogramas = sorted((k, (list(h.contagens), h.soma, h.total))
+                             for k, h in _histogramas.items())
+
+    linhas = []
+    vistos = set()
+
+    def cabecalho(nome, tipo):
+        if nome not in vistos:
+            vistos.add(nome)
+            linhas.append(f"# HELP {nome} {DESCRICOES.get(nome, nome)}")
+            linhas.append(f"# TYPE {nome} {tipo}")
+
+    for (nome, rotulos), valor in contadores:
+        cabecalho(nome, "counter")
+        linhas.append(f"{nome}{_rotulos(rotulos)} {valor}")
+
+    for (nome, rotulos), (contagens, soma, total) in histogramas:
+        cabecalho(nome, "histogram")
+        acumulado = 0
+        for limite, n in zip(BUCKETS + ("+Inf",), contagens):
+            acumulado += n
+            linhas.append(f"{nome}_bucket{_rotulos(rotulos, [('le', limite)])} {acumulado}")
+        linhas.append(f"{nome}_sum{_rotulos(rotulos)} {soma:.6f}")
+        linhas.append(f"{nome}_count{_rotulos(rotulos)} {total}")
+
+    return "\n".join(linhas) + "\n"
+
+
+def iniciar_servidor(porta=None, endereco="0.0.0.0"):
+    """Serve /metrics numa thread à parte. Retorna o servidor (ou None se
+    desligado ou sem porta configurada)."""
+    porta = porta if porta is not None else PORTA
+    if not ATIVO or not porta:
+        return None
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            dados = exportar().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(dados)))
+            self.end_headers()
+            self.wfile.write(dados)
+
+    servidor = ThreadingHTTPServer((endereco, int(porta)), Handler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    print(f"📈 Métricas em http://{endereco}:{servidor.server_address[1]}/metrics")
+    return servidor
+
+
+def gravar_arquivo(caminho=None):
+    """Grava as métricas em `caminho` (padrão: METRICAS_DIR/<script>.prom)."""
+    if caminho is None:
+        if not PASTA:
+            return None
+        script = os.path.splitext(os.path.basename(sys.argv[0]))[0]
+        if not script or script.startswith("-"):
+            script = "python"      # python -c / interpretador interativo
+        caminho = os.path.join(PASTA, f"{script}.prom")
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    tmp = caminho + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(exportar())
+    os.replace(tmp, caminho)
+    return caminho
+
+
+def resumo(limite=8):
+    """Texto curto para o /stats: handlers, SQL mais caro, Telegram e CDN."""
+    with _lock:
+        histogramas = {k: (h.quantil(0.5), h.quantil(0.99), h.soma, h.total)
+                       for k, h in _histogramas.items()}
+        contadores = dict(_contadores)
+
+    def ms(s):
+        return f"{s * 1000:.1f}" if s is not None else "-"
+
+    linhas = ["⏱ Handlers (p50 / p99 ms, chamadas)"]
+    for (nome, rotulos), (p50, p99, _, total) in sorted(histogramas.items()):
+        if nome == "bot_handler_segundos":
+            erros = contadores.get(("bot_handler_erros_total", rotulos), 0)
+            linhas.append(f"  {dict(rotulos)['handler']}: {ms(p50)} / {ms(p99)}, {total}"
+                          + (f" ({erros} erros)" if erros else ""))
+
+    sql = sorted(((soma, dict(rotulos)["local"], p50, p99, total)
+                  for (nome, rotulos), (p50, p99, soma, total) in histogramas.items()
+                  if nome == "bot_sql_segundos"), reverse=True)
+    linhas.append(f"\n🗄 SQL por tempo total (top {limite}: total s, p99 ms, execuções)")
+    for soma, local, _, p99, total in sql[:limite]:
+        linhas.append(f"  {local}: {soma:.2f}, {ms(p99)}, {total}")
+
+    telegram = sorted((dict(rotulos), valor) for (nome, rotulos), valor in contadores.items()
+                      if nome == "bot_telegram_chamadas_total")
+    if telegram:
+        linhas.append("\n📨 Telegram")
+        for rotulos, valor in telegram:
+            linhas.append(f"  {rotulos['metodo']} ({rotulos['resultado']}): {valor}")
+
+    cdn = [(dict(rotulos), total, soma) for (nome, rotulos), (_, _, soma, total)
+           in histogramas.items() if nome == "bot_cdn_segundos"]
+    if cdn:
+        linhas.append("\n🌐 CDN (downloads, tempo total s, MB)")
+        for rotulos, total, soma in sorted(cdn, key=lambda c: c[0]["arquivo"]):
+            mb = contadores.get(_chave("bot_cdn_bytes_total", {"arquivo": rotulos["arquivo"]}), 0) / 1e6
+            linhas.append(f"  {rotulos['arquivo']} [{rotulos['resultado']}]: {total}, {soma:.2f}, {mb:.2f}")
+
+    return "\n".join(linhas)
+
+
+if ATIVO and PASTA:
+    atexit.register(gravar_arquivo)
@@ -0,0 +1,139 @@
+"""
+Placar ao vivo: consulta o scoreboard do dia enquanto há jogos e grava cada
+resultado assim que o jogo termina.
+
+Cada consulta (rodada) compara o scoreboard com o da rodada anterior e só
+olha os jogos cujo estado ou placar mudou; dos que mudaram, só os que
+acabaram de terminar (ou tiveram o placar final corrigido) vão para o
+banco. Um scoreboard igual ao anterior (304 da CDN) não escreve nada.
+
+O intervalo até a próxima rodada se adapta ao que está acontecendo:
+  - algum jogo no 4º período ou na prorrogação: INTERVALO_RETA_FINAL;
+  - jogos em andamento, antes disso: INTERVALO_EM_ANDAMENTO;
+  - nenhum ao vivo: dorme até o próximo início (até INTERVALO_OCIOSO);
+  - todos os jogos do dia finalizados: para (None).
+
+O agendador (agendador.py) roda uma rodada por vez, no heap de prazos;
+rodando sozinho (python placar_ao_vivo.py), o laço vai até o fim da rodada
+de jogos do dia.
+"""
+import asyncio
+import calendar
+import time
+from datetime import datetime
+
+import calendario
+from atualizar_resultados import (JOGO_AGENDADO, JOGO_AO_VIVO, JOGO_FINALIZADO, estado_do_jogo,
+                                  gravar_resultados, resultado_do_jogo)
+from get_nba import obter_json_nba
+
+INTERVALO_RETA_FINAL = 10
+INTERVALO_EM_ANDAMENTO = 60
+INTERVALO_OCIOSO = 15 * 60
+
+# Período a partir do qual um jogo pode acabar a qualquer momento
+PERIODO_FINAL = 4
+
+
+def _epoch_inicio(g):
+    """Epoch UTC do início do jogo: do calendário em memória ou, se o jogo
+    não está nele, do gameTimeUTC ("2025-10-21T23:30:00Z"); ou None."""
+    jogo = calendario.indice.jogo(g["gameId"])
+    if jogo is not None:
+        return jogo.inicio_epoch
+    texto = g.get("gameTimeUTC")
+    if not texto:
+        return None
+    return calendar.timegm(datetime.strptime(texto[:19], "%Y-%m-%dT%H:%M:%S").timetuple())
+
+
+def _retrato(g):
+    """O que importa de um jogo para saber se ele mudou."""
+    return (estado_do_jogo(g), g["homeTeam"].get("score"), g["awayTeam"].get("score"),
+            g.get("period"), g.get("gameStatusText"))
+
+
+class PlacarAoVivo:
+    def __init__(self, obter=None, gravar=gravar_resultados):
+        # sem max-age: cada rodada revalida na CDN (304 se nada mudou)
+        self.obter = obter or (lambda: obter_json_nba(max_idade=0))
+        self.gravar = gravar
+        self._anterior = {}         # gameId -> _retrato da última rodada
+        self._gravados = {}         # gameId -> resultado já gravado
+        self.rodadas = 0
+        self.gravacoes = 0
+
+    def mudancas(self, jogos):
+        """Jogos do scoreboard que mudaram desde a rodada anterior."""
+        mudaram = []
+        for g in jogos:
+            retrato = _retrato(g)
+            if self._anterior.get(g["gameId"]) != retrato:
+                self._anterior[g["gameId"]] = retrato
+                mudaram.append(g)
+        return mudaram
+
+    def proximo_intervalo(self, jogos, agora):
+        """Segundos até a próxima rodada, ou None se todos os jogos do dia
+        já terminaram (ou não há jogos)."""
+        estados = [estado_do_jogo(g) for g in jogos]
+        if all(e == JOGO_FINALIZADO for e in estados):
+            return None
+        ao_vivo = [g for g, e in zip(jogos, estados) if e == JOGO_AO_VIVO]
+        if any((g.get("period") or 0) >= PERIODO_FINAL for g in ao_vivo):
+            return INTERVALO_RETA_FINAL
+        if ao_vivo:
+            return INTERVALO_EM_ANDAMENTO
+        # só jogos por começar: acorda no próximo início (jogo atrasado, que
+        # já devia ter começado, é olhado no ritmo dos em andamento)
+        inicios = [_epoch_inicio(g) for g, e in zip(jogos, estados) if e == JOGO_AGENDADO]
+        inicios = [i for i in inicios if i is not None]
+        if not inicios:
+            return INTERVALO_EM_ANDAMENTO
+        espera = min(inicios) - agora
+        return INTERVALO_EM_ANDAMENTO if espera <= 0 else min(espera, INTERVALO_OCIOSO)
+
+    def rodada(self, agora=None):
+        """Uma consulta ao scoreboard: grava os jogos que acabaram de terminar
+        e retorna o intervalo até a próxima (veja proximo_intervalo)."""
+        if agora is None:
+            agora = time.time()
+        self.rodadas += 1
+        jogos = self.obter()["scoreboard"]["games"]
+        if not jogos and any(r[0] != JOGO_FINALIZADO for r in self._anterior.values()):
+            # scoreboard vazio com jogos ainda em aberto: falha na CDN, não
+            # fim da rodada de jogos
+            return INTERVALO_EM_ANDAMENTO
+
+        resultados = []
+        for g in self.mudancas(jogos):
+            resultado = resultado_do_jogo(g)
+            if resultado is not None and self._gravados.get(g["gameId"]) != resultado:
+                resultados.append(resultado)
+
+        if resultados:
+            r, _ = self.gravar(resultados)
+            self.gravacoes += 1
+            for resultado in resultados:
+                self._gravados[resultado[0]] = resultado
+            print(f"🏁 {len(resultados)} jogo(s) finalizado(s): {r['jogos_pontuados']} pontuado(s), "
+                  f"{r['corrigidos']} corrigido(s)")
+
+        return self.proximo_intervalo(jogos, agora)
+
+    async def executar(self):
+        """Rodadas até todos os jogos do dia terminarem (rede e banco fora
+        do event loop)."""
+        while True:
+            intervalo = await asyncio.to_thread(self.rodada)
+            if intervalo is None:
+                print("✅ Todos os jogos do dia finalizados.")
+                return
+            await asyncio.sleep(intervalo)
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(PlacarAoVivo().executar())
+    except KeyboardInterrupt:
+        print("Placar ao vivo encerrado.")
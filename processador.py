@@ -0,0 +1,47 @@
+"""
+Processamento concorrente de updates com ordem por usuário.
+
+Por padrão o python-telegram-bot trata um update de cada vez: um /ranking
+esperando a API do Telegram segura os votos de todo mundo. Com este
+processador updates de usuários diferentes rodam em paralelo, mas os de um
+mesmo usuário continuam em ordem de chegada (dois cliques ou uma troca de
+voto logo depois do voto nunca se atropelam).
+"""
+import asyncio
+
+from telegram.ext import BaseUpdateProcessor
+
+# Updates em andamento ao mesmo tempo (os demais esperam na fila)
+CONCORRENCIA = 256
+
+
+class ProcessadorPorUsuario(BaseUpdateProcessor):
+    def __init__(self, max_concurrent_updates=CONCORRENCIA):
+        super().__init__(max_concurrent_updates)
+        # telegram_user_id -> [lock, updates usando o lock]
+        self._usuarios = {}
+
+    async def do_process_update(self, update, coroutine):
+        usuario = getattr(update, "effective_user", None)
+        if usuario is None:
+            await coroutine
+            return
+
+        item = self._usuarios.get(usuario.id)
+        if item is None:
+            item = self._usuarios[usuario.id] = [asyncio.Lock(), 0]
+        item[1] += 1
+        try:
+            # o lock do asyncio atende em ordem de chegada
+            async with item[0]:
+                await coroutine
+        finally:
+            item[1] -= 1
+            if not item[1]:
+                del self._usuarios[usuario.id]
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
@@ -0,0 +1,140 @@
+"""
+Recupera os resultados de jogos passados que ficaram sem vencedor.
+
+O atualizar_resultados.py e o placar ao vivo só enxergam o scoreboard do
+dia: se o bot ficou fora do ar por uns dias (ou o grupo entrou no meio da
+temporada), os jogos anteriores ficam sem resultado e os votos neles nunca
+pontuam. Aqui:
+  - os jogos sem vencedor no intervalo são lidos do banco de cada grupo (um
+    jogo que falta em vários bancos é baixado uma vez só);
+  - o boxscore de cada um é baixado por um pool de THREADS threads, na
+    sessão HTTP compartilhada do get_nba;
+  - os resultados são gravados em lotes de TAMANHO_LOTE, em todos os
+    bancos, sem pontuar; no fim, uma única pontuação por banco.
+
+Pode ser interrompido e rodado de novo: cada lote gravado já sai da lista
+de "sem resultado", e a pontuação do fim pega também os jogos que uma
+execução anterior gravou e não chegou a pontuar.
+
+Uso:
+    python recuperar_resultados.py                         # últimos 14 dias
+    python recuperar_resultados.py 2025-10-21              # de 21/10 até hoje
+    python recuperar_resultados.py 2025-10-21 2025-11-05 --threads 16
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+
+from atualizar_resultados import resultado_do_jogo
+from calendario import FUSO_LOCAL
+from database import (create_tables, epoch_utc, listar_jogos_sem_resultado,
+                      pontuar_jogos_finalizados, registrar_resultados)
+from get_nba import obter_boxscore
+from grupos import em_cada_grupo
+
+# Downloads simultâneos (no máximo o pool_maxsize da sessão do get_nba)
+THREADS = 8
+
+# Resultados por transação de gravação
+TAMANHO_LOTE = 100
+
+DIAS_PADRAO = 14
+
+
+def janela(inicio, fim):
+    """(inicio_epoch, fim_epoch) das datas locais de `inicio` a `fim`
+    (datetime.date), inclusive."""
+    inicio_local = datetime.combine(inicio, datetime.min.time())
+    fim_local = datetime.combine(fim + timedelta(days=1), datetime.min.time())
+    return epoch_utc(inicio_local - FUSO_LOCAL), epoch_utc(fim_local - FUSO_LOCAL)
+
+
+def jogos_sem_resultado(inicio_epoch, fim_epoch, grupos=None):
+    """gameIds sem vencedor em algum dos bancos, por horário, sem repetir."""
+    inicios = {}
+    for _, linhas in em_cada_grupo(listar_jogos_sem_resultado, inicio_epoch, fim_epoch, grupos=grupos):
+        for game_id, inicio in linhas:
+            inicios.setdefault(game_id, inicio)
+    return sorted(inicios, key=lambda game_id: (inicios[game_id], game_id))
+
+
+def recuperar(inicio_epoch, fim_epoch, threads=THREADS, tamanho_lote=TAMANHO_LOTE,
+              obter=obter_boxscore, grupos=None):
+    """Baixa e grava os resultados dos jogos sem vencedor com início em
+    [inicio_epoch, fim_epoch) (só os que já começaram) e pontua uma vez.
+
+    Retorna {"pendentes", "gravados", "sem_resultado", "falhas",
+    "jogos_pontuados", "segundos"}: "gravados" conta jogos (não linhas em
+    cada banco), "jogos_pontuados" soma os bancos; "sem_resultado" são os
+    que a CDN ainda não dá como finalizados (adiados, em andamento).
+    """
+    t0 = time.perf_counter()
+    fim_epoch = min(fim_epoch, epoch_utc(datetime.utcnow()))
+    pendentes = jogos_sem_resultado(inicio_epoch, fim_epoch, grupos)
+    r = {"pendentes": len(pendentes), "gravados": 0, "sem_resultado": 0, "falhas": 0}
+    lote = []
+
+    def gravar():
+        em_cada_grupo(registrar_resultados, lote, False, grupos=grupos)
+        r["gravados"] += len(lote)
+        lote.clear()
+        print(f"💾 {r['gravados']} resultado(s) gravado(s) de {len(pendentes)} jogo(s)")
+
+    pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="boxscore")
+    try:
+        futuros = {pool.submit(obter, game_id): game_id for game_id in pendentes}
+        for futuro in as_completed(futuros):
+            try:
+                jogo = futuro.result()
+            except Exception as e:
+                r["falhas"] += 1
+                print(f"⚠️ Falha ao baixar o jogo {futuros[futuro]}: {e}")
+                continue
+            resultado = resultado_do_jogo(jogo) if jogo else None
+            if resultado is None:
+                r["sem_resultado"] += 1
+                continue
+            lote.append(resultado)
+            if len(lote) >= tamanho_lote:
+                gravar()
+    finally:
+        # interrompido ou não, o que já chegou fica gravado
+        pool.shutdown(cancel_futures=True)
+        if lote:
+            gravar()
+
+    pontuacao = em_cada_grupo(pontuar_jogos_finalizados, grupos=grupos)
+    r["jogos_pontuados"] = sum(p["jogos_pontuados"] for _, p in pontuacao)
+    r["segundos"] = time.perf_counter() - t0
+    return r
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recupera resultados de jogos passados sem vencedor.")
+    parser.add_argument("inicio", nargs="?", type=date.fromisoformat,
+                        help=f"primeira data local (AAAA-MM-DD; padrão: {DIAS_PADRAO} dias atrás)")
+    parser.add_argument("fim", nargs="?", type=date.fromisoformat,
+                        help="última data local (padrão: hoje)")
+    parser.add_argument("--threads", type=int, default=THREADS,
+                        help=f"downloads simultâneos (padrão: {THREADS})")
+    args = parser.parse_args()
+
+    hoje = (datetime.utcnow() + FUSO_LOCAL).date()
+    fim = args.fim or hoje
+    inicio = args.inicio or fim - timedelta(days=DIAS_PADRAO)
+
+    em_cada_grupo(create_tables)
+    try:
+        r = recuperar(*janela(inicio, fim), threads=args.threads)
+    except KeyboardInterrupt:
+        print("⏸️ Interrompido: o que já foi gravado fica; rode de novo para continuar.")
+    else:
+        vazao = r["pendentes"] / r["segundos"] if r["segundos"] else 0
+        print(
+            f"✅ {inicio:%d/%m} a {fim:%d/%m}: {r['pendentes']} jogo(s) sem resultado, "
+            f"{r['gravados']} gravado(s), {r['sem_resultado']} ainda sem resultado, "
+            f"{r['falhas']} falha(s); {r['jogos_pontuados']} jogo(s) pontuado(s)\n"
+            f"⏱️ {r['segundos']:.1f} s ({vazao:.1f} jogos/s)"
+            + ("\n   Rode de novo para tentar os que falharam." if r["falhas"] else "")
+        )
@@ -1,103 +1,96 @@
 import os
 import asyncio
-import sqlite3
-from datetime import datetime, timedelta, timezone
+from datetime import datetime
 from dotenv import load_dotenv
-from telegram import Bot
+from telegram.error import BadRequest
+
+from database import epoch_utc, listar_enquetes_a_fechar, marcar_enquete_encerrada, usando_banco
+from database_async import escrever
+from envio import Enviador, criar_bot
+from grupos import grupos_configurados
 
 load_dotenv()
 
 BOT_TOKEN = os.getenv("BOT_TOKEN")
-GROUP_ID = int(os.getenv("GROUP_ID"))
-DB_NAME = "nba.db"
 
 # Fechar enquete 10 minutos antes do jogo
 MINUTOS_ANTES = 10
 
+# Até quantas horas à frente listar as enquetes que ainda vão fechar
+HORIZONTE_HORAS = 24
+
+
+async def fechar_enquete(enviador, jogo, chat_id=None):
+    """Fecha uma enquete no Telegram e marca no banco.
+    `jogo` é uma linha de listar_enquetes_a_fechar, lida no banco do grupo
+    `chat_id` (sem ele, o grupo principal).
+
+    Enquete que o Telegram diz já estar fechada (fechada à mão, ou uma
+    nova tentativa depois de um timeout cujo stop_poll tinha chegado)
+    também é marcada: senão ela voltaria a cada revisão, para sempre."""
+    if chat_id is None:
+        chat_id = grupos_configurados()[0].chat_id
+    try:
+        await enviador.enviar(
+            "stop_poll",
+            chat_id=chat_id,
+            message_id=jogo['message_id']
+        )
+    except BadRequest as e:
+        if "poll has already been closed" not in str(e).lower():
+            raise
+        print(f"ℹ️ Enquete {jogo['game_id_nba']} já estava fechada no Telegram")
+    await escrever(marcar_enquete_encerrada, jogo['game_id_nba'])
 
-async def fechar_enquetes_do_dia():
+
+async def fechar_enquetes_do_dia(bot=None, enviador=None):
     """Fecha automaticamente enquetes 10 minutos antes de cada jogo"""
-    bot = Bot(BOT_TOKEN)
-    
-    # Conectar ao banco
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-    
-    # Buscar jogos de hoje com enquetes ainda abertas
-    hoje = datetime.utcnow().date()
+    if enviador is None:
+        enviador = Enviador(bot or criar_bot(BOT_TOKEN))
     
-    cur.execute("""
-        SELECT j.game_id_nba, j.time_visitante, j.time_mandante, 
-               j.data_utc, j.hora_utc, e.message_id, j.enquete_encerrada
-        FROM JOGO j
-        JOIN ENQUETE e ON j.id_jogo = e.id_jogo
-        WHERE j.data_utc = ? 
-          AND j.status = 'scheduled'
-          AND j.enquete_encerrada = 0
-        ORDER BY j.hora_utc
-    """, (hoje.strftime("%Y-%m-%d"),))
-    
-    jogos = cur.fetchall()
+    # Enquetes abertas que fecham nas próximas 24h (ou que já deveriam ter
+    # fechado); o cálculo de horário é todo feito no SQL, em epoch UTC
+    agora = epoch_utc(datetime.utcnow())
+    jogos = []
+    for grupo in grupos_configurados():
+        with usando_banco(grupo.banco):
+            linhas = listar_enquetes_a_fechar(agora, MINUTOS_ANTES * 60, HORIZONTE_HORAS * 3600)
+        jogos.extend((grupo, jogo) for jogo in linhas)
     
     if not jogos:
         print("Nenhuma enquete aberta para fechar hoje.")
         return
     
-    agora_utc = datetime.utcnow()
-    enquetes_fechadas = 0
-    
-    for jogo in jogos:
-        game_id = jogo['game_id_nba']
-        visitante = jogo['time_visitante']
-        mandante = jogo['time_mandante']
-        data_utc = jogo['data_utc']
-        hora_utc = jogo['hora_utc']
-        message_id = jogo['message_id']
-        
-        # Criar datetime do jogo
-        jogo_datetime_str = f"{data_utc} {hora_utc}"
+    async def fechar(grupo, jogo):
         try:
-            jogo_dt = datetime.strptime(jogo_datetime_str, "%Y-%m-%d %H:%M:%S")
-        except ValueError:
-            print(f"Erro ao parsear data/hora do jogo {game_id}")
-            continue
-        
-        # Calcular quando fechar (10 minutos antes)
-        fechar_em = jogo_dt - timedelta(minutes=MINUTOS_ANTES)
+            # Fechar a enquete no Telegram e marcar como encerrada no banco
+            with usando_banco(grupo.banco):
+                await fechar_enquete(enviador, jogo, grupo.chat_id)
+
+            print(f"✅ Enquete fechada: {jogo['time_visitante']} x {jogo['time_mandante']} "
+                  f"(Jogo às {jogo['hora_utc']} UTC)")
+            return True
+        except Exception as e:
+            print(f"❌ Erro ao fechar enquete {jogo['game_id_nba']}: {e}")
+            return False
+
+    a_fechar = []
+    for grupo, jogo in jogos:
+        segundos_para_fechar = jogo['segundos_para_fechar']
         
         # Se já passou do horário de fechar
-        if agora_utc >= fechar_em:
-            try:
-                # Fechar a enquete no Telegram
-                await bot.stop_poll(
-                    chat_id=GROUP_ID,
-                    message_id=message_id
-                )
-                
-                # Marcar como encerrada no banco
-                cur.execute("""
-                    UPDATE JOGO
-                    SET enquete_encerrada = 1
-                    WHERE game_id_nba = ?
-                """, (game_id,))
-                
-                print(f"✅ Enquete fechada: {visitante} x {mandante} (Jogo às {hora_utc} UTC)")
-                enquetes_fechadas += 1
-                
-            except Exception as e:
-                print(f"❌ Erro ao fechar enquete {game_id}: {e}")
+        if segundos_para_fechar <= 0:
+            a_fechar.append(fechar(grupo, jogo))
         else:
             # Calcular quanto tempo até fechar
-            tempo_restante = fechar_em - agora_utc
-            horas, resto = divmod(tempo_restante.seconds, 3600)
+            horas, resto = divmod(segundos_para_fechar, 3600)
             minutos, segundos = divmod(resto, 60)
             
-            print(f"⏳ {visitante} x {mandante}: Fecha em {horas}h{minutos}m (Jogo às {hora_utc} UTC)")
-    
-    conn.commit()
-    conn.close()
+            print(f"⏳ {jogo['time_visitante']} x {jogo['time_mandante']}: Fecha em {horas}h{minutos}m "
+                  f"(Jogo às {jogo['hora_utc']} UTC)")
     
+    # fecha todas as vencidas em paralelo, dentro dos limites do Telegram
+    enquetes_fechadas = sum(await asyncio.gather(*a_fechar))
     if enquetes_fechadas > 0:
         print(f"\n🎯 Total de enquetes fechadas: {enquetes_fechadas}")
 
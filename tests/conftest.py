@@ -0,0 +1,42 @@
+"""
+Fixtures dos testes. Cada teste roda num banco novo dentro do tmp_path, com
+o calendário em memória vazio e o cache HTTP do get_nba no tmp_path: nada
+toca o nba.db nem a rede (a CDN e a API do Telegram são servidores locais
+do apoio_bench).
+"""
+import pytest
+
+import calendario
+import database
+import get_nba
+from apoio_bench import banco_temporario, grupo_unico, importar_main
+from fila_votos import FilaVotos
+
+
+@pytest.fixture(autouse=True)
+def isolamento(tmp_path, monkeypatch):
+    monkeypatch.setattr(calendario, "indice", calendario.IndiceCalendario())
+    monkeypatch.setattr(get_nba, "PASTA_CACHE", str(tmp_path / "cache_nba"))
+
+
+@pytest.fixture
+def banco(tmp_path, monkeypatch):
+    """Banco novo com o schema completo; devolve o caminho."""
+    monkeypatch.setattr(database, "DB_NAME", database.DB_NAME)
+    caminho = banco_temporario(str(tmp_path))
+    yield caminho
+    database.fechar_conexao()
+
+
+@pytest.fixture
+def main():
+    return importar_main()
+
+
+@pytest.fixture
+def fila(main, banco, tmp_path, monkeypatch):
+    """Fila de votos do grupo único do main.py, com o arquivo no tmp_path.
+    O teste chama iniciar()/encerrar() dentro do seu event loop."""
+    fila = FilaVotos(arquivo=str(tmp_path / "pendentes.jsonl"))
+    monkeypatch.setattr(grupo_unico(main), "fila_votos", fila)
+    return fila
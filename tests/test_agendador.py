@@ -0,0 +1,144 @@
+import asyncio
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+from io import StringIO
+
+import pytest
+from telegram.error import BadRequest
+
+import calendario
+import database
+import database_async
+from apoio_bench import BotFalso, popular
+
+
+def test_fecha_no_prazo_e_so_consulta_o_placar_com_jogo_pendente(main, banco):
+    from agendador import Agendador
+    n_jogos, antecedencia = 2, 600
+    popular(10, n_jogos + 1)
+    agora = int(time.time())
+    prazos = {}
+    with database.transacao() as cur:
+        # enquetes fechando daqui a 1..n s; o último jogo começou há 2h e
+        # ainda espera o resultado
+        for i in range(n_jogos):
+            cur.execute("UPDATE JOGO SET inicio_epoch = ? WHERE id_jogo = ?",
+                        (agora + antecedencia + 1 + i, i + 1))
+            prazos[10_000 + i] = agora + 1 + i
+        cur.execute("UPDATE JOGO SET inicio_epoch = ?, enquete_encerrada = 1 WHERE id_jogo = ?",
+                    (agora - 2 * 3600 - 5, n_jogos + 1))
+
+    consultas_placar = []
+
+    def scoreboard_falso():
+        consultas_placar.append(time.time())
+        return {"scoreboard": {"games": [{
+            "gameId": f"00224{n_jogos:05d}", "gameStatus": 3, "gameStatusText": "Final",
+            "homeTeam": {"score": 110}, "awayTeam": {"score": 100}}]}}
+
+    bot = BotFalso()
+
+    async def rodar():
+        agendador = Agendador(bot, hora_enquetes="23:59", antecedencia=antecedencia)
+        agendador.placar.obter = scoreboard_falso
+        await agendador.iniciar()
+        await asyncio.sleep(n_jogos + 1.5)
+        await agendador.encerrar()
+
+    with redirect_stdout(StringIO()):
+        asyncio.run(rodar())
+
+    atrasos = [t - prazos[kw["message_id"]] for metodo, t, kw in bot.chamadas if metodo == "stop_poll"]
+    assert len(atrasos) == n_jogos
+    assert max(atrasos) < 1, "enquete fechada fora do prazo"
+    assert len(consultas_placar) == 1, "placar consultado sem jogo pendente"
+
+
+class BotComEnquetesFechadas(BotFalso):
+    """stop_poll responde com o BadRequest `erro`, como o Telegram."""
+
+    def __init__(self, erro):
+        super().__init__()
+        self.erro = erro
+
+    async def stop_poll(self, **kwargs):
+        self.chamadas.append(("stop_poll", time.time(), kwargs))
+        raise BadRequest(self.erro)
+
+
+@pytest.mark.parametrize("erro, encerrada", [
+    ("Poll has already been closed", 1),
+    ("Message to stop poll not found", 0),
+])
+def test_enquete_ja_fechada_no_telegram(main, banco, erro, encerrada):
+    from agendador import Agendador
+    popular(1, 1)
+    with database.transacao() as cur:
+        cur.execute("UPDATE JOGO SET inicio_epoch = ?", (int(time.time()) - 60,))
+    bot = BotComEnquetesFechadas(erro)
+
+    async def rodar():
+        agendador = Agendador(bot)
+        await agendador._fechar()
+        await agendador._fechar()       # 2ª revisão: só tenta de novo se não marcou
+
+    with redirect_stdout(StringIO()):
+        asyncio.run(rodar())
+
+    with database.transacao(escrita=False) as cur:
+        cur.execute("SELECT enquete_encerrada FROM JOGO")
+        assert cur.fetchone()[0] == encerrada
+    assert len(bot.chamadas) == (1 if encerrada else 2)
+
+
+def test_criacao_na_virada_do_dia(main, banco, monkeypatch):
+    """A janela do dia começa às 00h e vai até as 02h de amanhã: o jogo das
+    00h30 de hoje já ganhou enquete ontem. A criação de hoje tem que ver o
+    grupo como pendente (falta o jogo da noite) e publicar só esse jogo."""
+    import criar_enquetes_do_dia
+    from agendador import Agendador
+    from criar_enquetes_do_dia import janela_do_dia
+    from grupos import Grupo
+
+    popular(1, 3)
+    agora_utc = datetime.utcnow()
+    agora = database.epoch_utc(agora_utc)
+    inicio, fim = (database.epoch_utc(t) for t in janela_do_dia(agora_utc))
+    madrugada, noite = inicio + 30 * 60, (agora + fim) // 2
+    with database.transacao() as cur:
+        # jogo 1: madrugada, com a enquete de ontem; jogo 2: hoje à noite,
+        # sem enquete; jogo 3: amanhã (o calendário cobre a janela)
+        for id_jogo, inicio_epoch in ((1, madrugada), (2, noite), (3, fim + 86400)):
+            cur.execute("""
+                UPDATE JOGO SET inicio_epoch = ?1, data_utc = date(?1, 'unixepoch'),
+                                hora_utc = time(?1, 'unixepoch')
+                WHERE id_jogo = ?2
+            """, (inicio_epoch, id_jogo))
+        cur.execute("DELETE FROM ENQUETE WHERE id_jogo IN (2, 3)")
+
+    # o calendário do banco cobre a janela: nada de baixar da CDN
+    sincronizacoes = []
+    monkeypatch.setattr(criar_enquetes_do_dia, "atualizar_calendario", lambda: sincronizacoes.append(1))
+    bot = BotFalso()
+
+    async def rodar():
+        agendador = Agendador(bot)
+        agendador.grupos = [Grupo(None, principal=True)]
+        await database_async.ler(calendario.carregar_do_banco)     # como no iniciar()
+        pendentes = await agendador._grupos_sem_enquetes(datetime.utcnow())
+        await agendador._criar()
+        await agendador._criar()       # 2ª vez: nada mais a criar
+        return pendentes, await agendador._grupos_sem_enquetes(datetime.utcnow())
+
+    with redirect_stdout(StringIO()):
+        antes, depois = asyncio.run(rodar())
+
+    enquetes = [kw["question"] for metodo, _, kw in bot.chamadas if metodo == "send_poll"]
+    with database.transacao(escrita=False) as cur:
+        cur.execute("SELECT id_jogo, COUNT(*) FROM ENQUETE GROUP BY id_jogo ORDER BY id_jogo")
+        por_jogo = cur.fetchall()
+    assert not sincronizacoes, "calendário baixado com a janela coberta"
+    assert len(antes) == 1 and not depois
+    assert len(enquetes) == 1
+    assert por_jogo == [(1, 1), (2, 1)]
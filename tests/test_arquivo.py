@@ -0,0 +1,105 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytest
+
+import arquivo
+import database
+
+TEMPORADAS = (2022, 2023, 2024)
+ATUAL = TEMPORADAS[-1]
+N_JOGOS, N_USUARIOS = 20, 50
+
+
+def _game_id(temporada, i):
+    return f"002{temporada % 100:02d}{i:05d}"
+
+
+@pytest.fixture
+def temporadas(banco):
+    """Três temporadas de jogos pontuados; a atual só com metade apurada."""
+    rnd = random.Random(20)
+    with database.transacao() as cur:
+        cur.executemany("INSERT INTO USUARIO_PARTICIPANTE (telegram_user_id, apelido) VALUES (?, ?)",
+                        [(1000 + i, f"user{i}") for i in range(N_USUARIOS)])
+        for temporada in TEMPORADAS:
+            inicio = int(datetime(temporada, 10, 20).timestamp())
+            cur.executemany("""
+                INSERT INTO JOGO (game_id_nba, time_mandante, time_visitante, data_utc,
+                                  hora_utc, inicio_epoch, vencedor)
+                VALUES (?, 'Home Team', 'Away Team', '2025-01-01', '00:00:00', ?, ?)
+            """, [(_game_id(temporada, i), inicio + i * 20_000,
+                   rnd.choice("MV") if temporada < ATUAL or i < N_JOGOS // 2 else None)
+                  for i in range(N_JOGOS)])
+        cur.execute("INSERT INTO ENQUETE (id_jogo, message_id) SELECT id_jogo, id_jogo FROM JOGO")
+        cur.execute("SELECT id_enquete FROM ENQUETE")
+        enquetes = [r[0] for r in cur.fetchall()]
+        cur.executemany("""
+            INSERT INTO VOTO (id_usuario_participante, id_enquete, escolha, data_hora)
+            VALUES (?, ?, ?, '2025-01-01T00:00:00')
+        """, [(uid, e, rnd.choice("MV")) for e in enquetes
+              for uid in range(1, N_USUARIOS + 1) if rnd.random() < 0.5])
+    database.pontuar_jogos_finalizados()
+    # os votos entraram direto no VOTO, sem passar pela contagem incremental
+    database.reconstruir_estatisticas()
+
+
+def _estatisticas():
+    return database.obter_conexao().execute("SELECT * FROM ESTATISTICA_USUARIO ORDER BY 1, 2").fetchall()
+
+
+def _arquivar_encerradas():
+    for temporada in arquivo.temporadas_encerradas():
+        arquivo.arquivar_temporada(temporada)
+
+
+def test_nao_arquiva_a_temporada_atual(temporadas):
+    with pytest.raises(ValueError, match="temporada atual"):
+        arquivo.arquivar_temporada(ATUAL)
+    assert not database.temporadas_arquivadas()
+
+
+def test_ranking_e_estatisticas_iguais_depois_de_arquivar(temporadas):
+    ranking, estatisticas = database.listar_ranking(), _estatisticas()
+
+    _arquivar_encerradas()
+    arquivo.compactar()
+
+    assert database.temporadas_arquivadas() == set(TEMPORADAS[:-1])
+    assert database.listar_ranking() == ranking
+    assert _estatisticas() == estatisticas
+    assert not database.verificar_estatisticas()
+
+
+def test_conexao_aberta_antes_ve_os_arquivos(temporadas):
+    # conexão de longa duração de outra thread, como a do bot
+    with ThreadPoolExecutor(max_workers=1) as outra:
+        ranking = outra.submit(database.listar_ranking).result()
+        _arquivar_encerradas()
+        try:
+            assert outra.submit(database.listar_ranking).result() == ranking
+            assert not outra.submit(database.verificar_estatisticas).result()
+            outra.submit(database.recalcular_pontuacao).result()
+            assert database.listar_ranking() == ranking
+        finally:
+            outra.submit(database.fechar_conexao).result()
+
+
+def test_pontua_e_recalcula_depois_de_arquivar(temporadas):
+    _arquivar_encerradas()
+
+    database.registrar_resultados([(_game_id(ATUAL, N_JOGOS // 2), "M", 100, 90)])
+    assert not database.verificar_estatisticas()
+
+    ranking = database.listar_ranking()
+    database.recalcular_pontuacao()
+    assert database.listar_ranking() == ranking
+    assert not database.verificar_estatisticas()
+
+
+def test_calendario_nao_traz_de_volta_jogos_arquivados(temporadas):
+    _arquivar_encerradas()
+    r = database.sincronizar_jogos([(_game_id(TEMPORADAS[0], 1), "Home Team", "Away Team",
+                                     "2020-01-01", "00:00:00", "Final", "", "", "")])
+    assert r["inseridos"] == 0
@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+import busca
+import database
+from apoio_bench import SQL_BUSCA_ANTIGA, popular
+
+SILABAS = ["ma", "ri", "jo", "ao", "lu", "ca", "pe", "dro", "ana", "bel", "gui", "fer",
+           "nan", "da", "ra", "fa", "el", "the", "ko", "be", "kd", "lebron", "curry"]
+
+
+def _apelidos(n, semente=19):
+    rnd = random.Random(semente)
+    return ["".join(rnd.choice(SILABAS) for _ in range(rnd.randint(2, 4))) + str(rnd.randrange(100))
+            for _ in range(n)]
+
+
+APELIDOS = _apelidos(3000)
+
+
+@pytest.fixture
+def usuarios(banco):
+    with database.transacao() as cur:
+        cur.executemany("INSERT INTO USUARIO_PARTICIPANTE (telegram_user_id, apelido) VALUES (?, ?)",
+                        [(1000 + i, a) for i, a in enumerate(APELIDOS)])
+
+
+def _ids(campo, termo):
+    return {linha[0] for linha in busca.buscar(campo, termo, limite=None)}
+
+
+def test_igual_ao_like(usuarios):
+    conn = database.obter_conexao()
+    termos = ([a[1:5] for a in APELIDOS[:20]] + [a[-5:] for a in APELIDOS[20:40]]
+              + [s[:2] for s in SILABAS] + ["LeBr", "zzz", "a"])
+    for termo in termos:
+        esperado = conn.execute(SQL_BUSCA_ANTIGA, (f"%{termo}%",)).fetchall()
+        assert sorted(busca.buscar("apelido", termo, limite=None)) == sorted(esperado), termo
+
+
+def test_prefixo(usuarios):
+    for termo in (a[:4] for a in APELIDOS[:20]):
+        linhas = busca.buscar("apelido", termo, modo="prefixo")
+        assert linhas and all(APELIDOS[linha[0] - 1].startswith(termo) for linha in linhas), termo
+
+
+def test_triggers_acompanham_apelido_e_times(usuarios):
+    with database.transacao() as cur:
+        cur.execute("INSERT INTO USUARIO_PARTICIPANTE (telegram_user_id, apelido) VALUES (1, 'Zé Wemby')")
+        novo = cur.lastrowid
+    assert _ids("apelido", "wemb") == {novo}
+
+    with database.transacao() as cur:
+        cur.execute("UPDATE USUARIO_PARTICIPANTE SET apelido = 'Chef Curry' WHERE id_usuario_participante = ?",
+                    (novo,))
+    assert _ids("apelido", "wemb") == set()
+    assert novo in _ids("apelido", "chef cur")
+
+    with database.transacao() as cur:
+        cur.execute("DELETE FROM USUARIO_PARTICIPANTE WHERE id_usuario_participante = ?", (novo,))
+    assert novo not in _ids("apelido", "chef cur")
+
+    popular(0, 3)
+    with database.transacao() as cur:
+        cur.execute("UPDATE JOGO SET time_visitante = 'Oklahoma City Thunder' WHERE id_jogo = 2")
+    assert _ids("time", "thunder") == {2}
+    assert _ids("time_mandante", "thunder") == set()
+    assert _ids("time", "home t") == {1, 2, 3}
+
+
+def test_migracao_reindexa_o_que_foi_inserido_sem_trigger(usuarios):
+    conn = database.obter_conexao()
+    conn.execute("DROP TRIGGER busca_usuario_inserir")
+    with database.transacao() as cur:
+        cur.execute("INSERT INTO USUARIO_PARTICIPANTE (telegram_user_id, apelido) VALUES (1, 'Zé Wemby')")
+        novo = cur.lastrowid
+    assert _ids("apelido", "wemb") == set()
+    # a migração 10 é idempotente: recria o trigger e indexa o que faltou
+    with database.transacao() as cur:
+        database._migracao_10(cur)
+    assert _ids("apelido", "wemb") == {novo}
@@ -0,0 +1,45 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import database
+from apoio_bench import grupo_unico, popular, query_voto
+from fila_votos import FilaVotos
+
+
+def test_clique_com_cache_nao_vai_ao_banco(main, banco, tmp_path, monkeypatch):
+    popular(100, 2)
+    agora = int(time.time())
+    with database.transacao() as cur:
+        cur.execute("UPDATE JOGO SET inicio_epoch = ?", (agora + 3600,))
+    # grava só no encerramento, para não misturar gravações na contagem
+    fila = FilaVotos(arquivo=str(tmp_path / "pendentes.jsonl"), intervalo_ms=60_000, lote_maximo=10 ** 9)
+    monkeypatch.setattr(grupo_unico(main), "fila_votos", fila)
+
+    transacoes = []
+    transacao = database.transacao
+
+    def transacao_contada(*args, **kwargs):
+        transacoes.append(args)
+        return transacao(*args, **kwargs)
+
+    async def clicar(message_id):
+        for uid in range(100):
+            await main.callback_voto(SimpleNamespace(callback_query=query_voto(1000 + uid, message_id)), None)
+
+    async def rodar():
+        await fila.iniciar()
+        # como na inicialização do bot: enquetes abertas e seus votantes
+        ids = database.aquecer_cache_enquetes(agora, agora + 7200)
+        await fila.carregar_enquetes(ids)
+        await clicar(10_000)          # primeiro clique de cada um: cadastro no cache
+        monkeypatch.setattr(database, "transacao", transacao_contada)
+        await clicar(10_001)
+        monkeypatch.setattr(database, "transacao", transacao)
+        await fila.encerrar()
+
+    asyncio.run(rodar())
+    assert not transacoes, "clique em cache foi ao banco"
+    with database.transacao(escrita=False) as cur:
+        cur.execute("SELECT COUNT(*) FROM VOTO")
+        assert cur.fetchone()[0] == 200
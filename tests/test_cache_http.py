@@ -0,0 +1,46 @@
+import json
+from contextlib import redirect_stdout
+from io import StringIO
+
+import pytest
+
+import get_nba
+from apoio_bench import ServidorCDN, calendario_sintetico
+
+
+@pytest.fixture
+def cdn(monkeypatch):
+    cdn = ServidorCDN({"/schedule.json": {"leagueSchedule": {"gameDates": calendario_sintetico(50)}}})
+    monkeypatch.setattr(get_nba, "URL_TEMPORADA", cdn.url + "/schedule.json")
+    yield cdn
+    cdn.parar()
+
+
+def test_revalida_com_304(cdn, monkeypatch):
+    monkeypatch.setattr(get_nba, "MAX_IDADE_CALENDARIO", 0)
+    for _ in range(3):
+        datas = get_nba.obter_calendario_completo()
+    requisicoes, _, enviados = cdn.contadores()
+    # um download e duas revalidações sem corpo
+    assert requisicoes == 3
+    assert enviados == len(json.dumps(cdn.arquivos["/schedule.json"]))
+    assert len(datas) == len(cdn.arquivos["/schedule.json"]["leagueSchedule"]["gameDates"])
+
+
+def test_cache_fresco_nao_vai_a_rede(cdn, monkeypatch):
+    get_nba.obter_calendario_completo()
+    monkeypatch.setattr(get_nba, "MAX_IDADE_CALENDARIO", 3600)
+    requisicoes = cdn.requisicoes
+    get_nba.obter_calendario_completo()
+    jogos, erros = get_nba.obter_jogos_temporada()
+    assert cdn.requisicoes == requisicoes
+    assert len(jogos) == 50 and not erros
+
+
+def test_cdn_fora_do_ar_serve_o_cache_vencido(cdn, monkeypatch):
+    get_nba.obter_calendario_completo()
+    monkeypatch.setattr(get_nba, "MAX_IDADE_CALENDARIO", 0)
+    cdn.falhar = True
+    with redirect_stdout(StringIO()):
+        datas = get_nba.obter_calendario_completo()
+    assert len(datas) == 5
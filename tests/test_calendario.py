@@ -0,0 +1,116 @@
+import json
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+import calendario
+import database
+import get_nba
+from apoio_bench import calendario_da_cdn, jogos_do_dia_antigo, salvar_calendario
+from criar_enquetes_do_dia import janela_do_dia
+
+N_JOGOS = 300
+
+
+@pytest.fixture(scope="module")
+def datas():
+    return calendario_da_cdn(N_JOGOS)
+
+
+@pytest.fixture
+def arquivo_calendario(tmp_path, datas):
+    caminho = str(tmp_path / "scheduleLeagueV2_1.json")
+    salvar_calendario(caminho, datas)
+    return caminho
+
+
+def _compactos(datas):
+    return list(get_nba.compactar_jogos(j for dia in datas for j in dia["games"]))
+
+
+# -------------------------------
+# Leitura em fluxo (get_nba.jogos_da_temporada)
+# -------------------------------
+def test_fluxo_igual_a_arvore(arquivo_calendario):
+    with open(arquivo_calendario, "rb") as f:
+        esperado = _compactos(json.loads(f.read())["leagueSchedule"]["gameDates"])
+    assert len(esperado) == N_JOGOS
+    assert list(get_nba.jogos_da_temporada(arquivo_calendario)) == esperado
+    # blocos pequenos (e primos): os cortes caem no meio de chaves, strings e números
+    assert list(get_nba.compactar_jogos(get_nba.iterar_jogos(arquivo_calendario, tamanho_bloco=1009))) \
+        == esperado
+
+
+@pytest.mark.parametrize("sobra", [0.5, 0.99])
+def test_arquivo_truncado_e_recusado(arquivo_calendario, sobra):
+    with open(arquivo_calendario, "rb") as f:
+        corpo = f.read()
+    with open(arquivo_calendario, "wb") as f:
+        f.write(corpo[:int(len(corpo) * sobra)])
+    with pytest.raises(ValueError):
+        list(get_nba.jogos_da_temporada(arquivo_calendario))
+
+
+# -------------------------------
+# calendario.IndiceCalendario
+# -------------------------------
+@pytest.fixture
+def indice(datas):
+    indice = calendario.IndiceCalendario()
+    indice.atualizar(_compactos(datas))
+    return indice
+
+
+def _data_local(jogo):
+    return (datetime.fromisoformat(jogo["gameDateTimeUTC"].replace("Z", "")) + calendario.FUSO_LOCAL).date()
+
+
+def _todas_datas(datas):
+    return sorted({_data_local(j) for dia in datas for j in dia["games"]})
+
+
+def test_consultas_iguais_a_varredura(datas, indice):
+    jogos = [j for dia in datas for j in dia["games"]]
+    for data in _todas_datas(datas):
+        assert [j.game_id for j in indice.jogos_da_data(data)] == \
+            [j["gameId"] for j in jogos if _data_local(j) == data], data
+    for jogo in jogos:
+        assert indice.jogo(jogo["gameId"]).game_id == jogo["gameId"]
+
+
+def test_janela_do_dia_igual_a_regra_antiga(datas, indice):
+    # a janela do dia (00h–02h do dia seguinte)
+    for data in _todas_datas(datas):
+        agora = datetime.combine(data, datetime.min.time()) + timedelta(hours=15)
+        inicio_utc, fim_utc = janela_do_dia(agora)
+        esperado = sorted(j["gameId"] for j, _ in jogos_do_dia_antigo(datas, agora))
+        obtido = sorted(j.game_id for j in indice.jogos_entre(database.epoch_utc(inicio_utc),
+                                                                 database.epoch_utc(fim_utc)))
+        assert obtido == esperado, data
+
+
+def test_cobre_ate_o_ultimo_jogo(datas, indice):
+    ultimo = max(indice.jogo(c[0]).inicio_epoch for c in _compactos(datas))
+    assert indice.cobre(ultimo)
+    assert not indice.cobre(ultimo + 1)
+
+
+def test_atualizar_so_mexe_nos_remarcados(datas, indice):
+    rnd = random.Random(23)
+    compactos = _compactos(datas)
+    remarcados = []
+    for k in rnd.sample(range(len(compactos)), 5):
+        c = list(compactos[k])
+        c[4] = "02:30:00" if c[4] != "02:30:00" else "03:30:00"
+        compactos[k] = tuple(c)
+        remarcados.append(c[0])
+
+    assert indice.atualizar(compactos, completo=True) == set(remarcados)
+
+    refeito = calendario.IndiceCalendario()
+    refeito.atualizar(compactos)
+    for data in _todas_datas(datas) + [indice.data_local(refeito.jogo(g).inicio_epoch) for g in remarcados]:
+        assert indice.jogos_da_data(data) == refeito.jogos_da_data(data), data
+    # calendário igual não mexe no índice
+    assert not indice.atualizar(compactos)
@@ -0,0 +1,47 @@
+import asyncio
+import os
+from contextlib import redirect_stdout
+from io import StringIO
+
+from telegram import Bot
+from telegram.request import HTTPXRequest
+
+from apoio_bench import ServidorBotAPI, popular
+
+ESCALA = 60     # o relógio do limite de flood roda 60x mais rápido
+
+
+def _jogos(n):
+    return [{
+        "id_jogo": i + 1, "game_id": f"00224{i:05d}", "mandante": "Home Team",
+        "visitante": "Away Team", "sigla_mandante": "HOM", "sigla_visitante": "AWY",
+        "canal": None, "inicio_epoch": 0, "hora_local": f"{20 + i // 4}h{(i % 4) * 15:02d}",
+    } for i in range(n)]
+
+
+def test_criacao_passa_do_limite_do_grupo_sem_perder_nada(main, banco):
+    import criar_enquetes_do_dia
+    from envio import JANELA_CHAT, Enviador
+
+    jogos = _jogos(25)
+    popular(10, len(jogos))
+    api = ServidorBotAPI(latencia=0.25 / ESCALA, janela_chat=60 / ESCALA)
+
+    async def rodar():
+        bot = Bot("123:teste", base_url=api.url + "/bot", request=HTTPXRequest(connection_pool_size=16))
+        async with bot:
+            enviador = Enviador(bot, janela_chat=JANELA_CHAT / ESCALA)
+            await criar_enquetes_do_dia.criar_enquetes(jogos=jogos, enviador=enviador)
+            return enviador.falhas
+
+    try:
+        with redirect_stdout(StringIO()):
+            falhas = asyncio.run(rodar())
+    finally:
+        api.parar()
+
+    enquetes = [p for metodo, chat, p, _ in api.aceitas if metodo == "sendPoll"]
+    assert falhas == 0
+    assert len(enquetes) == len(jogos)
+    assert {chat for _, chat, _, _ in api.aceitas} == {int(os.environ["GROUP_ID"])}
+    assert len(api.aceitas) > api.por_chat, "o cenário deveria passar do limite de 20 mensagens/min"
@@ -0,0 +1,63 @@
+import random
+
+import pytest
+
+import consultas
+import database
+from apoio_bench import SQL_AGRUPAMENTO_ANTIGO, SQL_JOIN_COMPLEXO_ANTIGO, popular
+
+N_USUARIOS, N_JOGOS = 300, 10
+
+
+def _game_id(i):
+    return f"{'00224' if i < N_JOGOS // 2 else '00225'}{i:05d}"
+
+
+@pytest.fixture
+def palpites(banco):
+    """Jogos de hora em hora, metade na temporada seguinte, com votos
+    gravados pelo caminho do bot (registrar_palpites, em lotes como a fila)."""
+    rnd = random.Random(7)
+    enquetes = popular(N_USUARIOS, N_JOGOS)
+    with database.transacao() as cur:
+        cur.execute("UPDATE JOGO SET inicio_epoch = 1735700000 + id_jogo * 3600")
+        cur.execute("UPDATE JOGO SET game_id_nba = '00225' || substr(game_id_nba, 6) WHERE id_jogo > ?",
+                    (N_JOGOS // 2,))
+    votos = [(uid, id_enquete, rnd.choice("MV"), "2025-01-01T00:00:00")
+             for id_enquete in enquetes for uid in range(1, N_USUARIOS + 1) if rnd.random() < 0.8]
+    for i in range(0, len(votos), 500):
+        database.registrar_palpites(votos[i:i + 500])
+    # alguns retiram o voto
+    database.registrar_palpites([(uid, enquetes[-1], None, "2025-01-01T00:00:01") for uid in range(1, 50)])
+    return rnd
+
+
+def test_incremental_igual_ao_recalculo(palpites):
+    rnd = palpites
+    # resultados saindo um a um, com um jogo anterior apurado por último
+    for i in list(range(N_JOGOS - 2)) + [N_JOGOS - 1]:
+        database.registrar_resultados([(_game_id(i), rnd.choice("MV"), 100, 99)])
+        assert not database.verificar_estatisticas()
+    database.registrar_resultados([(_game_id(N_JOGOS - 2), rnd.choice("MV"), 100, 99)])
+    assert not database.verificar_estatisticas()
+
+    database.reconstruir_estatisticas()
+    assert not database.verificar_estatisticas()
+
+
+def test_correcao_de_resultado(palpites):
+    for i in range(N_JOGOS):
+        database.registrar_resultados([(_game_id(i), "M", 100, 99)])
+    database.registrar_resultados([(_game_id(0), "V", 90, 100)])
+    assert not database.verificar_estatisticas()
+
+
+@pytest.mark.parametrize("antigo, novo", [
+    (SQL_AGRUPAMENTO_ANTIGO, consultas.consulta_agrupamento),
+    (SQL_JOIN_COMPLEXO_ANTIGO, consultas.consulta_join_complexo),
+], ids=["consulta_agrupamento", "consulta_join_complexo"])
+def test_consultas_iguais_as_antigas(palpites, antigo, novo):
+    for i in range(N_JOGOS - 1):
+        database.registrar_resultados([(_game_id(i), palpites.choice("MV"), 100, 99)])
+    esperado = database.obter_conexao().execute(antigo).fetchall()
+    assert sorted(novo()) == sorted(esperado)
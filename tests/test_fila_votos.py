@@ -0,0 +1,55 @@
+import asyncio
+import json
+
+import database
+from apoio_bench import popular
+from fila_votos import FilaVotos
+
+
+def _contar(sql, *params):
+    with database.transacao(escrita=False) as cur:
+        cur.execute(sql, params)
+        return cur.fetchone()[0]
+
+
+def test_grava_todos_os_votos_uma_vez(banco, tmp_path):
+    enquetes = popular(200, 2)
+    fila = FilaVotos(arquivo=str(tmp_path / "pendentes.jsonl"))
+
+    async def rodar():
+        await fila.iniciar()
+        respostas = await asyncio.gather(*(
+            fila.registrar(uid, id_enquete, "M") for id_enquete in enquetes for uid in range(1, 201)
+        ))
+        # o mesmo usuário apertando de novo é recusado
+        repetido = await fila.registrar(1, enquetes[0], "V")
+        await fila.encerrar()
+        return respostas, repetido
+
+    respostas, repetido = asyncio.run(rodar())
+    assert all(respostas)
+    assert not repetido
+    assert _contar("SELECT COUNT(*) FROM VOTO") == 400
+
+
+def test_voto_recusado_nao_trava_a_fila(banco, tmp_path):
+    enquetes = popular(100, 1)
+    fila = FilaVotos(arquivo=str(tmp_path / "pendentes.jsonl"))
+
+    async def rodar():
+        await fila.iniciar()
+        for uid in range(1, 101):
+            # o 50 vota numa enquete que não existe mais
+            await fila.responder(uid, 999_999 if uid == 50 else enquetes[0], "V")
+        await fila.descarregar()
+        pendentes = len(fila._pendentes)
+        await fila.encerrar()
+        return pendentes
+
+    assert asyncio.run(rodar()) == 0
+    assert _contar("SELECT COUNT(*) FROM VOTO WHERE id_enquete = ? AND escolha = 'V'", enquetes[0]) == 99
+    with open(fila.arquivo_recusados, encoding="utf-8") as f:
+        recusados = [json.loads(linha)["voto"] for linha in f]
+    assert [v[1] for v in recusados] == [999_999]
+    # o voto nunca foi gravado: o usuário pode votar de novo
+    assert (50, 999_999) not in fila._votados
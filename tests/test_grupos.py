@@ -0,0 +1,93 @@
+import asyncio
+import os
+import re
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import database
+import grupos
+from apoio_bench import contexto, popular, responder
+
+N_GRUPOS, N_USUARIOS = 3, 20
+
+
+@pytest.fixture
+def varios_grupos(main, banco, tmp_path, monkeypatch):
+    """N_GRUPOS grupos, cada um no seu banco, com os mesmos message_id nas
+    enquetes e poll_id prefixado pelo chat."""
+    ids = [int(os.environ["GROUP_ID"])] + [-100900 - g for g in range(1, N_GRUPOS)]
+    monkeypatch.setenv("GROUP_IDS", ",".join(map(str, ids)))
+    monkeypatch.setattr(main, "GRUPOS", main._preparar_grupos())
+    for grupo in main.GRUPOS.values():
+        grupo.fila_votos.arquivo = str(tmp_path / grupo.arquivo_pendentes)
+    for grupo, _ in grupos.em_cada_grupo(database.create_tables):
+        with database.usando_banco(grupo.banco):
+            popular(0, 2)
+            with database.transacao() as cur:
+                cur.execute("UPDATE JOGO SET inicio_epoch = ?", (int(time.time()) + 3600,))
+                cur.execute("UPDATE ENQUETE SET poll_id = ? || '_' || id_enquete", (str(grupo.chat_id),))
+    return ids
+
+
+def _usuario(uid):
+    return SimpleNamespace(id=uid, username=f"u{uid}", first_name="U")
+
+
+def _usuarios_do_grupo(g):
+    return range(10_000 * (g + 1), 10_000 * (g + 1) + N_USUARIOS)
+
+
+def _ranking(main, chat_id, respostas):
+    async def anotar(texto, *args, **kwargs):
+        respostas.append(texto)
+
+    mensagem = SimpleNamespace(from_user=_usuario(1), text="/ranking", reply_text=anotar)
+    return main.ranking(SimpleNamespace(message=mensagem, effective_chat=SimpleNamespace(id=chat_id)),
+                        contexto())
+
+
+def test_cada_grupo_so_ve_os_seus_votos(main, varios_grupos):
+    ids = varios_grupos
+    assert list(main.GRUPOS) == ids
+    respostas = []
+
+    async def rodar():
+        for grupo in main.GRUPOS.values():
+            await grupo.fila_votos.iniciar()
+        for g, chat_id in enumerate(ids):
+            chat = SimpleNamespace(id=chat_id)
+            for uid in _usuarios_do_grupo(g):
+                # resposta na enquete: sem chat, roteada pelo poll_id
+                resposta = SimpleNamespace(poll_id=f"{chat_id}_1", user=_usuario(uid), option_ids=[1])
+                await main.resposta_enquete(SimpleNamespace(poll_answer=resposta), None)
+                query = SimpleNamespace(data="10001|V", from_user=_usuario(uid),
+                                        answer=responder, edit_message_text=responder)
+                await main.callback_voto(SimpleNamespace(callback_query=query, effective_chat=chat), None)
+        # enquete de fora é ignorada
+        resposta = SimpleNamespace(poll_id="outro", user=_usuario(1), option_ids=[0])
+        await main.resposta_enquete(SimpleNamespace(poll_answer=resposta), None)
+        for grupo in main.GRUPOS.values():
+            await grupo.fila_votos.encerrar()
+        for chat_id in ids:
+            await _ranking(main, chat_id, respostas)
+
+    asyncio.run(rodar())
+
+    contagens = grupos.em_cada_grupo(lambda: database.obter_conexao().execute(
+        "SELECT (SELECT group_concat(telegram_user_id) FROM USUARIO_PARTICIPANTE),"
+        "       (SELECT COUNT(*) FROM VOTO)").fetchone())
+    for g, (grupo, (usuarios, votos)) in enumerate(contagens):
+        esperados = set(_usuarios_do_grupo(g))
+        assert set(map(int, usuarios.split(","))) == esperados, grupo
+        assert votos == 2 * N_USUARIOS, grupo
+        # a primeira página do /ranking do grupo só tem gente dele
+        nomes = re.findall(r"\d+\. u(\d+):", respostas[g])
+        assert nomes and {int(n) for n in nomes} <= esperados, grupo
+
+
+def test_comando_fora_dos_grupos(main, varios_grupos):
+    respostas = []
+    asyncio.run(_ranking(main, 1, respostas))
+    assert respostas == ["Use este comando no grupo do ranking."]
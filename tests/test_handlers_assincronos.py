@@ -0,0 +1,46 @@
+import asyncio
+
+import database
+from apoio_bench import medir_com_lock, popular
+
+SEGUNDOS_LOCK = 1.0
+
+# Com o SQLite fora do event loop (database_async), um script segurando o
+# lock de escrita não pode parar o bot: o /start espera a vez numa thread
+# e o /ranking (leitura, que o WAL não bloqueia) segue respondendo.
+PIOR_ATRASO_LOOP = 0.1
+P99_RANKING = 0.1
+
+
+def _p99(amostras):
+    amostras = sorted(amostras)
+    return amostras[min(len(amostras) - 1, int(len(amostras) * 0.99))]
+
+
+def test_lock_externo_nao_trava_o_event_loop(main, banco):
+    popular(200, 1)
+    assert database.buscar_id_usuario(999_999) is None
+
+    latencias, atrasos = asyncio.run(medir_com_lock(main.start, main.ranking, SEGUNDOS_LOCK))
+
+    assert len(latencias) > 10, "o /ranking mal rodou enquanto o lock estava preso"
+    assert max(atrasos) < PIOR_ATRASO_LOOP, f"event loop parado por {max(atrasos) * 1000:.0f} ms"
+    assert _p99(latencias) < P99_RANKING, f"/ranking p99 de {_p99(latencias) * 1000:.0f} ms"
+    # e a escrita que esperou o lock foi gravada quando ele saiu
+    assert database.buscar_id_usuario(999_999) is not None
+
+
+def test_sqlite_no_loop_trava_enquanto_o_lock_esta_preso(main, banco):
+    """Referência: o mesmo cenário com o sqlite3 chamado direto no event loop
+    trava o loop pelo tempo do lock (o teste acima consegue ver a trava)."""
+    popular(200, 1)
+
+    async def start_sincrono(update, context):
+        user = update.message.from_user
+        database.registrar_usuario(user.id, user.username)
+
+    async def ranking_sincrono(update, context):
+        database.listar_ranking()
+
+    _, atrasos = asyncio.run(medir_com_lock(start_sincrono, ranking_sincrono, SEGUNDOS_LOCK / 2))
+    assert max(atrasos) > PIOR_ATRASO_LOOP
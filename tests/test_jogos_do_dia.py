@@ -0,0 +1,49 @@
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from io import StringIO
+
+import pytest
+
+from apoio_bench import calendario_sintetico, jogos_do_dia_antigo, time_nba
+
+BORDAS = [
+    datetime(2025, 11, 2, 0, 0),    # fim do horário de verão nos EUA
+    datetime(2026, 3, 8, 0, 0),     # início do horário de verão nos EUA
+    datetime(2026, 1, 1, 0, 0),     # virada do ano
+]
+MINUTOS = (0, 2 * 60 + 59, 3 * 60, 3 * 60 + 1, 4 * 60 + 59, 5 * 60, 12 * 60, 26 * 60 + 59, 27 * 60)
+
+
+@pytest.fixture
+def datas(main, banco, monkeypatch):
+    """Jogos de 5 em 5 minutos em volta de cada borda, mais uma temporada
+    sintética curta, já gravados no banco."""
+    import criar_enquetes_do_dia
+    from atualizar_calendario import atualizar_calendario
+
+    datas = []
+    for k, inicio in enumerate(BORDAS):
+        jogos = []
+        for m in range(0, 36 * 60, 5):
+            dt = inicio + timedelta(minutes=m)
+            jogos.append({
+                "gameId": f"0099{k}{m:05d}", "gameDateTimeUTC": dt.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "gameStatusText": "", "homeTeam": time_nba(m), "awayTeam": time_nba(m + 1),
+            })
+        datas.append({"games": jogos})
+    datas += calendario_sintetico(100)
+    with redirect_stdout(StringIO()):
+        atualizar_calendario(datas)
+    # depois da última borda o calendário acaba: sem rede, nada a sincronizar
+    monkeypatch.setattr(criar_enquetes_do_dia, "atualizar_calendario", lambda: None)
+    return datas
+
+
+@pytest.mark.parametrize("agora", [inicio + timedelta(minutes=m) for inicio in BORDAS for m in MINUTOS],
+                         ids=str)
+def test_janela_igual_a_regra_antiga(datas, agora):
+    import criar_enquetes_do_dia
+    esperado = sorted(j["gameId"] for j, _ in jogos_do_dia_antigo(datas, agora))
+    with redirect_stdout(StringIO()):
+        obtido = sorted(j["game_id"] for j in criar_enquetes_do_dia.jogos_do_dia(agora))
+    assert obtido == esperado
@@ -0,0 +1,52 @@
+import asyncio
+import re
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import database
+import metricas
+from apoio_bench import popular, query_voto
+
+AMOSTRA = re.compile(r'^[a-z_]+(\{[a-z_]+="[^"]*"(,[a-z_]+="[^"]*")*\})? [0-9.e+-]+$')
+
+
+@pytest.fixture
+def ligadas(banco, monkeypatch):
+    monkeypatch.setattr(metricas, "ATIVO", True)
+    metricas.limpar()
+    database.fechar_conexao()       # a conexão nova sai instrumentada
+    yield
+    metricas.limpar()
+
+
+def test_exporta_no_formato_do_prometheus(ligadas, main, fila):
+    popular(50, 1)
+    with database.transacao() as cur:
+        cur.execute("UPDATE JOGO SET inicio_epoch = ?", (int(time.time()) + 3600,))
+    for _ in range(10):
+        database.buscar_enquete(10_000)
+    callback = metricas.medir_handler(main.callback_voto)
+
+    async def cliques():
+        await fila.iniciar()
+        for uid in range(50):
+            await callback(SimpleNamespace(callback_query=query_voto(1000 + uid, 10_000)), None)
+        await fila.encerrar()
+
+    asyncio.run(cliques())
+    texto = metricas.exportar()
+    invalidas = [linha for linha in texto.splitlines() if not linha.startswith("#") and not AMOSTRA.match(linha)]
+    assert not invalidas, invalidas[:3]
+    assert 'bot_handler_segundos_count{handler="callback_voto"} 50' in texto
+    assert 'local="database.buscar_enquete"' in texto
+    assert metricas.resumo()
+
+
+def test_desligadas_nao_coletam(banco, monkeypatch):
+    monkeypatch.setattr(metricas, "ATIVO", False)
+    metricas.limpar()
+    popular(1, 1)
+    database.buscar_enquete(10_000)
+    assert not metricas.exportar().strip()
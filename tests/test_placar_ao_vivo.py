@@ -0,0 +1,114 @@
+import calendar
+from contextlib import redirect_stdout
+from datetime import datetime
+from io import StringIO
+
+import pytest
+
+import calendario
+import database
+import get_nba
+import placar_ao_vivo
+from apoio_bench import ServidorCDN, popular_votos, scoreboard_da_noite
+from atualizar_resultados import resultado_do_jogo
+
+INICIO = calendar.timegm((2025, 10, 21, 23, 0, 0))
+FINS = {"0022400000": INICIO + 130 * 60 + 37, "0022400001": INICIO + 175 * 60 + 37,
+        "0022400002": INICIO + 190 * 60 + 37}
+CORRECAO = FINS["0022400000"] + 300
+
+
+def _esperados():
+    """(game_id, resultado) que devem ser gravados, e a partir de quando."""
+    esperados = {}
+    for game_id, fim in FINS.items():
+        g = next(j for j in scoreboard_da_noite(INICIO, fim)["scoreboard"]["games"] if j["gameId"] == game_id)
+        esperados[(game_id, resultado_do_jogo(g))] = fim
+    g = scoreboard_da_noite(INICIO, CORRECAO)["scoreboard"]["games"][0]
+    esperados[(g["gameId"], resultado_do_jogo(g))] = CORRECAO
+    return esperados
+
+
+@pytest.fixture
+def noite(banco, monkeypatch):
+    """Uma noite de 3 jogos (1 na prorrogação, 1 corrigido) servida por uma
+    CDN local num relógio simulado."""
+    popular_votos(50, 3)
+    # o placar tira os horários de início do calendário em memória
+    calendario.indice.atualizar([
+        (game_id, "Home Team", "Away Team",
+         *datetime.utcfromtimestamp(INICIO + atraso * 60).strftime("%Y-%m-%d %H:%M:%S").split(),
+         "scheduled", "", "", "")
+        for game_id, atraso in zip(FINS, (0, 30, 60))
+    ], completo=True)
+    cdn = ServidorCDN({})
+    monkeypatch.setattr(get_nba, "URL_SCOREBOARD", cdn.url + "/scoreboard.json")
+    relogio = [INICIO - 2 * 3600]
+
+    def obter():
+        cdn.arquivos["/scoreboard.json"] = scoreboard_da_noite(INICIO, relogio[0])
+        return get_nba.obter_json_nba(max_idade=0)
+
+    placar = placar_ao_vivo.PlacarAoVivo(obter=obter, gravar=lambda r: (database.registrar_resultados(r), 1))
+    yield placar, relogio, cdn
+    cdn.parar()
+
+
+def _rodar(placar, relogio):
+    """Roda a noite inteira; devolve [(instante, intervalo)] e quando cada
+    (game_id, resultado) foi visto gravado pela primeira vez."""
+    instantes, vistos = [], {}
+    with redirect_stdout(StringIO()):
+        while True:
+            intervalo = placar.rodada(relogio[0])
+            instantes.append((relogio[0], intervalo))
+            for chave in placar._gravados.items():
+                vistos.setdefault(chave, relogio[0])
+            if intervalo is None:
+                return instantes, vistos
+            relogio[0] += intervalo
+
+
+def test_grava_cada_resultado_uma_vez_e_no_prazo(noite):
+    placar, relogio, _ = noite
+    esperados = _esperados()
+    _, vistos = _rodar(placar, relogio)
+    atrasos = [vistos[chave] - fim for chave, fim in esperados.items() if chave in vistos]
+    assert len(atrasos) == len(esperados), "resultado nunca gravado"
+    assert max(atrasos) <= placar_ao_vivo.INTERVALO_RETA_FINAL
+    assert placar.gravacoes == len(esperados), "só deveria escrever nas transições"
+
+
+def test_ritmo_das_consultas(noite):
+    placar, relogio, _ = noite
+    instantes, _ = _rodar(placar, relogio)
+    intervalos = [i for _, i in instantes]
+    assert intervalos[0] == placar_ao_vivo.INTERVALO_OCIOSO and intervalos[-1] is None
+    assert {placar_ao_vivo.INTERVALO_EM_ANDAMENTO, placar_ao_vivo.INTERVALO_RETA_FINAL} <= set(intervalos)
+    assert INICIO in [a for a, _ in instantes], "deveria acordar no início do primeiro jogo"
+
+
+def test_scoreboard_repetido_vem_como_304(noite):
+    placar, relogio, cdn = noite
+    _rodar(placar, relogio)
+    requisicoes, _, enviados = cdn.contadores()
+    gravacoes = placar.gravacoes
+    with redirect_stdout(StringIO()):
+        assert placar.rodada(relogio[0]) is None
+    assert placar.gravacoes == gravacoes
+    assert cdn.contadores()[0] == requisicoes + 1 and cdn.contadores()[2] == enviados
+
+
+def test_pontuacao_igual_a_dos_resultados_finais(noite, tmp_path):
+    placar, relogio, _ = noite
+    _rodar(placar, relogio)
+    ranking = database.listar_ranking()
+
+    # mesmos votos num banco novo, gravando direto os resultados já corrigidos
+    database.fechar_conexao()
+    database.DB_NAME = str(tmp_path / "direto.db")
+    database.create_tables()
+    popular_votos(50, 3)
+    finais = {game_id: resultado for game_id, resultado in _esperados()}
+    database.registrar_resultados(list(finais.values()))
+    assert database.listar_ranking() == ranking
@@ -0,0 +1,49 @@
+import database
+from apoio_bench import popular_votos
+
+
+def _esperado(vencedores):
+    """Ranking contado à mão: um ponto por voto no vencedor."""
+    with database.transacao(escrita=False) as cur:
+        cur.execute("""
+            SELECT u.id_usuario_participante, j.game_id_nba, v.escolha
+            FROM USUARIO_PARTICIPANTE u
+            JOIN VOTO v USING (id_usuario_participante)
+            JOIN ENQUETE e USING (id_enquete)
+            JOIN JOGO j USING (id_jogo)
+        """)
+        pontos = {}
+        for uid, game_id, escolha in cur.fetchall():
+            pontos[uid] = pontos.get(uid, 0) + (vencedores.get(game_id) == escolha)
+        cur.execute("SELECT id_usuario_participante, pontuacao FROM USUARIO_PARTICIPANTE")
+        return pontos, dict(cur.fetchall())
+
+
+def test_pontua_em_conjunto_e_de_novo_sem_mudar(banco):
+    popular_votos(200, 4)
+    resultados = [(f"00224{i:05d}", "M" if i % 2 else "V", 100 + i, 99) for i in range(4)]
+    vencedores = {g: v for g, v, _, _ in resultados}
+
+    database.registrar_resultados(resultados)
+    esperado, obtido = _esperado(vencedores)
+    assert obtido == esperado
+
+    ranking = database.listar_ranking()
+    escritas = database.obter_conexao().total_changes
+    database.registrar_resultados(resultados)
+    assert database.obter_conexao().total_changes == escritas, "rodar de novo não deveria escrever"
+    database.recalcular_pontuacao()
+    assert database.listar_ranking() == ranking
+
+
+def test_correcao_de_resultado(banco):
+    popular_votos(200, 4)
+    resultados = [(f"00224{i:05d}", "M" if i % 2 else "V", 100 + i, 99) for i in range(4)]
+    database.registrar_resultados(resultados)
+
+    game_id = resultados[0][0]
+    database.registrar_resultados([(game_id, "M", 90, 100)])
+    vencedores = {g: v for g, v, _, _ in resultados}
+    vencedores[game_id] = "M"
+    esperado, obtido = _esperado(vencedores)
+    assert obtido == esperado
@@ -0,0 +1,65 @@
+import asyncio
+import random
+
+import pytest
+
+import database
+from apoio_bench import contexto, grupo_unico, update_mensagem
+
+
+@pytest.fixture
+def classificacao(main, banco):
+    rnd = random.Random(7)
+    with database.transacao() as cur:
+        cur.executemany("""
+            INSERT INTO USUARIO_PARTICIPANTE (telegram_user_id, apelido, pontuacao, frequencia_participacao)
+            VALUES (?, ?, ?, ?)
+        """, [(1000 + i, f"user{i}", rnd.randint(0, 80), rnd.randint(0, 100)) for i in range(3000)])
+    classificacao = grupo_unico(main).classificacao
+    classificacao.invalidar()
+    yield classificacao
+    classificacao.invalidar()
+
+
+def test_respostas_cabem_numa_mensagem(main, classificacao):
+    respostas = []
+
+    async def guardar(texto, *args, **kwargs):
+        respostas.append(texto)
+
+    def update(uid, texto):
+        u = update_mensagem(uid, texto)
+        u.message.reply_text = guardar
+        return u
+
+    async def rodar():
+        await main.ranking(update(1000, "/ranking"), contexto())
+        await main.ranking(update(1000, "/ranking"), contexto("50"))
+        await main.ranking(update(1000, "/ranking"), contexto("999"))
+        for uid in (1000, 2500, 3999):
+            await main.meu_rank(update(uid, "/meu_rank"), contexto())
+
+    asyncio.run(rodar())
+    assert len(respostas) == 6
+    assert max(len(r) for r in respostas) <= 4096     # limite do Telegram
+
+
+def test_reposicionar_depois_de_lotes_igual_a_recarga(classificacao):
+    rnd = random.Random(3)
+    asyncio.run(classificacao.atualizar())
+    antes = list(classificacao._linhas)
+
+    async def lotes():
+        for _ in range(20):
+            ids = rnd.sample(range(1, 3001), 100)
+            with database.transacao() as cur:
+                cur.executemany("""
+                    UPDATE USUARIO_PARTICIPANTE SET frequencia_participacao = frequencia_participacao + 1
+                    WHERE id_usuario_participante = ?
+                """, [(i,) for i in ids])
+            classificacao.alterados(ids)
+            await classificacao.atualizar()
+
+    asyncio.run(lotes())
+    assert classificacao._linhas != antes
+    assert classificacao._linhas == database.listar_ranking()
@@ -0,0 +1,100 @@
+import calendar
+import threading
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from io import StringIO
+
+import pytest
+
+import database
+import get_nba
+import recuperar_resultados
+from apoio_bench import ServidorCDN, popular_votos
+from atualizar_resultados import resultado_do_jogo
+from grupos import Grupo
+
+N_JOGOS = 100
+INICIO = calendar.timegm((2025, 10, 21, 23, 0, 0))
+
+
+@pytest.fixture
+def cdn(monkeypatch):
+    """Boxscores na CDN local: a cada 50 jogos um adiado (404) e um ainda
+    em andamento."""
+    arquivos = {}
+    for i in range(N_JOGOS):
+        game_id = f"00224{i:05d}"
+        if i % 50 == 7:
+            continue
+        jogo = {"gameId": game_id, "gameStatus": 3, "gameStatusText": "Final" if i % 9 else "Final/OT",
+                "homeTeam": {"score": 100 + i % 17}, "awayTeam": {"score": 100 + i % 13}}
+        if i % 50 == 13:
+            jogo.update(gameStatus=2, gameStatusText="Q3")
+        arquivos[f"/boxscore_{game_id}.json"] = {"game": jogo}
+    cdn = ServidorCDN(arquivos)
+    monkeypatch.setattr(get_nba, "URL_BOXSCORE", cdn.url + "/boxscore_{game_id}.json")
+    yield cdn
+    cdn.parar()
+
+
+def _preparar(pasta, nome):
+    """Banco novo com os jogos sem resultado e os votos; devolve a faixa
+    de datas a recuperar."""
+    database.DB_NAME = str(pasta / nome)
+    database.create_tables()
+    popular_votos(50, N_JOGOS)
+    with database.transacao() as cur:
+        cur.execute("UPDATE JOGO SET inicio_epoch = ? + (id_jogo - 1) * 14400", (INICIO,))
+    return recuperar_resultados.janela(datetime.utcfromtimestamp(INICIO).date() - timedelta(days=1),
+                                       datetime.utcfromtimestamp(INICIO + N_JOGOS * 14400).date())
+
+
+@pytest.fixture
+def esperado(banco, cdn, tmp_path):
+    """Ranking de gravar os resultados um a um, como antes (num banco à parte)."""
+    faixa = _preparar(tmp_path, "jogo_a_jogo.db")
+    for game_id, _ in database.listar_jogos_sem_resultado(*faixa):
+        jogo = get_nba.obter_boxscore(game_id)
+        resultado = resultado_do_jogo(jogo) if jogo else None
+        if resultado is not None:
+            database.registrar_resultados([resultado])
+    return database.listar_ranking()
+
+
+@pytest.mark.parametrize("threads", [1, 8])
+def test_pool_igual_a_gravar_jogo_a_jogo(cdn, esperado, tmp_path, threads):
+    faixa = _preparar(tmp_path, "pool.db")
+    with redirect_stdout(StringIO()):
+        r = recuperar_resultados.recuperar(*faixa, threads=threads, grupos=[Grupo(None, principal=True)])
+
+    finalizados = sum(1 for a in cdn.arquivos.values() if a["game"]["gameStatus"] == 3)
+    assert r["gravados"] == finalizados
+    assert r["sem_resultado"] == N_JOGOS - finalizados
+    assert not r["falhas"]
+    assert database.listar_ranking() == esperado
+
+
+def test_retoma_de_onde_parou(cdn, esperado, tmp_path):
+    faixa = _preparar(tmp_path, "interrompido.db")
+    grupos = [Grupo(None, principal=True)]
+    chamadas = []
+    trava = threading.Lock()
+
+    def obter_e_interromper(game_id):
+        # Ctrl+C durante um download, no meio da recuperação
+        with trava:
+            chamadas.append(game_id)
+            if len(chamadas) == N_JOGOS // 2:
+                raise KeyboardInterrupt
+        return get_nba.obter_boxscore(game_id)
+
+    with redirect_stdout(StringIO()):
+        with pytest.raises(KeyboardInterrupt):
+            recuperar_resultados.recuperar(*faixa, threads=8, tamanho_lote=10,
+                                           obter=obter_e_interromper, grupos=grupos)
+        restantes = len(database.listar_jogos_sem_resultado(*faixa))
+        requisicoes = cdn.requisicoes
+        r = recuperar_resultados.recuperar(*faixa, threads=8, grupos=grupos)
+    assert restantes < N_JOGOS
+    assert r["pendentes"] == restantes == cdn.requisicoes - requisicoes, "não retomou de onde parou"
+    assert database.listar_ranking() == esperado, "pontuação diferente depois de retomar"
@@ -0,0 +1,65 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import database
+from apoio_bench import popular
+
+
+@pytest.fixture
+def enquetes(banco):
+    popular(50, 2)          # metade dos votantes nunca usou /start
+    with database.transacao() as cur:
+        cur.execute("UPDATE JOGO SET inicio_epoch = ?", (int(time.time()) + 3600,))
+        cur.execute("UPDATE ENQUETE SET poll_id = 'poll' || id_enquete")
+
+
+def _responder(main, uid, opcoes, poll_id="poll2"):
+    usuario = SimpleNamespace(id=uid, username=f"u{uid}", first_name="U")
+    resposta = SimpleNamespace(poll_id=poll_id, user=usuario, option_ids=opcoes)
+    return main.resposta_enquete(SimpleNamespace(poll_answer=resposta), None)
+
+
+def _consultar(sql):
+    with database.transacao(escrita=False) as cur:
+        cur.execute(sql)
+        return cur.fetchall()
+
+
+def test_votar_trocar_e_retirar(main, fila, enquetes):
+    async def rodar():
+        await fila.iniciar()
+        for uid in range(1000, 1100):
+            await _responder(main, uid, [1])
+        # antes do fechamento: 10% trocam para o visitante, 5% retiram o voto
+        for uid in range(1000, 1100, 10):
+            await _responder(main, uid, [0])
+        for uid in range(1001, 1100, 20):
+            await _responder(main, uid, [])
+        await fila.encerrar()
+
+    asyncio.run(rodar())
+    assert _consultar("SELECT COUNT(*) FROM USUARIO_PARTICIPANTE") == [(100,)]
+    assert dict(_consultar("SELECT escolha, COUNT(*) FROM VOTO WHERE id_enquete = 2 GROUP BY escolha")) \
+        == {"V": 10, "M": 85}
+    # a frequência de participação acompanha os votos
+    assert _consultar("SELECT SUM(frequencia_participacao) FROM USUARIO_PARTICIPANTE") \
+        == _consultar("SELECT COUNT(*) FROM VOTO")
+
+
+def test_ignora_enquete_fechada_de_fora_ou_sem_usuario(main, fila, enquetes):
+    with database.transacao() as cur:
+        cur.execute("UPDATE JOGO SET inicio_epoch = ? WHERE id_jogo = 1", (int(time.time()) - 60,))
+
+    async def rodar():
+        await fila.iniciar()
+        await _responder(main, 1000, [1], poll_id="poll1")       # jogo já começou
+        await _responder(main, 1000, [1], poll_id="outra")       # enquete que não é do ranking
+        resposta = SimpleNamespace(poll_id="poll2", user=None, option_ids=[1])
+        await main.resposta_enquete(SimpleNamespace(poll_answer=resposta), None)
+        await fila.encerrar()
+
+    asyncio.run(rodar())
+    assert _consultar("SELECT COUNT(*) FROM VOTO") == [(0,)]
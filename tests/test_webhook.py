@@ -0,0 +1,128 @@
+import asyncio
+import random
+import socket
+import time
+
+import pytest
+import requests
+from telegram import Update
+from telegram.ext import TypeHandler
+
+import database
+from apoio_bench import ServidorBotAPI, popular, update_json_comando, update_json_resposta
+
+
+@pytest.fixture
+def api(banco):
+    popular(1, 1)
+    with database.transacao() as cur:
+        cur.execute("UPDATE JOGO SET inicio_epoch = ?", (int(time.time()) + 3600,))
+        cur.execute("UPDATE ENQUETE SET poll_id = 'poll1'")
+    api = ServidorBotAPI(latencia=0.02, por_chat=10 ** 9, por_segundo=10 ** 9)
+    yield api
+    api.parar()
+
+
+def _aplicacao(main, api):
+    app = main.criar_aplicacao("123:teste", base_url=api.url + "/bot")
+    app.post_init = app.post_shutdown = None
+    processados = []
+
+    async def anotar(update, context):
+        processados.append(update.update_id)
+
+    app.add_handler(TypeHandler(Update, anotar), group=1)
+    return app, processados
+
+
+def _roteiro(n):
+    """Respostas às enquetes e alguns /ranking; parte dos usuários vota,
+    troca e retira o voto em updates seguidos."""
+    rnd = random.Random(3)
+    updates, retirados, uid = [], set(), 1000
+    while len(updates) < n:
+        uid += 1
+        if rnd.random() < 0.1:
+            updates.append(update_json_comando(len(updates) + 1, 1000 + rnd.randrange(uid - 1000), "/ranking"))
+        elif rnd.random() < 0.2:
+            for opcoes in ([1], [0], []):
+                updates.append(update_json_resposta(len(updates) + 1, uid, "poll1", opcoes))
+            retirados.add(uid)
+        else:
+            updates.append(update_json_resposta(len(updates) + 1, uid, "poll1", [rnd.randrange(2)]))
+    return updates, retirados
+
+
+def _com_voto():
+    with database.transacao(escrita=False) as cur:
+        cur.execute("""
+            SELECT u.telegram_user_id FROM VOTO v
+            JOIN USUARIO_PARTICIPANTE u USING (id_usuario_participante)
+        """)
+        return {r[0] for r in cur.fetchall()}
+
+
+async def _esperar(processados, n, limite=30):
+    fim = time.monotonic() + limite
+    while len(processados) < n and time.monotonic() < fim:
+        await asyncio.sleep(0.02)
+
+
+def test_concorrente_mantem_a_ordem_de_cada_usuario(main, fila, api, monkeypatch):
+    updates, retirados = _roteiro(300)
+    # latência variável por update, como a das chamadas à API de verdade:
+    # sem a fila por usuário, o "retirar" pode terminar antes do "votar"
+    rnd = random.Random(5)
+    resposta_enquete = main.resposta_enquete
+
+    async def com_atraso(update, context):
+        await asyncio.sleep(rnd.random() * 0.01)
+        await resposta_enquete(update, context)
+
+    monkeypatch.setattr(main, "resposta_enquete", com_atraso)
+    app, processados = _aplicacao(main, api)
+
+    async def rodar():
+        await fila.iniciar()
+        async with app:
+            await app.start()
+            for dados in updates:
+                await app.update_queue.put(Update.de_json(dados, app.bot))
+            await _esperar(processados, len(updates))
+            await app.stop()
+        await fila.encerrar()
+
+    asyncio.run(rodar())
+    assert sorted(processados) == list(range(1, len(updates) + 1))
+    assert retirados and not retirados & _com_voto(), "voto retirado voltou: updates fora de ordem"
+
+
+def test_webhook_exige_o_segredo(main, fila, api):
+    updates, _ = _roteiro(20)
+    app, processados = _aplicacao(main, api)
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        porta = sock.getsockname()[1]
+    url, segredo = f"http://127.0.0.1:{porta}/telegram", "segredo-teste"
+
+    def postar():
+        with requests.Session() as sessao:
+            for dados in updates:
+                sessao.post(url, json=dados, headers={"X-Telegram-Bot-Api-Secret-Token": segredo})
+            return sessao.post(url, json=update_json_resposta(999, 1, "poll1", [0])).status_code
+
+    async def rodar():
+        await fila.iniciar()
+        async with app:
+            await app.start()
+            await app.updater.start_webhook(listen="127.0.0.1", port=porta, url_path="telegram",
+                                            webhook_url=url, secret_token=segredo)
+            sem_segredo = await asyncio.to_thread(postar)
+            await _esperar(processados, len(updates))
+            await app.updater.stop()
+            await app.stop()
+        await fila.encerrar()
+        return sem_segredo
+
+    assert asyncio.run(rodar()) == 403
+    assert sorted(processados) == list(range(1, len(updates) + 1))